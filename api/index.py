@@ -1,2 +1,8 @@
 # api/index.py
-from backend.app.main import app
+import sys
+from pathlib import Path
+
+# the backend modules import each other as `app.*` / `data.*` (same as running uvicorn from backend/)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from app.main import app
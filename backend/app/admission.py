@@ -0,0 +1,222 @@
+# app/admission.py
+# admission control in front of the routes that get hammered near the deadline. Each policy covers
+# one or more (method, path) pairs and has:
+#   concurrency  requests handled at once; the rest wait
+#   queue        how many may wait; beyond that they get 429 straight away
+#   wait         seconds a request may wait for a slot before it gets 429
+#   rate, burst  token bucket per client address: rate requests per second on average, up to burst
+#                at once. rate=0 (the default) turns it off
+# Waiting requests get freed slots in arrival order. A 429 carries Retry-After: for the token bucket,
+# the time until the next token; for a full queue or a timed-out wait, roughly how long the queue
+# ahead would take at the recent service time. Admitted requests therefore see at most `wait` of
+# queueing plus their own handling time, however large the spike.
+#
+# The per-client rate is off unless configured because nothing here identifies a student: the
+# student login in users.json is shared by the whole class, so a session says nothing, and behind
+# Vercel's proxy (or campus NAT) the connection address is shared too. Only turn it on where the key
+# really is per student, e.g. with ADMISSION_TRUST_FORWARDED=1 behind a proxy that sets
+# X-Forwarded-For to the browser's address, and size rate/burst for one student, not a class.
+#
+# Limits are per worker process (the event loop is the only place they're checked, so no locks).
+#   ADMISSION=0                   no admission control at all
+#   ADMISSION_<POLICY>=k=v,...    override any of the settings above, e.g.
+#                                 ADMISSION_SUBMIT="concurrency=8,queue=32,wait=2,rate=1,burst=3"
+#   ADMISSION_TRUST_FORWARDED=1   key the rate on the first X-Forwarded-For address (only behind a
+#                                 proxy that overwrites the header; anyone can send it otherwise)
+import asyncio
+import math
+import os
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+from app import metrics
+
+ENABLED = os.getenv("ADMISSION", "1") != "0"
+TRUST_FORWARDED = os.getenv("ADMISSION_TRUST_FORWARDED", "0") == "1"
+# token buckets kept per policy (least recently used clients are forgotten first)
+MAX_CLIENTS = 50000
+
+POLICIES: Dict[str, Dict[str, Any]] = {
+    # every submission goes through the submission writer's group commit; the bound keeps a surge
+    # from piling thousands of validations and pending writes onto one worker. Much lower and the
+    # commits get small (each rewrites students.json), which made submissions slower, not faster
+    "submit": {
+        "routes": [("POST", "/api/students")],
+        "concurrency": 64, "queue": 128, "wait": 2.0, "rate": 0.0, "burst": 5,
+    },
+    # the project catalog is read on every student page load
+    "catalog": {
+        "routes": [("GET", "/projects"), ("GET", "/api/projects")],
+        "concurrency": 32, "queue": 256, "wait": 1.0, "rate": 0.0, "burst": 40,
+    },
+}
+
+
+def _configured(name: str, defaults: Dict[str, Any]) -> Dict[str, Any]:
+    config = dict(defaults)
+    for part in os.getenv(f"ADMISSION_{name.upper()}", "").split(","):
+        key, _, value = part.partition("=")
+        key = key.strip()
+        if key in ("concurrency", "queue", "burst"):
+            config[key] = int(value)
+        elif key in ("wait", "rate"):
+            config[key] = float(value)
+        elif key:
+            raise ValueError(f"Unknown ADMISSION_{name.upper()} setting {key!r}")
+    return config
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str, retry_after: float) -> None:
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = max(1, math.ceil(retry_after))
+
+
+class AdmissionPolicy:
+    def __init__(self, name: str, concurrency: int, queue: int, wait: float, rate: float, burst: int, **_) -> None:
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue = max(0, queue)
+        self.wait = wait
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        # moving average of how long an admitted request holds its slot, for Retry-After
+        self._service = 0.05
+
+    # --- per-client rate ---
+    def take_token(self, client: str) -> None:
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        tokens, last = self._buckets.pop(client, (float(self.burst), now))
+        tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+        if tokens < 1:
+            self._buckets[client] = (tokens, now)
+            raise Rejected("rate", (1 - tokens) / self.rate)
+        self._buckets[client] = (tokens - 1, now)
+        if len(self._buckets) > MAX_CLIENTS:
+            self._buckets.popitem(last=False)
+
+    # --- concurrency ---
+    def _queue_delay(self, ahead: int) -> float:
+        return self._service * (ahead + 1) / self.concurrency
+
+    async def acquire(self) -> None:
+        if self.in_flight < self.concurrency and not self._waiters:
+            self.in_flight += 1
+            return
+        if len(self._waiters) >= self.queue:
+            raise Rejected("queue_full", self._queue_delay(len(self._waiters)))
+
+        slot = asyncio.get_running_loop().create_future()
+        self._waiters.append(slot)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait((slot,), timeout=self.wait)
+        except asyncio.CancelledError:
+            # client went away while queued; pass on a slot we were handed meanwhile
+            if slot.done():
+                self.release()
+            else:
+                self._waiters.remove(slot)
+            raise
+        if not slot.done():
+            self._waiters.remove(slot)
+            raise Rejected("wait_timeout", self._queue_delay(len(self._waiters)))
+        metrics.ADMISSION_WAIT.observe(time.perf_counter() - start, self.name)
+
+    def release(self, held: Optional[float] = None) -> None:
+        if held is not None:
+            self._service += (held - self._service) * 0.1
+        # hand the slot straight to the longest waiter, so in_flight stays as it is
+        while self._waiters:
+            slot = self._waiters.popleft()
+            if not slot.done():
+                slot.set_result(None)
+                return
+        self.in_flight -= 1
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "concurrency": self.concurrency,
+            "queue": self.queue,
+            "wait": self.wait,
+            "rate": self.rate,
+            "burst": self.burst,
+            "service_ms": round(self._service * 1000, 1),
+        }
+
+
+def build_policies() -> Dict[Tuple[str, str], AdmissionPolicy]:
+    by_route = {}
+    for name, defaults in POLICIES.items():
+        config = _configured(name, defaults)
+        policy = AdmissionPolicy(name, **config)
+        for route in config["routes"]:
+            by_route[route] = policy
+    return by_route
+
+
+def _client_key(scope) -> str:
+    if TRUST_FORWARDED:
+        for name, value in scope["headers"]:
+            if name == b"x-forwarded-for":
+                first = value.decode("latin-1").split(",")[0].strip()
+                if first:
+                    return f"addr:{first}"
+    client = scope.get("client")
+    return f"addr:{client[0]}" if client else "addr:unknown"
+
+
+async def _reject(send, rejected: Rejected) -> None:
+    body = b'{"detail":"Too many requests, please try again shortly"}'
+    await send({
+        "type": "http.response.start",
+        "status": 429,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(rejected.retry_after).encode()),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, policies: Optional[Dict[Tuple[str, str], AdmissionPolicy]] = None) -> None:
+        self.app = app
+        self.policies = by_route if policies is None else policies
+
+    async def __call__(self, scope, receive, send):
+        policy = self.policies.get((scope.get("method"), scope.get("path"))) if scope["type"] == "http" else None
+        if policy is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            policy.take_token(_client_key(scope))
+            await policy.acquire()
+        except Rejected as rejected:
+            metrics.ADMISSION_REJECTED.inc(policy.name, rejected.reason)
+            await _reject(send, rejected)
+            return
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            policy.release(time.perf_counter() - start)
+
+
+def status() -> Dict[str, Any]:
+    return {policy.name: policy.status() for policy in by_route.values()}
+
+
+by_route = build_policies()
@@ -1,6 +1,10 @@
-from typing import List, Dict, Any
+import heapq
+import time
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Set
 from app.models import Group
-from app import scoring_helpers, save_load
+from app import scoring_helpers, save_load, metrics, allocation_index, profiling, run_history
+from data.cohorts import current_cohort
 
 
 WEIGHTS = {
@@ -10,113 +14,232 @@ WEIGHTS = {
     "dual_group": -0.1
 }
 
-def match_projects(
+# how many candidate projects to keep per group for the "why did we get this project" view
+EXPLAIN_TOP_K = 3
+
+def score_pair(group: Group, project: Dict[str, Any]):
+    """(total, preference, skills, wam, dual) score of one group/project pair"""
+    # scoring logic is now done in scoring_helpers
+    preference_score = scoring_helpers.calculate_preference_score(group.project_preferences, project["id"])
+    skills_score = scoring_helpers.calculate_skills_score(group.skills, project["required_skills"])
+    wam_score = scoring_helpers.calculate_wam_score(group.wam_breakdown)
+    dual_group = WEIGHTS["dual_group"] if group.dual_project_enrollment else 0
+
+    total_score = (
+        preference_score * WEIGHTS["preference"] +
+        skills_score * WEIGHTS["skills"] +
+        wam_score * WEIGHTS["wam"] +
+        dual_group
+    )
+    return total_score, preference_score, skills_score, wam_score, dual_group
+
+
+def assign_groups(
     groups_data: List[Group],
-    projects_table: str = save_load.PROJECTS_TABLE,
-    save_to_db: bool = True
+    projects: List[Dict[str, Any]],
+    assigned_projects: Optional[Set[str]] = None,
+    explain_top_k: int = EXPLAIN_TOP_K
 ) -> Dict[str, Any]:
+    """The greedy pass on its own (no DB, no metrics), so it can also run in pool workers.
 
-    PROJECTS = save_load.load_projects_from_db(projects_table)
-
+    Groups are taken in order and each gets its best scoring project that is still free.
+    """
     allocations = {}
-    assigned_projects = set()
+    components = {}
+    explanations = {}
+    assigned_projects = set(assigned_projects or ())
 
-    # summary trackers for dashboard later on
-    project_demand = {project["id"]: 0 for project in PROJECTS}
-    skill_totals = {skill: 0 for skill in scoring_helpers.skill_ratings}
-    total_pref_scores = 0
-    total_skill_scores = 0
-    total_wam_scores = 0
-    dual_count = 0
+    # scoring and assignment are interleaved per group, so their time is summed up and
+    # reported once at the end rather than observed per group
+    score_seconds = 0.0
+    assign_seconds = 0.0
 
     i = 0
     while i < len(groups_data):
         group = groups_data[i]
+        phase_start = time.perf_counter()
         best_project = None
         best_score = -1
+        best_components = None
+        candidates = []
 
         x = 0
-        while x < len(PROJECTS):
-            project = PROJECTS[x]
+        while x < len(projects):
+            project = projects[x]
             if project["id"] in assigned_projects:
                 x += 1
                 continue
 
-            # scoring logic is now done in scoring_helpers
-            preference_score = scoring_helpers.calculate_preference_score(group.project_preferences, project["id"])
-            skills_score = scoring_helpers.calculate_skills_score(group.skills, project["required_skills"])
-            wam_score = scoring_helpers.calculate_wam_score(group.wam_breakdown)
-            dual_group = WEIGHTS["dual_group"] if group.dual_project_enrollment else 0
-
-            total_score = (
-                preference_score * WEIGHTS["preference"] +
-                skills_score * WEIGHTS["skills"] +
-                wam_score * WEIGHTS["wam"] +
-                dual_group
-            )
+            total_score, preference_score, skills_score, wam_score, dual_group = score_pair(group, project)
+            candidates.append((total_score, project["id"], preference_score, skills_score, wam_score, dual_group))
 
             if total_score > best_score:
                 best_score = total_score
                 best_project = project["id"]
+                best_components = (preference_score, skills_score, wam_score)
             x += 1
 
+        scored_at = time.perf_counter()
+        score_seconds += scored_at - phase_start
+
+        # partial selection (O(n log k)) instead of sorting every scored project
+        if explain_top_k > 0:
+            explanations[group.group_id] = [
+                {
+                    "rank": rank,
+                    "project_id": pid,
+                    "total_score": round(total, 4),
+                    "preference_score": round(pref, 4),
+                    "skills_score": round(skills, 4),
+                    "wam_score": round(wam, 4),
+                    "dual_penalty": dual,
+                }
+                for rank, (total, pid, pref, skills, wam, dual) in enumerate(
+                    heapq.nlargest(explain_top_k, candidates, key=itemgetter(0)), start=1
+                )
+            ]
+
         if best_project:
             allocations[group.group_id] = best_project
             assigned_projects.add(best_project)
-        
+            components[group.group_id] = best_components
+
+        assign_seconds += time.perf_counter() - scored_at
+        i += 1
+
+    return {
+        "allocations": allocations,
+        "components": components,
+        "explanations": explanations,
+        "score_seconds": score_seconds,
+        "assign_seconds": assign_seconds,
+    }
+
+
+def summarise(
+    groups_data: List[Group],
+    projects: List[Dict[str, Any]],
+    allocations: Dict[str, str],
+    components: Dict[str, Any],
+    aggregates: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    # aggregates: a SubmissionAggregates.snapshot() covering the same groups; when given,
+    # project demand and skill coverage come from it instead of being recounted here
+    project_demand = {project["id"]: 0 for project in projects}
+    skill_totals = {skill: 0 for skill in scoring_helpers.skill_ratings}
+    dual_count = 0
+
+    for group in groups_data:
         # update summary stats for dashboard later on
-        for pref in group.project_preferences:
-            if pref in project_demand:
-                project_demand[pref] += 1
-        
-        for skill in group.skills:
-            if skill in skill_totals:
-                skill_totals[skill] += 1
-
-        total_pref_scores += preference_score
-        total_skill_scores += skills_score
-        total_wam_scores += wam_score
+        if aggregates is None:
+            for pref in group.project_preferences:
+                if pref in project_demand:
+                    project_demand[pref] += 1
+
+            for skill in group.skills:
+                if skill in skill_totals:
+                    skill_totals[skill] += 1
+
         if group.dual_project_enrollment:
             dual_count += 1
 
-        i += 1
+    # averages are over the project each group actually got
+    total_pref_scores = sum(c[0] for c in components.values())
+    total_skill_scores = sum(c[1] for c in components.values())
+    total_wam_scores = sum(c[2] for c in components.values())
 
     # added skill coverage and average score calcs
-    total_groups = len(groups_data)
-    skill_coverage = {
-        k: round(v / total_groups, 2) for k, v in skill_totals.items()
-    }
+    total_groups = len(groups_data) or 1
+    allocated_groups = len(allocations) or 1
+    if aggregates is not None:
+        demand = aggregates.get("project_demand") or {}
+        project_demand = {pid: int(demand.get(pid, 0)) for pid in project_demand}
+        coverage = aggregates.get("skill_coverage") or {}
+        skill_coverage = {k: float(coverage.get(k, 0.0)) for k in skill_totals}
+    else:
+        skill_coverage = {
+            k: round(v / total_groups, 2) for k, v in skill_totals.items()
+        }
 
-    summary = {
+    return {
         "project_demand": project_demand,
         "skill_coverage": skill_coverage,
-        "average_preference_score": round(total_pref_scores / total_groups, 3),
-        "average_skills_score": round(total_skill_scores / total_groups, 3),
-        "average_wam_score": round(total_wam_scores / total_groups, 3),
+        "average_preference_score": round(total_pref_scores / allocated_groups, 3),
+        "average_skills_score": round(total_skill_scores / allocated_groups, 3),
+        "average_wam_score": round(total_wam_scores / allocated_groups, 3),
         "dual_project_count": dual_count
     }
 
-    # saving allocations results to db before returning
-    if save_to_db and allocations:
+
+def persist(
+    allocations: Dict[str, str],
+    summary: Dict[str, Any],
+    explanations: Dict[str, Any],
+    groups_data: Optional[List[Group]] = None,
+    cohort: Optional[str] = None,
+) -> None:
+    # saving allocations results to db before returning (into the cohort's partitions)
+    cohort = cohort or current_cohort()
+    if allocations:
         save_load.save_allocations_to_db(
             allocations,
             table_fullname='"Allocation_Results"', 
             upsert=True,
-            replace_all=False
+            # a run is the cohort's whole allocation: groups it left out mustn't keep an old project
+            replace_all=True,
+            cohort=cohort
         )
+        # who is in each group, for the unikey/tutor lookups
+        members = allocation_index.members_of(groups_data or [], allocations)
+        save_load.save_allocation_members_to_db(members, cohort=cohort, replace_all=True)
+        allocation_index.index.apply_run(allocations, members, cohort)
 
-    if save_to_db and summary:
+    if summary:
         save_load.save_summary_to_db(
             summary,
             summary_table='"Allocation_Summary"',
             demand_table='"Project_Demand"',
             skill_table='"Skill_Coverage"',
-            replace_all=True
+            replace_all=True,
+            cohort=cohort
         )
 
+    if explanations:
+        save_load.save_explanations_to_db(explanations, replace_all=True, cohort=cohort)
+
+    if allocations:
+        # kept so later runs can be diffed against this one
+        run_history.record_run(allocations, summary or {}, len(groups_data or []), cohort)
+
+
+@profiling.profiled
+def match_projects(
+    groups_data: List[Group],
+    projects_table: str = save_load.PROJECTS_TABLE,
+    save_to_db: bool = True,
+    explain_top_k: int = EXPLAIN_TOP_K,
+    aggregates: Optional[Dict[str, Any]] = None,
+    cohort: Optional[str] = None
+) -> Dict[str, Any]:
+
+    metrics.ALLOCATION_RUNS.inc()
+    with metrics.phase_timer("load_projects"):
+        PROJECTS = save_load.load_projects_from_db(projects_table)
+
+    result = assign_groups(groups_data, PROJECTS, explain_top_k=explain_top_k)
+    metrics.observe_phase("score", result["score_seconds"])
+    metrics.observe_phase("assign", result["assign_seconds"])
+
+    with metrics.phase_timer("summarise"):
+        summary = summarise(groups_data, PROJECTS, result["allocations"], result["components"], aggregates)
+
+    if save_to_db:
+        with metrics.phase_timer("persist"):
+            persist(result["allocations"], summary, result["explanations"], groups_data, cohort)
+
     # added both allocation and summary making the output better/detailed and mainly for dashboard.
     return {
-        "allocations": allocations,
-        "summary": summary
+        "allocations": result["allocations"],
+        "summary": summary,
+        "explanations": result["explanations"]
     }
-
@@ -0,0 +1,180 @@
+# app/allocation_index.py
+# in-memory lookup of saved allocations: unikey -> group -> project, plus project and tutor
+# lists, so results-day reads ("what did I get?") are dictionary lookups instead of queries.
+# The index holds the current cohort; lookup() reads any other cohort from its tables. A run saved in this process updates the index straight away;
+# other workers notice through the "allocations:<cohort>" version row save_load bumps, checked at
+# most once per CACHE_TTL_SECONDS, and reload from the cohort's "Allocation_Results" partition
+# joined with its "Allocation_Members" partition.
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from app.models import Group
+from app import save_load
+from data.cohorts import current_cohort
+
+
+class AllocationIndex:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._version: Optional[int] = None
+        self._cohort: Optional[str] = None
+        self._checked = 0.0
+        self._reset()
+
+    def _reset(self) -> None:
+        self.project_by_group: Dict[str, str] = {}
+        self.members_by_group: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self.group_by_unikey: Dict[str, str] = {}
+        self.groups_by_project: Dict[str, Set[str]] = {}
+        self.groups_by_tutor: Dict[str, Set[str]] = {}
+
+    # --- building ---
+    def _set_project(self, group_id: str, project_id: str) -> None:
+        old = self.project_by_group.get(group_id)
+        if old is not None and old != project_id:
+            self.groups_by_project.get(old, set()).discard(group_id)
+        self.project_by_group[group_id] = project_id
+        self.groups_by_project.setdefault(project_id, set()).add(group_id)
+
+    def _set_member(self, group_id: str, member: Dict[str, Any]) -> None:
+        unikey = member["unikey"]
+        old_group = self.group_by_unikey.get(unikey)
+        if old_group is not None and old_group != group_id:
+            self.members_by_group.get(old_group, {}).pop(unikey, None)
+        self.group_by_unikey[unikey] = group_id
+        self.members_by_group.setdefault(group_id, {})[unikey] = member
+        if member.get("tutor_code"):
+            self.groups_by_tutor.setdefault(member["tutor_code"], set()).add(group_id)
+
+    def _load_rows(self, rows: Iterable[Dict[str, Any]]) -> None:
+        self._reset()
+        for row in rows:
+            self._set_project(row["group_id"], row["project_id"])
+            if row.get("unikey"):
+                self._set_member(row["group_id"], {
+                    "unikey": row["unikey"],
+                    "student_id": row.get("student_id"),
+                    "name": row.get("name"),
+                    "tutor_code": row.get("tutor_code"),
+                })
+
+    def apply_run(self, allocations: Dict[str, str], members: List[Dict[str, Any]], cohort: str) -> None:
+        """Take a just-saved run as the whole allocation (saves replace the cohort's rows)"""
+        if self._version is None or cohort != self._cohort:
+            return  # not the cohort held here; the next lookup reads it from the DB
+        # the version query stays outside the lock, so lookups aren't held up by the DB
+        version = save_load.cache_version(f"allocations:{cohort}")
+        with self._lock:
+            if cohort != self._cohort:
+                return
+            self._reset()
+            for gid, pid in allocations.items():
+                self._set_project(gid, pid)
+            for member in members:
+                self._set_member(member["group_id"], {k: v for k, v in member.items() if k != "group_id"})
+            self._version = version
+            self._checked = time.monotonic()
+
+    def ensure_fresh(self) -> None:
+        now = time.monotonic()
+        cohort = current_cohort()
+        if (
+            self._version is not None and cohort == self._cohort
+            and now - self._checked < save_load.CACHE_TTL_SECONDS
+        ):
+            return
+        version = save_load.cache_version(f"allocations:{cohort}")
+        if version == self._version and cohort == self._cohort:
+            self._checked = now
+            return
+        rows = save_load.load_allocation_rows(cohort=cohort)
+        with self._lock:
+            self._load_rows(rows)
+            self._version = version
+            self._cohort = cohort
+            self._checked = now
+
+    # --- reading ---
+    def _entry(self, group_id: str) -> Dict[str, Any]:
+        return {
+            "group_id": group_id,
+            "project_id": self.project_by_group[group_id],
+            "members": [dict(m) for m in self.members_by_group.get(group_id, {}).values()],
+        }
+
+    def lookup(
+        self,
+        group_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        unikey: Optional[str] = None,
+        tutor_code: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        self.ensure_fresh()
+        return self.find(group_id=group_id, project_id=project_id, unikey=unikey, tutor_code=tutor_code)
+
+    def find(
+        self,
+        group_id: Optional[str] = None,
+        project_id: Optional[str] = None,
+        unikey: Optional[str] = None,
+        tutor_code: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """lookup over what's loaded, without checking for newer runs"""
+        with self._lock:
+            filters: List[Set[str]] = []
+            if unikey is not None:
+                gid = self.group_by_unikey.get(unikey)
+                filters.append({gid} if gid is not None else set())
+            if group_id is not None:
+                filters.append({group_id} if group_id in self.project_by_group else set())
+            if project_id is not None:
+                filters.append(self.groups_by_project.get(project_id, set()))
+            if tutor_code is not None:
+                filters.append(self.groups_by_tutor.get(tutor_code, set()))
+
+            candidates: Optional[Set[str]] = None
+            # smallest set first so the intersection stays cheap
+            for found in sorted(filters, key=len):
+                candidates = set(found) if candidates is None else candidates & found
+                if not candidates:
+                    return []
+
+            if candidates is None:
+                return [self._entry(gid) for gid in sorted(self.project_by_group)]
+            return [self._entry(gid) for gid in sorted(candidates)]
+
+    def for_unikey(self, unikey: str) -> Optional[Dict[str, Any]]:
+        found = self.lookup(unikey=unikey)
+        return found[0] if found else None
+
+
+def lookup(cohort: str, **filters) -> List[Dict[str, Any]]:
+    """index.lookup for any cohort: the current one from the index, older ones read from their tables"""
+    if cohort == current_cohort():
+        return index.lookup(**filters)
+    past = AllocationIndex()
+    past._load_rows(save_load.load_allocation_rows(cohort=cohort))
+    return past.find(**filters)
+
+
+def members_of(groups_data: List[Group], allocations: Dict[str, str]) -> List[Dict[str, Any]]:
+    # member rows for every allocated group
+    members = []
+    for group in groups_data:
+        if group.group_id not in allocations:
+            continue
+        for student in group.students:
+            if not student.unikey:
+                continue
+            members.append({
+                "unikey": student.unikey,
+                "group_id": group.group_id,
+                "student_id": str(student.student_id),
+                "name": student.name,
+                "tutor_code": student.tutor_code,
+            })
+    return members
+
+
+index = AllocationIndex()
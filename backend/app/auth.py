@@ -0,0 +1,226 @@
+# app/auth.py
+# logins and sessions. users.json is loaded once into a username-keyed directory of salted PBKDF2
+# hashes (entries that still carry a plaintext "password" are hashed as they're loaded, see
+# data/hash_users.py to rewrite the file) and reloaded when the file changes. An entry can carry
+# the "unikey" of the student it belongs to; shared logins (the shipped "student1") have none.
+#
+# A session is a signed, expiring cookie: base64url(json {"u", "r", "exp"}) "." base64url(HMAC-SHA256).
+# Checking one needs no file or database, and decoded sessions are cached by cookie value, so a
+# repeat request costs a dict lookup and an expiry check.
+#   SESSION_SECRET            comma-separated signing keys: the first signs, all of them verify (for
+#                             rotation). Required on Vercel (VERCEL is set) or with
+#                             SESSION_SECRET_REQUIRED=1: separate instances share no disk, so each
+#                             would sign with its own key. Missing there, the app still starts (so
+#                             /health answers) but logs an error, refuses logins with a 503 and
+#                             accepts no session cookie. Otherwise, unset: one is generated into
+#                             data/.session_secret, which every worker on the host then shares; if
+#                             that file can't be written (read-only disk) the key lives in memory and
+#                             sessions don't survive a restart or carry over to other workers
+#   SESSION_TTL               seconds a session lasts (default 8 hours)
+#   PASSWORD_HASH_ITERATIONS  PBKDF2 rounds for new hashes (default 600000)
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from http.cookies import SimpleCookie
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.file_signature import file_signature
+
+USERS_PATH = Path(__file__).parent.parent / "data" / "users.json"
+SECRET_PATH = Path(__file__).parent.parent / "data" / ".session_secret"
+
+SESSION_COOKIE = "session"
+SESSION_TTL = int(os.getenv("SESSION_TTL", str(8 * 3600)))
+HASH_ITERATIONS = int(os.getenv("PASSWORD_HASH_ITERATIONS", "600000"))
+# decoded sessions kept; an evicted one is just verified again
+SESSION_CACHE_SIZE = 10000
+
+
+# --- password hashes: "pbkdf2_sha256$<iterations>$<salt>$<hash>" ---
+def hash_password(password: str, iterations: int = HASH_ITERATIONS, salt: Optional[bytes] = None) -> str:
+    salt = salt or secrets.token_bytes(16)
+    digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), salt, iterations)
+    return f"pbkdf2_sha256${iterations}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password: str, encoded: str) -> bool:
+    try:
+        scheme, iterations, salt, expected = encoded.split("$")
+        if scheme != "pbkdf2_sha256":
+            return False
+        digest = hashlib.pbkdf2_hmac("sha256", password.encode("utf-8"), _unb64(salt), int(iterations))
+    except ValueError:
+        return False
+    return hmac.compare_digest(digest, _unb64(expected))
+
+
+class UserDirectory:
+    def __init__(self, path: Path = USERS_PATH) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._users: Dict[str, Dict[str, str]] = {}
+        # checked against unknown usernames so they take as long as a wrong password; made on the
+        # first one, not at import
+        self._dummy_hash: Optional[str] = None
+
+    def _refresh(self) -> None:
+        signature = file_signature(self.path)
+        if signature == self._signature:
+            return
+        with self._lock:
+            if signature == self._signature:
+                return
+            users: Dict[str, Dict[str, str]] = {}
+            if signature is not None:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    entries = json.load(f)
+                for entry in entries:
+                    users[entry["username"]] = {
+                        "username": entry["username"],
+                        "role": entry["role"],
+                        "password_hash": entry.get("password_hash") or hash_password(entry.get("password", "")),
+                        # the student this login belongs to, if any (see unikey_of)
+                        "unikey": entry.get("unikey"),
+                    }
+            self._users = users
+            self._signature = signature
+
+    def get(self, username: str) -> Optional[Dict[str, str]]:
+        self._refresh()
+        return self._users.get(username)
+
+    def unikey_of(self, username: str) -> Optional[str]:
+        """The unikey a login is linked to by its users.json "unikey" field (None: not a student's own)"""
+        user = self.get(username)
+        return user["unikey"] if user is not None else None
+
+    def authenticate(self, username: str, password: str) -> Optional[Dict[str, str]]:
+        """{"username", "role"} if the password matches, else None"""
+        user = self.get(username)
+        if user is None:
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password(secrets.token_hex(8))
+            verify_password(password, self._dummy_hash)
+            return None
+        if not verify_password(password, user["password_hash"]):
+            return None
+        return {"username": user["username"], "role": user["role"]}
+
+
+class SessionsUnavailable(RuntimeError):
+    """No signing key: sessions can't be issued (see _load_keys)"""
+
+
+class SessionSigner:
+    def __init__(self, keys: List[bytes], ttl: int = SESSION_TTL) -> None:
+        # no keys: nothing is issued and no cookie verifies, the rest of the app still serves
+        self.keys = keys
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[Dict[str, str], float]]" = OrderedDict()
+
+    def _sign(self, key: bytes, payload: str) -> str:
+        return _b64(hmac.new(key, payload.encode("ascii"), hashlib.sha256).digest())
+
+    @property
+    def available(self) -> bool:
+        return bool(self.keys)
+
+    def issue(self, username: str, role: str) -> str:
+        if not self.keys:
+            raise SessionsUnavailable("SESSION_SECRET isn't set")
+        body = json.dumps({"u": username, "r": role, "exp": int(time.time()) + self.ttl}, separators=(",", ":"))
+        payload = _b64(body.encode("utf-8"))
+        return f"{payload}.{self._sign(self.keys[0], payload)}"
+
+    def verify(self, token: Optional[str]) -> Optional[Dict[str, str]]:
+        """{"username", "role"} for a valid, unexpired session cookie, else None"""
+        if not token or not self.keys:
+            return None
+        now = time.time()
+        with self._lock:
+            hit = self._cache.get(token)
+            if hit is not None:
+                if hit[1] > now:
+                    self._cache.move_to_end(token)
+                    return dict(hit[0])
+                del self._cache[token]
+                return None
+
+        payload, _, signature = token.partition(".")
+        try:
+            if not any(
+                hmac.compare_digest(signature.encode("ascii"), self._sign(key, payload).encode("ascii"))
+                for key in self.keys
+            ):
+                return None
+            data = json.loads(_unb64(payload))
+            user, expires = {"username": data["u"], "role": data["r"]}, float(data["exp"])
+        except (ValueError, KeyError, TypeError):
+            return None
+        if expires <= now:
+            return None
+
+        with self._lock:
+            self._cache[token] = (user, expires)
+            if len(self._cache) > SESSION_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return dict(user)
+
+
+def _load_keys() -> List[bytes]:
+    """Signing keys; none (logins refused, see SessionSigner) if they can't be had, rather than failing the import"""
+    configured = [k.strip() for k in os.getenv("SESSION_SECRET", "").split(",") if k.strip()]
+    if configured:
+        return [k.encode("utf-8") for k in configured]
+    if os.getenv("VERCEL") or os.getenv("SESSION_SECRET_REQUIRED", "0") == "1":
+        print("ERROR: SESSION_SECRET must be set: instances here don't share a disk to keep a generated key on. "
+              "Logins are refused until it is.")
+        return []
+    try:
+        fd = os.open(SECRET_PATH, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        # another worker may have created it a moment ago and not written it yet
+        for _ in range(50):
+            secret = SECRET_PATH.read_text(encoding="utf-8").strip()
+            if secret:
+                return [secret.encode("utf-8")]
+            time.sleep(0.02)
+        print(f"ERROR: {SECRET_PATH} is empty; delete it or set SESSION_SECRET. Logins are refused until then.")
+        return []
+    except OSError as e:
+        print(f"Warning: can't create {SECRET_PATH} ({e}); using a per-process session key, set SESSION_SECRET")
+        return [secrets.token_urlsafe(32).encode("utf-8")]
+    secret = secrets.token_urlsafe(32)
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(secret)
+    return [secret.encode("utf-8")]
+
+
+def _b64(raw: bytes) -> str:
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _unb64(text: str) -> bytes:
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def user_from_scope(scope) -> Optional[Dict[str, str]]:
+    """The session user of a raw ASGI request, for middleware that runs before there's a Request"""
+    for name, value in scope.get("headers", ()):
+        if name == b"cookie":
+            morsel = SimpleCookie(value.decode("latin-1")).get(SESSION_COOKIE)
+            return sessions.verify(morsel.value if morsel else None)
+    return None
+
+
+directory = UserDirectory()
+sessions = SessionSigner(_load_keys())
@@ -0,0 +1,344 @@
+# app/cohort_snapshot.py
+# a compiled, read-only copy of the scoring inputs (groups x projects) in one binary file that any
+# process can mmap and score from without parsing JSON, rebuilding Groups or normalising skills.
+# It's built from the cached Groups and the project list and named after a content key:
+#   sha256(students.json bytes, project rows, scoring tables, FORMAT_VERSION)
+# so it's only rebuilt when one of those changes, and a pool worker opening it by name always
+# gets the run it was asked about. Old files are pruned, the newest SNAPSHOT_KEEP stay, and each
+# process keeps at most SNAPSHOT_KEEP mappings open (a dropped mapping is unmapped once the last
+# run still scoring from it lets go). A file pruned from under a run that's still opening it is
+# the caller's to handle: decompose scores that chunk from its own mapping instead.
+#
+# Layout (native byte order, sections 8-byte aligned; the byte order is part of the magic):
+#   header   magic, version, key, counts, then (offset, bytes) for every section below
+#   skills   rating f64[skills]                       interned per snapshot, canonical names
+#   groups   wam_score f64, dual_term f64             per group (-0.0 wam: empty breakdown)
+#            skill_off u32[groups+1], skill i32[]     group skill IDs
+#            pref_off u32[groups+1],  pref i32[]      preferences in rank order as project
+#                                                     indices (-1: not in the project list)
+#   projects skill_off u32[projects+1], skill i32[]   required skill IDs, repeats kept
+#   strings  off u32[...+1], utf-8 blob               skill names, group IDs, project IDs
+#   COHORT_SNAPSHOT_DIR  where snapshot files live (default data/snapshots)
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import threading
+from array import array
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set
+
+from app.models import Group
+from app import algorithm, cohort_table, group_builder, scoring_helpers, skill_vocab
+
+FORMAT_VERSION = 1
+SNAPSHOT_DIR = Path(os.getenv("COHORT_SNAPSHOT_DIR", str(Path(__file__).parent.parent / "data" / "snapshots")))
+SNAPSHOT_KEEP = 3
+
+_MAGIC = b"CSN" + (b"L" if sys.byteorder == "little" else b"B")
+_HEADER = struct.Struct("<4sI32s6I")
+_SECTIONS = (
+    ("skill_rating", "d"),
+    ("group_wam", "d"),
+    ("group_dual", "d"),
+    ("group_skill_off", "I"),
+    ("group_skill", "i"),
+    ("group_pref_off", "I"),
+    ("group_pref", "i"),
+    ("project_skill_off", "I"),
+    ("project_skill", "i"),
+    ("string_off", "I"),
+    ("strings", "B"),
+)
+_SECTION_ENTRY = struct.Struct("<QQ")
+
+
+def content_key(students_raw: bytes, projects: List[Dict[str, Any]]) -> bytes:
+    h = hashlib.sha256()
+    h.update(f"cohort-snapshot:{FORMAT_VERSION}\0".encode())
+    h.update(students_raw)
+    h.update(b"\0")
+    h.update(json.dumps(
+        [[p["id"], list(p.get("required_skills") or ())] for p in projects], separators=(",", ":")
+    ).encode("utf-8"))
+    # the stored scores and skill IDs depend on these as much as on the data
+    h.update(json.dumps(
+        [scoring_helpers.skill_ratings, scoring_helpers.wam_weights, algorithm.WEIGHTS,
+         skill_vocab.ALIASES, skill_vocab.RATED_ALIASES],
+        sort_keys=True,
+    ).encode("utf-8"))
+    return h.digest()
+
+
+# --- writing ---
+def build(path: Path, key: bytes, groups: List[Group], projects: List[Dict[str, Any]]) -> None:
+    skill_index: Dict[str, int] = {}
+
+    def local_skill(name: str) -> int:
+        # scoring matches skills by the rated name they count as (scoring_helpers)
+        name = skill_vocab.rated(name)
+        sid = skill_index.get(name)
+        if sid is None:
+            sid = skill_index[name] = len(skill_index)
+        return sid
+
+    project_index = {}
+    for pi, p in enumerate(projects):
+        project_index.setdefault(p["id"], pi)
+
+    sections: Dict[str, array] = {name: array(fmt) for name, fmt in _SECTIONS}
+    s = sections
+    s["group_skill_off"].append(0)
+    s["group_pref_off"].append(0)
+    for group in groups:
+        wam = scoring_helpers.calculate_wam_score(group.wam_breakdown)
+        # -0.0 stands for the int 0 returned for an empty breakdown, so results serialise the same
+        s["group_wam"].append(-0.0 if wam == 0 and isinstance(wam, int) else wam)
+        s["group_dual"].append(algorithm.WEIGHTS["dual_group"] if group.dual_project_enrollment else 0.0)
+        s["group_skill"].extend(sorted({local_skill(k) for k in group.skills}))
+        s["group_skill_off"].append(len(s["group_skill"]))
+        s["group_pref"].extend(project_index.get(pid, -1) for pid in group.project_preferences)
+        s["group_pref_off"].append(len(s["group_pref"]))
+
+    s["project_skill_off"].append(0)
+    for p in projects:
+        s["project_skill"].extend(local_skill(k) for k in p.get("required_skills") or ())
+        s["project_skill_off"].append(len(s["project_skill"]))
+
+    skill_names = list(skill_index)
+    s["skill_rating"].extend(float(scoring_helpers.skill_ratings.get(n, 0)) for n in skill_names)
+
+    blob = bytearray()
+    s["string_off"].append(0)
+    for text in [*skill_names, *(g.group_id for g in groups), *(str(p["id"]) for p in projects)]:
+        blob += text.encode("utf-8")
+        s["string_off"].append(len(blob))
+    s["strings"].frombytes(bytes(blob))
+
+    counts = (len(skill_names), len(groups), len(projects),
+              len(s["group_skill"]), len(s["group_pref"]), len(s["project_skill"]))
+    offset = _HEADER.size + _SECTION_ENTRY.size * len(_SECTIONS)
+    table, payload = [], []
+    for name, _ in _SECTIONS:
+        offset += -offset % 8
+        data = s[name].tobytes()
+        table.append(_SECTION_ENTRY.pack(offset, len(data)))
+        payload.append((offset, data))
+        offset += len(data)
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, FORMAT_VERSION, key, *counts))
+        f.write(b"".join(table))
+        for start, data in payload:
+            f.write(b"\0" * (start - f.tell()))
+            f.write(data)
+    os.replace(tmp, path)
+
+
+# --- reading ---
+class CohortSnapshot:
+    """One snapshot file mapped read-only; the arrays are memoryviews straight onto the mapping"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        magic, version, self.key, *counts = _HEADER.unpack_from(view, 0)
+        if magic != _MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} snapshot for this platform")
+        self.n_skills, self.n_groups, self.n_projects = counts[:3]
+
+        for i, (name, fmt) in enumerate(_SECTIONS):
+            start, size = _SECTION_ENTRY.unpack_from(view, _HEADER.size + i * _SECTION_ENTRY.size)
+            setattr(self, name, view[start:start + size].cast(fmt))
+        self._group_ids: Optional[List[str]] = None
+        self._project_ids: Optional[List[str]] = None
+
+    def _string(self, i: int) -> str:
+        return bytes(self.strings[self.string_off[i]:self.string_off[i + 1]]).decode("utf-8")
+
+    def group_id(self, gi: int) -> str:
+        return self._string(self.n_skills + gi)
+
+    def project_id(self, pi: int) -> str:
+        return self._string(self.n_skills + self.n_groups + pi)
+
+    def group_ids(self) -> List[str]:
+        if self._group_ids is None:
+            self._group_ids = [self.group_id(gi) for gi in range(self.n_groups)]
+        return self._group_ids
+
+    def project_ids(self) -> List[str]:
+        if self._project_ids is None:
+            self._project_ids = [self.project_id(pi) for pi in range(self.n_projects)]
+        return self._project_ids
+
+    def assign(
+        self,
+        group_indices: Sequence[int],
+        project_indices: Sequence[int],
+        assigned: Iterable[int] = (),
+        explain_top_k: int = algorithm.EXPLAIN_TOP_K,
+    ) -> Dict[str, Any]:
+        """algorithm.assign_groups over snapshot indices: same scores, same result shape (IDs)"""
+        weights = algorithm.WEIGHTS
+        w_pref, w_skills, w_wam = weights["preference"], weights["skills"], weights["wam"]
+        rating, pref_off, prefs = self.skill_rating, self.group_pref_off, self.group_pref
+        gskill_off, gskills = self.group_skill_off, self.group_skill
+        pskill_off, pskills = self.project_skill_off, self.project_skill
+
+        taken: Set[int] = set(assigned)
+        project_ids = [self.project_id(pi) for pi in project_indices]
+        # required skills and their score denominator per project, unpacked once for the whole chunk
+        required = [
+            (tuple(pskills[pskill_off[pi]:pskill_off[pi + 1]]), (pskill_off[pi + 1] - pskill_off[pi]) * 5)
+            for pi in project_indices
+        ]
+
+        allocations: Dict[str, str] = {}
+        components: Dict[str, Any] = {}
+        explanations: Dict[str, Any] = {}
+        for gi in group_indices:
+            gid = self.group_id(gi)
+            start, end = pref_off[gi], pref_off[gi + 1]
+            rank_score: Dict[int, float] = {}
+            for rank in range(end - start):
+                pi = prefs[start + rank]
+                if pi >= 0 and pi not in rank_score:
+                    rank_score[pi] = 1 - (rank / (end - start))
+            have = set(gskills[gskill_off[gi]:gskill_off[gi + 1]])
+            wam = self.group_wam[gi]
+            if wam == 0 and math.copysign(1, wam) < 0:
+                wam = 0
+            dual = self.group_dual[gi] or 0
+
+            best_project = None
+            best_score = -1
+            best_components = None
+            candidates = []
+            for k, pi in enumerate(project_indices):
+                if pi in taken:
+                    continue
+                pref = rank_score.get(pi, 0)
+                skills_needed, max_score = required[k]
+                if max_score:
+                    score = 0
+                    for sid in skills_needed:
+                        if sid in have:
+                            score += rating[sid]
+                    skills = score / max_score
+                else:
+                    skills = 0
+                total = pref * w_pref + skills * w_skills + wam * w_wam + dual
+                candidates.append((total, k, pref, skills, wam, dual))
+                if total > best_score:
+                    best_score = total
+                    best_project = k
+                    best_components = (pref, skills, wam)
+
+            if explain_top_k > 0:
+                explanations[gid] = [
+                    {
+                        "rank": rank,
+                        "project_id": project_ids[k],
+                        "total_score": round(total, 4),
+                        "preference_score": round(pref, 4),
+                        "skills_score": round(skills, 4),
+                        "wam_score": round(wam, 4),
+                        "dual_penalty": dual,
+                    }
+                    for rank, (total, k, pref, skills, wam, dual) in enumerate(
+                        algorithm.heapq.nlargest(explain_top_k, candidates, key=algorithm.itemgetter(0)), start=1
+                    )
+                ]
+            if best_project is not None:
+                allocations[gid] = project_ids[best_project]
+                taken.add(project_indices[best_project])
+                components[gid] = best_components
+
+        return {"allocations": allocations, "components": components, "explanations": explanations}
+
+    def close(self) -> None:
+        for name, _ in _SECTIONS:
+            getattr(self, name).release()
+        self._mmap.close()
+
+
+# --- finding / building the snapshot for a run ---
+_open_lock = threading.Lock()
+# most recently used last; dropping an entry doesn't close it under a run that's still using it
+_open: "OrderedDict[str, CohortSnapshot]" = OrderedDict()
+
+
+def snapshot_path(key: bytes) -> Path:
+    return SNAPSHOT_DIR / f"cohort-{key.hex()[:24]}.snap"
+
+
+def open_snapshot(path: Path) -> CohortSnapshot:
+    """Mapped once per process (pool workers keep theirs between runs)"""
+    name = str(path)
+    with _open_lock:
+        snap = _open.get(name)
+        if snap is None:
+            snap = _open[name] = CohortSnapshot(path)
+            while len(_open) > SNAPSHOT_KEEP:
+                _open.popitem(last=False)
+        else:
+            _open.move_to_end(name)
+        return snap
+
+
+def ensure(key: bytes, groups: List[Group], projects: List[Dict[str, Any]]) -> CohortSnapshot:
+    path = snapshot_path(key)
+    if not path.exists():
+        build(path, key, groups, projects)
+        _prune(keep=path)
+    snap = open_snapshot(path)
+    if snap.key != key:
+        raise ValueError(f"{path} holds a different snapshot")
+    return snap
+
+
+def for_groups(groups_data: List[Group], projects: List[Dict[str, Any]]) -> Optional[CohortSnapshot]:
+    """The snapshot for these exact groups, if they are group_builder's cached ones (anything
+    else - a filtered or hand-built list - gets None and is scored the usual way)"""
+    version, cached = group_builder.cache_state()
+    if (
+        version is None
+        or len(cached) != len(groups_data)
+        or any(a is not b for a, b in zip(groups_data, cached))
+    ):
+        return None
+    path = version[0]
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    # the file may have changed since the groups were built; then these bytes aren't theirs
+    table = cohort_table.get_table(path)
+    if (path, table.version) != version:
+        return None
+    return ensure(content_key(raw, projects), groups_data, projects)
+
+
+def _prune(keep: Path) -> None:
+    files = []
+    for path in SNAPSHOT_DIR.glob("cohort-*.snap"):
+        try:
+            files.append((path.stat().st_mtime, path))
+        except FileNotFoundError:
+            continue  # another process pruned it first
+    files.sort(key=lambda entry: entry[0], reverse=True)
+    for _, old in files[SNAPSHOT_KEEP:]:
+        if old != keep:
+            # mapped copies elsewhere stay valid until they're closed
+            old.unlink(missing_ok=True)
+            with _open_lock:
+                _open.pop(str(old), None)
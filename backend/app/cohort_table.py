@@ -0,0 +1,279 @@
+# app/cohort_table.py
+# the submitted cohort held column by column instead of one dict per student.
+# IDs and WAM live in typed arrays, names and unikeys are packed into one utf-8 buffer each,
+# unit/tutor/group codes are interned once and stored as small integer codes, and a group's skills
+# and preferences are stored once as shared tuples that every member row points at. Rows come back
+# out as students.json-shaped dicts on demand.
+#
+# The table is built from students.json once and kept in step like submission_stats: submissions
+# are appended to it in place, and it's reloaded when the file signature changes under us. Rows
+# only ever get added, and len() counts a batch only once all of its columns are written, so a
+# reader on another thread that takes n = len(table) first and stays below row n sees a consistent
+# table however many rows arrive meanwhile. shared.lock is held by the submission writer from
+# replacing the file until the table is in step, and by anything reloading from the file, so
+# nobody reads the new file before its records have been accounted for.
+import itertools
+import json
+import math
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app import skill_vocab
+from app.file_signature import STALE, file_signature
+
+STUDENTS_PATH = Path(__file__).parent.parent / "data" / "students.json"
+
+# student IDs that aren't plain integers (leading zeros, letters, more than int64 holds) go in a
+# side dict
+_NO_ID = -1
+_MAX_ID = 2**63 - 1
+
+
+class _Codes:
+    """value <-> small int; code -1 stands for None"""
+
+    def __init__(self) -> None:
+        self.values: List[Any] = []
+        self.index: Dict[Any, int] = {}
+
+    def code(self, value: Any) -> int:
+        if value is None:
+            return -1
+        code = self.index.get(value)
+        if code is None:
+            code = self.index[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def value(self, code: int) -> Any:
+        return None if code < 0 else self.values[code]
+
+
+class _Strings:
+    """a column of distinct-per-row strings packed into one utf-8 buffer plus end offsets"""
+
+    def __init__(self) -> None:
+        self.data = bytearray()
+        self.ends = array("q")
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def append(self, value: str) -> None:
+        self.data += value.encode("utf-8")
+        self.ends.append(len(self.data))
+
+    def __getitem__(self, row: int) -> str:
+        start = self.ends[row - 1] if row else 0
+        return self.data[start:self.ends[row]].decode("utf-8")
+
+
+class CohortTable:
+    def __init__(self) -> None:
+        self.student_id = array("q")
+        self._odd_ids: Dict[int, str] = {}
+        self.wam = array("d")
+        self.dual = bytearray()
+        self.name = _Strings()
+        self.unikey = _Strings()
+        self.unit_code = array("i")
+        self.tutor_code = array("i")
+        self.group_id = array("i")
+        self.skills = array("i")
+        self.preferences = array("i")
+
+        self.units = _Codes()
+        self.tutors = _Codes()
+        self.groups = _Codes()
+        # shared tuple storage: every member of a group points at the same tuple
+        self.skill_sets = _Codes()
+        self.preference_lists = _Codes()
+        # canonical (skill_vocab) form of each skill set, filled in as they're first asked for
+        self._canonical_skills: List[Tuple[str, ...]] = []
+        self._canonical_lock = threading.Lock()
+        self._atom_index: Dict[Any, Any] = {}
+
+        # rows readers may see; the columns can be ahead of it while a batch is being added
+        self._rows = 0
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    # --- building (single writer: the loader, or the submission writer under shared.lock) ---
+    def _append(self, record: Dict[str, Any]) -> None:
+        row = len(self.wam)
+        sid = record.get("student_id")
+        text = "" if sid is None else str(sid)
+        if text.isascii() and text.isdigit() and str(int(text)) == text and int(text) <= _MAX_ID:
+            self.student_id.append(int(text))
+        else:
+            self.student_id.append(_NO_ID)
+            self._odd_ids[row] = text
+
+        wam = record.get("wam")
+        try:
+            self.wam.append(float(wam))
+        except (TypeError, ValueError):
+            self.wam.append(math.nan)
+        self.dual.append(1 if record.get("dual_project_enrollment") else 0)
+        self.name.append(record.get("name") or "")
+        self.unikey.append(record.get("unikey") or "")
+        self.unit_code.append(self.units.code(record.get("unit_code")))
+        self.tutor_code.append(self.tutors.code(record.get("tutor_code")))
+        self.group_id.append(self.groups.code(record.get("group_id")))
+        skills = record.get("skills") or ()
+        self.skills.append(self.skill_sets.code(skills if isinstance(skills, str) else self._atoms(skills)))
+        self.preferences.append(self.preference_lists.code(self._atoms(record.get("project_preferences") or ())))
+
+    def _atoms(self, values: Iterable[Any]) -> Tuple[Any, ...]:
+        # project IDs / skill names repeat across thousands of groups; keep one copy of each
+        return tuple(self._atom_index.setdefault(v, v) for v in values)
+
+    def extend(self, records: Iterable[Dict[str, Any]]) -> None:
+        """Add records in place; readers see them all at once, when the row count moves"""
+        for record in records:
+            self._append(record)
+        self._rows = len(self.wam)
+        self.version += 1
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "CohortTable":
+        table = cls()
+        table.extend(records)
+        return table
+
+    # --- reading ---
+    def student_id_at(self, row: int) -> str:
+        sid = self.student_id[row]
+        return self._odd_ids.get(row, "") if sid == _NO_ID else str(sid)
+
+    def wam_at(self, row: int) -> Optional[float]:
+        wam = self.wam[row]
+        return None if math.isnan(wam) else wam
+
+    def skills_at(self, row: int) -> Tuple[str, ...]:
+        """canonical skills for the row (the raw submitted ones come back from record())"""
+        return self.canonical_skills(self.skills[row])
+
+    def canonical_skills(self, code: int) -> Tuple[str, ...]:
+        canonical = self._canonical_skills
+        if code >= len(canonical):
+            # readers on several threads may fill this in at once
+            with self._canonical_lock:
+                while len(canonical) <= code:
+                    canonical.append(tuple(skill_vocab.parse_skills(self.skill_sets.values[len(canonical)])))
+        return canonical[code]
+
+    def preferences_at(self, row: int) -> Tuple[str, ...]:
+        return self.preference_lists.values[self.preferences[row]]
+
+    def group_key_at(self, row: int) -> str:
+        # same rule as group_builder.group_key: no group means a group of one
+        group = self.groups.value(self.group_id[row])
+        return str(group) if group else self.student_id_at(row)
+
+    def record(self, row: int) -> Dict[str, Any]:
+        """students.json-shaped dict for one row (fresh lists, safe to modify)"""
+        return {
+            "name": self.name[row],
+            "student_id": self.student_id_at(row),
+            "unikey": self.unikey[row],
+            "unit_code": self.units.value(self.unit_code[row]),
+            "wam": self.wam_at(row),
+            "group_id": self.groups.value(self.group_id[row]),
+            "tutor_code": self.tutors.value(self.tutor_code[row]),
+            "dual_project_enrollment": bool(self.dual[row]),
+            "skills": _raw_list(self.skill_sets.values[self.skills[row]]),
+            "project_preferences": list(self.preferences_at(row)),
+        }
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self)):
+            yield self.record(row)
+
+    def group_rows(self) -> Dict[str, List[int]]:
+        """group key -> row numbers, groups in first-seen order"""
+        groups: Dict[str, List[int]] = {}
+        for row in range(len(self)):
+            groups.setdefault(self.group_key_at(row), []).append(row)
+        return groups
+
+    def count_by(self, column: str) -> Dict[Any, int]:
+        """row counts per value of an interned column (unit_code, tutor_code, group_id)"""
+        codes = {"unit_code": self.unit_code, "tutor_code": self.tutor_code, "group_id": self.group_id}[column]
+        interned = {"unit_code": self.units, "tutor_code": self.tutors, "group_id": self.groups}[column]
+        n = len(self)
+        counts = [0] * (len(interned.values) + 1)
+        for code in itertools.islice(codes, n):
+            counts[code] += 1  # None (-1) lands in the extra last slot
+        out = {interned.values[i]: n for i, n in enumerate(counts[:-1]) if n}
+        if counts[-1]:
+            out[None] = counts[-1]
+        return out
+
+
+def _raw_list(value):
+    return value if isinstance(value, str) else list(value)
+
+
+# --- the shared table per students file ---
+class _SharedTables:
+    def __init__(self) -> None:
+        self.lock = threading.RLock()
+        self._tables: Dict[Path, Tuple[Optional[Tuple[int, int]], CohortTable]] = {}
+
+    def get(self, path: Path = STUDENTS_PATH) -> CohortTable:
+        path = Path(path)
+        entry = self._tables.get(path)
+        if entry is not None and entry[0] == file_signature(path):
+            return entry[1]
+
+        with self.lock:
+            # the writer may have been mid-commit: look again now that it's done
+            signature = file_signature(path)
+            entry = self._tables.get(path)
+            if entry is not None and entry[0] == signature:
+                return entry[1]
+
+            records = []
+            if path.exists():
+                raw = path.read_bytes()
+                try:
+                    records = json.loads(raw) if raw.strip() else []
+                except json.JSONDecodeError:
+                    records = []
+
+            table = CohortTable.from_records(records)
+            # versions keep counting up across reloads so caches keyed on them notice
+            table.version += entry[1].version if entry is not None else 0
+            self._tables[path] = (signature, table)
+            return table
+
+    def append(self, records: List[Dict[str, Any]], path: Path = STUDENTS_PATH) -> None:
+        """Add records we just wrote to the file ourselves (no reload needed); call with lock held"""
+        path = Path(path)
+        with self.lock:
+            entry = self._tables.get(path)
+            if entry is None:
+                self.get(path)  # not loaded yet: the file already has them
+                return
+            entry[1].extend(records)
+            self._tables[path] = (file_signature(path), entry[1])
+
+    def mark_stale(self, path: Path = STUDENTS_PATH) -> None:
+        """Reload from the file on next use (the writer put an older file back)"""
+        path = Path(path)
+        with self.lock:
+            entry = self._tables.get(path)
+            if entry is not None:
+                self._tables[path] = (STALE, entry[1])
+
+
+shared = _SharedTables()
+
+
+def get_table(path: Path = STUDENTS_PATH) -> CohortTable:
+    return shared.get(path)
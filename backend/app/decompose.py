@@ -0,0 +1,234 @@
+# app/decompose.py
+# a preference-restricted allocator that splits a run into independent pieces. It is NOT the greedy
+# engine run in parallel: algorithm.assign_groups lets every group take its best scoring free project
+# out of all of them, preferred or not, so in greedy any two groups can compete. Here a group is first
+# only offered the projects of its component of the group/project preference graph (connected
+# components by union-find): the projects it or groups sharing a preference with it listed. That
+# restriction is what makes components independent, so they are solved on a process pool and merged
+# back into one allocation and one summary.
+#
+# Groups a component can't place (more groups than projects in it) and groups with no valid
+# preferences are then given the leftover projects by the normal greedy pass, in the original order.
+# When the whole cohort is one component holding every project, the result is exactly greedy's;
+# otherwise it can differ (groups stay on projects reachable through preferences rather than
+# taking an unpreferred project greedy scores higher). test/test_decompose.py checks both.
+#
+# When the groups are the cached cohort (group_builder.load_groups), scoring reads the cohort
+# snapshot instead (app/cohort_snapshot.py): workers get the file name and index lists, map the
+# file and score from it, rather than being sent pickled Groups and re-deriving every score input.
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from app.models import Group
+from app import algorithm, cohort_snapshot, metrics, profiling, save_load
+
+# below this many groups the pool start-up costs more than it saves
+MIN_GROUPS_FOR_POOL = 2000
+
+
+class _UnionFind:
+    def __init__(self) -> None:
+        self.parent: Dict[Any, Any] = {}
+
+    def find(self, x):
+        parent = self.parent
+        parent.setdefault(x, x)
+        root = x
+        while parent[root] != root:
+            root = parent[root]
+        while parent[x] != root:
+            parent[x], x = root, parent[x]
+        return root
+
+    def union(self, a, b) -> None:
+        ra, rb = self.find(a), self.find(b)
+        if ra != rb:
+            self.parent[rb] = ra
+
+
+def _partition_key(group: Group, by: str) -> str:
+    # by="group": every group is its own node; by="unit_code"/"tutor_code": everyone in the same
+    # unit/tutorial is always solved together (keeps within-unit order effects as they were)
+    if by == "group" or not group.students:
+        return group.group_id
+    return getattr(group.students[0], by, None) or group.group_id
+
+
+def find_components(
+    groups_data: List[Group],
+    projects: List[Dict[str, Any]],
+    by: str = "group",
+) -> Dict[str, Any]:
+    """Connected components of the preference graph.
+
+    Returns {"components": [{"groups": [...], "projects": [...]}], "unconstrained": [...]},
+    groups and projects keeping their original order.
+    """
+    project_ids = {p["id"] for p in projects}
+    uf = _UnionFind()
+    unconstrained: List[Group] = []
+    group_roots: List[Any] = []
+
+    for group in groups_data:
+        node = ("key", _partition_key(group, by))
+        prefs = [pid for pid in group.project_preferences if pid in project_ids]
+        if not prefs:
+            unconstrained.append(group)
+            group_roots.append(None)
+            continue
+        for pid in prefs:
+            uf.union(node, ("project", pid))
+        group_roots.append(node)
+
+    components: Dict[Any, Dict[str, List]] = {}
+    for group, node in zip(groups_data, group_roots):
+        if node is None:
+            continue
+        root = uf.find(node)
+        components.setdefault(root, {"groups": [], "projects": []})["groups"].append(group)
+
+    for project in projects:
+        node = ("project", project["id"])
+        if node in uf.parent:
+            root = uf.find(node)
+            if root in components:
+                components[root]["projects"].append(project)
+
+    return {"components": list(components.values()), "unconstrained": unconstrained}
+
+
+def _solve_chunk(chunk: List[Dict[str, Any]], explain_top_k: int) -> List[Dict[str, Any]]:
+    return [
+        algorithm.assign_groups(c["groups"], c["projects"], explain_top_k=explain_top_k)
+        for c in chunk
+    ]
+
+
+def _solve_chunk_snapshot(path: str, chunk: List[Dict[str, Any]], explain_top_k: int) -> List[Dict[str, Any]]:
+    snapshot = cohort_snapshot.open_snapshot(path)
+    return [snapshot.assign(c["groups"], c["projects"], explain_top_k=explain_top_k) for c in chunk]
+
+
+def _open_snapshot(groups_data: List[Group], projects: List[Dict[str, Any]]):
+    try:
+        return cohort_snapshot.for_groups(groups_data, projects)
+    except Exception as e:
+        print(f"Error preparing cohort snapshot: {e}")
+        return None
+
+
+def _chunk_components(components: List[Dict[str, Any]], workers: int) -> List[List[Dict[str, Any]]]:
+    # largest first onto the least loaded chunk; cost ~ groups x projects
+    chunks: List[List[Dict[str, Any]]] = [[] for _ in range(workers)]
+    loads = [0] * workers
+    for comp in sorted(components, key=lambda c: len(c["groups"]) * len(c["projects"]), reverse=True):
+        i = loads.index(min(loads))
+        chunks[i].append(comp)
+        loads[i] += len(comp["groups"]) * len(comp["projects"])
+    return [c for c in chunks if c]
+
+
+@profiling.profiled
+def match_projects_decomposed(
+    groups_data: List[Group],
+    projects_table: str = save_load.PROJECTS_TABLE,
+    save_to_db: bool = True,
+    explain_top_k: int = algorithm.EXPLAIN_TOP_K,
+    aggregates: Optional[Dict[str, Any]] = None,
+    by: str = "group",
+    max_workers: Optional[int] = None,
+    cohort: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Same inputs and result shape as algorithm.match_projects, solved per preference component.
+
+    Groups are first restricted to their component's projects, so this is a different allocator
+    from greedy (see the module comment), not a faster way to get the same allocation.
+    """
+    metrics.ALLOCATION_RUNS.inc()
+    with metrics.phase_timer("load_projects"):
+        projects = save_load.load_projects_from_db(projects_table)
+
+    score_start = time.perf_counter()
+    parts = find_components(groups_data, projects, by=by)
+    components = parts["components"]
+
+    snapshot = _open_snapshot(groups_data, projects)
+    if snapshot is not None:
+        # the same components as positions in the snapshot
+        group_pos = {id(g): i for i, g in enumerate(groups_data)}
+        project_pos = {id(p): i for i, p in enumerate(projects)}
+        work = [
+            {"groups": [group_pos[id(g)] for g in c["groups"]], "projects": [project_pos[id(p)] for p in c["projects"]]}
+            for c in components
+        ]
+    else:
+        work = components
+
+    workers = max(1, min(max_workers or os.cpu_count() or 1, len(components)))
+    if workers > 1 and len(groups_data) >= MIN_GROUPS_FOR_POOL:
+        chunks = _chunk_components(work, workers)
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            if snapshot is not None:
+                futures = [pool.submit(_solve_chunk_snapshot, str(snapshot.path), chunk, explain_top_k) for chunk in chunks]
+            else:
+                futures = [pool.submit(_solve_chunk, chunk, explain_top_k) for chunk in chunks]
+            results = []
+            for chunk, future in zip(chunks, futures):
+                try:
+                    results.extend(future.result())
+                except FileNotFoundError:
+                    if snapshot is None:
+                        raise
+                    # another run pruned the file before this worker mapped it; ours is still mapped
+                    results.extend(snapshot.assign(c["groups"], c["projects"], explain_top_k=explain_top_k) for c in chunk)
+    elif snapshot is not None:
+        results = [snapshot.assign(c["groups"], c["projects"], explain_top_k=explain_top_k) for c in work]
+    else:
+        results = _solve_chunk(components, explain_top_k)
+
+    allocations: Dict[str, str] = {}
+    best_components: Dict[str, Any] = {}
+    explanations: Dict[str, Any] = {}
+    for r in results:
+        allocations.update(r["allocations"])
+        best_components.update(r["components"])
+        explanations.update(r["explanations"])
+
+    # leftovers: the greedy pass over whatever projects are still free, in the original order
+    leftover = [gi for gi, g in enumerate(groups_data) if g.group_id not in allocations]
+    if leftover:
+        taken = set(allocations.values())
+        if snapshot is not None:
+            r = snapshot.assign(
+                leftover, range(len(projects)),
+                assigned=[pi for pi, p in enumerate(projects) if p["id"] in taken],
+                explain_top_k=explain_top_k,
+            )
+        else:
+            r = algorithm.assign_groups(
+                [groups_data[gi] for gi in leftover], projects, assigned_projects=taken, explain_top_k=explain_top_k
+            )
+        allocations.update(r["allocations"])
+        best_components.update(r["components"])
+        for gid, candidates in r["explanations"].items():
+            explanations.setdefault(gid, candidates)
+
+    # keep the caller's group order in the merged result
+    allocations = {g.group_id: allocations[g.group_id] for g in groups_data if g.group_id in allocations}
+    metrics.observe_phase("score", time.perf_counter() - score_start)
+
+    with metrics.phase_timer("summarise"):
+        summary = algorithm.summarise(groups_data, projects, allocations, best_components, aggregates)
+
+    if save_to_db:
+        with metrics.phase_timer("persist"):
+            algorithm.persist(allocations, summary, explanations, groups_data, cohort)
+
+    return {
+        "allocations": allocations,
+        "summary": summary,
+        "explanations": explanations,
+        "components": len(components),
+    }
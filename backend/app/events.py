@@ -0,0 +1,111 @@
+# app/events.py
+# fan-out of small JSON deltas to browser tabs over Server-Sent Events.
+# Every connected tab gets its own bounded queue on the event loop; publishing just drops the
+# message into each queue, so one worker can serve hundreds of idle tabs without any polling.
+# Publishers may run in a threadpool (allocation runs do), so publish() hops onto the loop.
+# Admin tabs get every event as published. Student tabs only get events published with a
+# student_data payload (and get that payload instead), so group names, per-project demand and
+# allocation progress stay on the admin side.
+import asyncio
+import json
+import threading
+from typing import Any, AsyncIterator, Dict, Optional
+
+from app import metrics
+
+HEARTBEAT_SECONDS = 15.0
+QUEUE_SIZE = 100
+
+
+class Broadcaster:
+    def __init__(self, queue_size: int = QUEUE_SIZE) -> None:
+        self.queue_size = queue_size
+        # queue -> whether it belongs to an admin tab
+        self._subscribers: Dict[asyncio.Queue, bool] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def subscribe(self, admin: bool = False) -> asyncio.Queue:
+        self._loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[queue] = admin
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.pop(queue, None)
+
+    def publish(self, event: str, data: Dict[str, Any], student_data: Optional[Dict[str, Any]] = None) -> None:
+        # nothing to do (and nothing to format) when no tab is listening
+        if not self._subscribers or self._loop is None:
+            return
+
+        with self._lock:
+            self._next_id += 1
+            message = _format(self._next_id, event, data)
+            student_message = None if student_data is None else _format(self._next_id, event, student_data)
+
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+
+        if running is self._loop:
+            self._fan_out(message, student_message)
+        elif not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._fan_out, message, student_message)
+
+    def _fan_out(self, message: str, student_message: Optional[str]) -> None:
+        for queue, admin in list(self._subscribers.items()):
+            if not admin and student_message is None:
+                continue
+            try:
+                queue.put_nowait(message if admin else student_message)
+            except asyncio.QueueFull:
+                # a tab that stopped reading shouldn't hold everyone else up; its backlog is
+                # dropped and it gets disconnected (EventSource reconnects and reloads)
+                self._subscribers.pop(queue, None)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(None)
+
+    async def stream(self, admin: bool = False) -> AsyncIterator[str]:
+        # subscribed only once the response starts iterating, so a response that is never sent
+        # doesn't leave a queue behind
+        queue = self.subscribe(admin)
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(queue)
+
+
+def _format(event_id: int, event: str, data: Dict[str, Any]) -> str:
+    return f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+broadcaster = Broadcaster()
+
+
+def publish(event: str, data: Dict[str, Any], student_data: Optional[Dict[str, Any]] = None) -> None:
+    broadcaster.publish(event, data, student_data)
+
+
+def _publish_phase(phase: str, seconds: float) -> None:
+    publish("allocation", {"phase": phase, "seconds": round(seconds, 4)})
+
+
+metrics.add_phase_listener(_publish_phase)
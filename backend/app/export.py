@@ -0,0 +1,193 @@
+# app/export.py
+# CSV / NDJSON exports of a cohort's allocation results and student records, streamed.
+# Rows come off a server-side (named) cursor in batches on postgres; SQLite steps through the
+# result the same way. Each batch is encoded and handed to the response straight away, so memory
+# stays at one batch whatever the cohort size.
+#
+# DB connections aren't shared across threads (the SQLite pool is per thread), so the whole
+# query runs on one producer thread feeding a small queue that the response drains. The producer
+# stops when the response is closed or, if it's never read at all, after EXPORT_IDLE_SECONDS, and
+# closes its cursor and connection either way. A cohort without the tables gets a 404.
+import csv
+import io
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, AsyncIterator, Callable, Iterator, List, Optional, Sequence, Tuple
+
+from fastapi.concurrency import run_in_threadpool
+
+from app import save_load
+from data.cohorts import existing_partition
+from data.db_connection import get_conn
+
+EXPORT_FORMATS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+BATCH_ROWS = 1000
+# encoded batches allowed to wait for a slow client before the producer blocks
+_QUEUE_BATCHES = 4
+# seconds the producer waits for the response to take a batch before it gives up on the client
+IDLE_SECONDS = float(os.getenv("EXPORT_IDLE_SECONDS", "60"))
+
+ALLOCATION_COLUMNS = [
+    "group_id", "project_id", "project_title", "client",
+    "unikey", "student_id", "name", "tutor_code",
+]
+STUDENT_COLUMNS = [
+    "student_id", "name", "unikey", "unit_code", "wam", "skill",
+    "dual_project_enrollment", "group_name", "tutor_code", "project_preferences",
+]
+
+
+def allocation_query(cohort: str) -> Optional[Tuple[str, List[str]]]:
+    """None when the cohort has no saved run"""
+    # one row per student; groups saved without member rows still come out once
+    results = existing_partition(save_load.ALLOC_TABLE, cohort)
+    if results is None:
+        return None
+    members = existing_partition(save_load.MEMBERS_TABLE, cohort)
+    member_columns = (
+        "m.unikey, m.student_id, m.name, m.tutor_code" if members
+        else "NULL AS unikey, NULL AS student_id, NULL AS name, NULL AS tutor_code"
+    )
+    member_join = f"LEFT JOIN {members} m ON m.group_id = r.group_id " if members else ""
+    sql = (
+        f"SELECT r.group_id, r.project_id, p.title AS project_title, p.client, {member_columns} "
+        f"FROM {results} r "
+        f"{member_join}"
+        f"LEFT JOIN {save_load.PROJECTS_TABLE} p ON p.project_id = r.project_id "
+        f"ORDER BY r.group_id;"
+    )
+    return sql, ALLOCATION_COLUMNS
+
+
+def student_query(cohort: str) -> Optional[Tuple[str, List[str]]]:
+    """None when the cohort has no "Student" table"""
+    table = existing_partition('"Student"', cohort)
+    if table is None:
+        return None
+    sql = f"SELECT {', '.join(STUDENT_COLUMNS)} FROM {table} ORDER BY student_id;"
+    return sql, STUDENT_COLUMNS
+
+
+def iter_batches(sql: str, params: Sequence[Any] = (), batch_rows: int = BATCH_ROWS) -> Iterator[List[dict]]:
+    conn = get_conn()
+    try:
+        # a named cursor is server-side on postgres (DECLARE / FETCH), ignored by SQLite
+        with conn.cursor(name=f"export_{uuid.uuid4().hex}") as cur:
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(batch_rows)
+                if not rows:
+                    break
+                yield rows
+    finally:
+        conn.close()
+
+
+def encode(batches: Iterator[List[dict]], columns: List[str], fmt: str) -> Iterator[bytes]:
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(columns)
+        header = buf.getvalue()
+        first = True
+        for rows in batches:
+            buf.seek(0)
+            buf.truncate()
+            if first:
+                buf.write(header)
+                first = False
+            writer.writerows([row.get(c) for c in columns] for row in rows)
+            yield buf.getvalue().encode("utf-8")
+        if first:
+            yield header.encode("utf-8")
+    else:
+        for rows in batches:
+            yield "".join(
+                json.dumps({c: row.get(c) for c in columns}, default=str) + "\n" for row in rows
+            ).encode("utf-8")
+
+
+_DONE = object()
+
+
+class _Producer:
+    def __init__(self, batches: Iterator[List[dict]], chunks: Iterator[bytes]) -> None:
+        self.queue: "queue.Queue" = queue.Queue(maxsize=_QUEUE_BATCHES)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, args=(batches, chunks), daemon=True)
+        self.thread.start()
+
+    def _put(self, item) -> bool:
+        # gives up once the client has gone away, or if nobody takes anything for IDLE_SECONDS (a
+        # response that was never started has no one to call stop())
+        deadline = time.monotonic() + IDLE_SECONDS
+        while not self.stopped.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if time.monotonic() >= deadline:
+                    self.stopped.set()
+        return False
+
+    def _run(self, batches, chunks) -> None:
+        try:
+            for chunk in chunks:
+                if not self._put(chunk):
+                    return
+        except Exception as e:
+            self._put(e)
+            return
+        finally:
+            # releases the cursor and connection on this thread, even if the client went away
+            chunks.close()
+            batches.close()
+        self._put(_DONE)
+
+    def _get(self):
+        # a threadpool thread waits here, so it has to notice a producer that stopped
+        while True:
+            try:
+                return self.queue.get(timeout=0.5)
+            except queue.Empty:
+                if self.stopped.is_set() or not self.thread.is_alive():
+                    return _DONE
+
+    async def next_chunk(self):
+        item = await run_in_threadpool(self._get)
+        if isinstance(item, Exception):
+            raise item
+        return item
+
+    def stop(self) -> None:
+        self.stopped.set()
+
+
+async def open_stream(sql: str, columns: List[str], fmt: str, params: Sequence[Any] = ()) -> AsyncIterator[bytes]:
+    """Start the query and wait for its first chunk (so a bad query still fails with a normal
+    error response), then return an async iterator over the rest for StreamingResponse."""
+    batches = iter_batches(sql, params)
+    producer = _Producer(batches, encode(batches, columns, fmt))
+    try:
+        first = await producer.next_chunk()
+    except Exception:
+        producer.stop()
+        raise
+
+    async def chunks() -> AsyncIterator[bytes]:
+        item: Optional[Any] = first
+        try:
+            while item is not _DONE:
+                yield item
+                item = await producer.next_chunk()
+        finally:
+            producer.stop()
+
+    return chunks()
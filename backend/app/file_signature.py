@@ -0,0 +1,17 @@
+# app/file_signature.py
+# (mtime_ns, size) of a file, or None when it doesn't exist. Everything that keeps an in-memory copy
+# of a file (users.json, schedule.json, students.json's table and aggregates) compares this to
+# notice the file was changed under it and reload.
+from pathlib import Path
+from typing import Optional, Tuple
+
+# a signature no file has, so whatever holds it reloads on next use
+STALE = (-1, -1)
+
+
+def file_signature(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = Path(path).stat()
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
@@ -0,0 +1,117 @@
+# app/group_builder.py
+# builds the Group objects the allocator needs from the flat per-student records in students.json.
+# every record repeats its group's skills/preferences, so we bucket them by group_id in one pass
+# and only validate each Group once. load_groups reads the shared cohort table (app/cohort_table.py)
+# rather than the raw file, and caches the Groups against the table's version so repeated
+# allocation/preview runs don't re-aggregate (or re-validate) anything. build_groups takes plain
+# records (benches, tests) and runs them through the same table build.
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from app.models import Group
+from app import cohort_table
+from app.cohort_table import STUDENTS_PATH, CohortTable
+
+# lower bound of each grade band, checked top down (same bands the submission form uses)
+WAM_BANDS = (
+    (85.0, "HD"),
+    (75.0, "D"),
+    (65.0, "CR"),
+    (50.0, "P"),
+)
+
+_cache: Dict[str, Any] = {"version": None, "groups": []}
+_cache_lock = threading.Lock()
+
+
+def wam_band(wam: Any) -> str:
+    try:
+        value = float(wam)
+    except (TypeError, ValueError):
+        return "F"
+    for lower, band in WAM_BANDS:
+        if value >= lower:
+            return band
+    return "F"
+
+
+def group_key(record: Dict[str, Any]) -> str:
+    # students that haven't been put in a group yet are treated as a group of one
+    return str(record.get("group_id") or record.get("student_id"))
+
+
+def build_groups(records: Iterable[Dict[str, Any]]) -> List[Group]:
+    """Groups from students.json-shaped records (benches, tests, hand-built cohorts); the same
+    build the app runs over the shared table"""
+    return build_groups_from_table(CohortTable.from_records(records))
+
+
+def build_groups_from_table(table: CohortTable) -> List[Group]:
+    """build_groups over the columnar table: members of a group share their skill/preference
+    tuples, so the unions only walk each distinct tuple once"""
+    groups = []
+    for gid, rows in table.group_rows().items():
+        students = []
+        wam_breakdown = {band: 0 for _, band in WAM_BANDS}
+        skills: Dict[str, None] = {}
+        prefs: Dict[str, None] = {}
+        seen_skill_sets = set()
+        seen_pref_lists = set()
+        dual = False
+
+        for row in rows:
+            student = table.record(row)
+            if student["tutor_code"] is None:
+                student["tutor_code"] = "T01"
+            students.append(student)
+
+            if table.skills[row] not in seen_skill_sets:
+                seen_skill_sets.add(table.skills[row])
+                skills.update(dict.fromkeys(table.skills_at(row)))
+            if table.preferences[row] not in seen_pref_lists:
+                seen_pref_lists.add(table.preferences[row])
+                prefs.update(dict.fromkeys(table.preferences_at(row)))
+
+            band = wam_band(table.wam_at(row))
+            wam_breakdown[band] = wam_breakdown.get(band, 0) + 1
+            dual = dual or bool(table.dual[row])
+
+        groups.append(Group(
+            group_id=gid,
+            students=students,
+            project_preferences=list(prefs),
+            wam_breakdown=wam_breakdown,
+            dual_project_enrollment=dual,
+            skills=list(skills),
+            justification="",
+        ))
+    return groups
+
+
+def load_groups(path: Optional[Path] = None) -> List[Group]:
+    path = Path(path or STUDENTS_PATH)
+    if not path.exists():
+        return []
+
+    table = cohort_table.get_table(path)
+    # versions only count up for a path (reloads carry on from the old table's), so unlike id(table)
+    # they can't come round again for different contents
+    version = (path, table.version)
+    with _cache_lock:
+        if _cache["version"] == version:
+            return list(_cache["groups"])
+
+    groups = build_groups_from_table(table)
+
+    with _cache_lock:
+        _cache["version"] = version
+        _cache["groups"] = groups
+    return list(groups)
+
+
+def cache_state():
+    """(version, groups) of the cached build - the very Group objects load_groups hands out"""
+    with _cache_lock:
+        return _cache["version"], _cache["groups"]
+
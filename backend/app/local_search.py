@@ -0,0 +1,237 @@
+# app/local_search.py
+# optional improvement pass run after any base allocation (greedy, decomposed or stable).
+# Hill climbing over two kinds of move: swap the projects of two groups, or move a group (allocated
+# or not) onto a project nobody has. Pair scores come from algorithm.score_pair and are cached, so a
+# candidate move is judged by an O(1) delta of cached totals rather than recomputing anything.
+# Stops when the time or iteration budget runs out.
+# The stable engine leaves some groups unallocated on purpose, so after it the pass only moves
+# groups that already have a project (place_unallocated=False). Its swaps can still break the
+# stability deferred acceptance guarantees; the run endpoint reports whether any move was made.
+import heapq
+import random
+import time
+from operator import itemgetter
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.models import Group
+from app import algorithm, metrics, profiling, save_load
+
+# check the clock every this many iterations rather than every one
+_CLOCK_EVERY = 256
+
+
+class _PairScores:
+    def __init__(self, groups: List[Group], projects: List[Dict[str, Any]]) -> None:
+        self.groups = groups
+        self.projects = projects
+        self._cache: Dict[Tuple[int, int], Tuple[float, float, float, float]] = {}
+
+    def components(self, gi: int, pi: int) -> Tuple[float, float, float, float]:
+        key = (gi, pi)
+        cached = self._cache.get(key)
+        if cached is None:
+            total, pref, skills, wam, _ = algorithm.score_pair(self.groups[gi], self.projects[pi])
+            cached = self._cache[key] = (total, pref, skills, wam)
+        return cached
+
+    def total(self, gi: int, pi: int) -> float:
+        return self.components(gi, pi)[0]
+
+
+def improve_allocation(
+    groups_data: List[Group],
+    projects: List[Dict[str, Any]],
+    allocations: Dict[str, str],
+    time_budget: float = 2.0,
+    max_iterations: Optional[int] = None,
+    seed: Optional[int] = None,
+    place_unallocated: bool = True,
+) -> Dict[str, Any]:
+    rnd = random.Random(seed)
+    scores = _PairScores(groups_data, projects)
+    group_index = {g.group_id: i for i, g in enumerate(groups_data)}
+    project_index = {p["id"]: i for i, p in enumerate(projects)}
+
+    # assignment[gi] = project index or -1; owner[pi] = group index or -1
+    assignment = [-1] * len(groups_data)
+    owner = [-1] * len(projects)
+    for gid, pid in allocations.items():
+        gi, pi = group_index.get(gid), project_index.get(pid)
+        if gi is None or pi is None:
+            continue
+        assignment[gi] = pi
+        owner[pi] = gi
+
+    allocated = [gi for gi, pi in enumerate(assignment) if pi >= 0]
+    free = [pi for pi, gi in enumerate(owner) if gi < 0]
+    free_pos = {pi: k for k, pi in enumerate(free)}
+    initial_score = sum(scores.total(gi, assignment[gi]) for gi in allocated)
+
+    deadline = time.perf_counter() + time_budget
+    moves_applied = 0
+    gained = 0.0
+    iterations = 0
+
+    while groups_data and projects:
+        if max_iterations is not None and iterations >= max_iterations:
+            break
+        if iterations % _CLOCK_EVERY == 0 and time.perf_counter() >= deadline:
+            break
+        iterations += 1
+
+        a = rnd.randrange(len(groups_data))
+        pa = assignment[a]
+        if pa < 0 and not place_unallocated:
+            continue
+
+        if free and (rnd.random() < 0.5 or len(allocated) < 2):
+            # move a onto a free project
+            pf = free[rnd.randrange(len(free))]
+            delta = scores.total(a, pf) - (scores.total(a, pa) if pa >= 0 else 0.0)
+            if delta <= 1e-12:
+                continue
+
+            k = free_pos.pop(pf)
+            last = free.pop()
+            if last != pf:
+                free[k] = last
+                free_pos[last] = k
+            if pa >= 0:
+                owner[pa] = -1
+                free_pos[pa] = len(free)
+                free.append(pa)
+            else:
+                allocated.append(a)
+            assignment[a] = pf
+            owner[pf] = a
+        else:
+            if pa < 0 or len(allocated) < 2:
+                continue
+            b = allocated[rnd.randrange(len(allocated))]
+            pb = assignment[b]
+            if b == a:
+                continue
+            delta = (
+                scores.total(a, pb) + scores.total(b, pa)
+                - scores.total(a, pa) - scores.total(b, pb)
+            )
+            if delta <= 1e-12:
+                continue
+            assignment[a], assignment[b] = pb, pa
+            owner[pa], owner[pb] = b, a
+
+        moves_applied += 1
+        gained += delta
+
+    improved = {}
+    components = {}
+    for gi, pi in enumerate(assignment):
+        if pi >= 0:
+            gid = groups_data[gi].group_id
+            improved[gid] = projects[pi]["id"]
+            components[gid] = scores.components(gi, pi)[1:]
+
+    return {
+        "allocations": improved,
+        "components": components,
+        "initial_score": round(initial_score, 4),
+        "final_score": round(initial_score + gained, 4),
+        "improvement": round(gained, 4),
+        "moves_applied": moves_applied,
+        "iterations": iterations,
+    }
+
+
+def explain_moved(
+    groups_data: List[Group],
+    projects: List[Dict[str, Any]],
+    before: Dict[str, str],
+    after: Dict[str, str],
+    explanations: Dict[str, Any],
+    explain_top_k: int = algorithm.EXPLAIN_TOP_K,
+) -> Dict[str, Any]:
+    """The engine's explanations, with the ones of groups local search moved recomputed.
+
+    A moved group's candidates are re-ranked against the final allocation: every project no other
+    group ended up with, its own included.
+    """
+    moved = [g for g in groups_data if before.get(g.group_id) != after.get(g.group_id)]
+    if not moved:
+        return explanations
+    out = dict(explanations)
+    for group in moved:
+        out.pop(group.group_id, None)
+    if explain_top_k <= 0:
+        return out
+
+    holder = {pid: gid for gid, pid in after.items()}
+    for group in moved:
+        candidates = []
+        for project in projects:
+            if holder.get(project["id"], group.group_id) != group.group_id:
+                continue
+            total, pref, skills, wam, dual = algorithm.score_pair(group, project)
+            candidates.append((total, project["id"], pref, skills, wam, dual))
+        out[group.group_id] = [
+            {
+                "rank": rank,
+                "project_id": pid,
+                "total_score": round(total, 4),
+                "preference_score": round(pref, 4),
+                "skills_score": round(skills, 4),
+                "wam_score": round(wam, 4),
+                "dual_penalty": dual,
+            }
+            for rank, (total, pid, pref, skills, wam, dual) in enumerate(
+                heapq.nlargest(explain_top_k, candidates, key=itemgetter(0)), start=1
+            )
+        ]
+    return out
+
+
+@profiling.profiled
+def improve_result(
+    groups_data: List[Group],
+    result: Dict[str, Any],
+    time_budget: float = 2.0,
+    max_iterations: Optional[int] = None,
+    projects_table: str = save_load.PROJECTS_TABLE,
+    aggregates: Optional[Dict[str, Any]] = None,
+    save_to_db: bool = True,
+    cohort: Optional[str] = None,
+    place_unallocated: bool = True,
+) -> Dict[str, Any]:
+    """Improve an engine's (unsaved) result in place of it: new allocations and summary, then persist.
+
+    place_unallocated=False leaves groups the engine didn't place unallocated (stable engine).
+    """
+    projects = save_load.load_projects_from_db(projects_table)
+
+    with metrics.phase_timer("improve"):
+        improved = improve_allocation(
+            groups_data, projects, result["allocations"], time_budget=time_budget,
+            max_iterations=max_iterations, place_unallocated=place_unallocated,
+        )
+
+    with metrics.phase_timer("summarise"):
+        summary = algorithm.summarise(
+            groups_data, projects, improved["allocations"], improved["components"], aggregates
+        )
+
+    # the engine's explanations were ranked against its own allocation; groups that moved get theirs redone
+    explanations = explain_moved(
+        groups_data, projects, result["allocations"], improved["allocations"], result.get("explanations") or {}
+    )
+
+    if save_to_db:
+        with metrics.phase_timer("persist"):
+            algorithm.persist(improved["allocations"], summary, explanations, groups_data, cohort)
+
+    out = dict(result)
+    out["allocations"] = improved["allocations"]
+    out["explanations"] = explanations
+    out["summary"] = summary
+    out["improvement"] = {
+        k: improved[k] for k in ("initial_score", "final_score", "improvement", "moves_applied", "iterations")
+    }
+    return out
@@ -11,10 +11,41 @@ from fastapi import Form
 import json
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.responses import RedirectResponse, JSONResponse
-
-
-app = FastAPI()
-
+import os
+import hmac
+from fastapi.responses import StreamingResponse
+from contextlib import asynccontextmanager
+from app import group_builder, save_load, submission_stats, metrics, events, skill_vocab, local_search, allocation_index, export, cohort_table, submission_writer, scheduler, auth, profiling, run_history, admission
+from app.algorithm import match_projects
+# samples the worker thread as well when an admin profiles the request
+from app.profiling import run_in_threadpool
+from app.decompose import match_projects_decomposed
+from app.stable_matching import match_projects_stable
+from app.models import SUBMISSION_ADAPTER
+from data import cohorts, query_trace
+from pydantic import ValidationError
+from typing import Optional
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # tables from before cohorts are moved over once, by hand: python -m data.migrate_cohorts
+    # deadline freeze and automatic run (off unless SCHEDULER=1, see app/scheduler.py)
+    if scheduler.ENABLED:
+        scheduler.scheduler.start()
+    yield
+    scheduler.scheduler.stop()
+
+
+app = FastAPI(lifespan=lifespan)
+# per-route concurrency/queue/rate limits with 429 + Retry-After, see app/admission.py
+if admission.ENABLED:
+    app.add_middleware(admission.AdmissionMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
+if query_trace.ENABLED:
+    app.add_middleware(query_trace.QueryTraceMiddleware)
+# X-Profile: 1 (or ?profile=1) from an admin samples that one request, see app/profiling.py
+app.add_middleware(profiling.ProfilingMiddleware)
 # Avoid startup crash if /static isn't visible at cold start
 static_dir = Path(__file__).parent / "static"
 app.mount("/static", StaticFiles(directory=static_dir, check_dir=False), name="static")
@@ -23,27 +54,32 @@ app.mount("/static", StaticFiles(directory=static_dir, check_dir=False), name="s
 async def health():
     return JSONResponse({"ok": True})
 
+# Prometheus can't log in, so a scrape may also present METRICS_TOKEN as a bearer token
+def metrics_access(request: Request):
+    token = os.getenv("METRICS_TOKEN")
+    auth = request.headers.get("authorization", "")
+    if token and hmac.compare_digest(auth, f"Bearer {token}"):
+        return
+    admin_only(request)
+
+@app.get("/metrics", dependencies=[Depends(metrics_access)], include_in_schema=False)
+async def get_metrics():
+    return Response(content=metrics.REGISTRY.render(), media_type=metrics.CONTENT_TYPE)
+
 @app.get("/", include_in_schema=False) # did this because for some reason in terminal the link didn't take me directly to docs
 async def redirect_to_docs():
     return RedirectResponse(url="/login", status_code=302)
 
-# Load users
-def load_users():
-    json_path = Path(__file__).parent.parent / "data" / "users.json"
-    with open(json_path, "r", encoding="utf-8") as f:
-        return json.load(f)
-
-# Check login + role
+# Check login + role (signed session cookie, see app/auth.py)
 def get_current_user(request: Request):
-    username = request.cookies.get("username")
-    role = request.cookies.get("role")
-    if not username or not role:
+    user = auth.sessions.verify(request.cookies.get(auth.SESSION_COOKIE))
+    if user is None:
         raise HTTPException(status_code=401, detail="Not logged in")
-    return {"username": username, "role": role}
+    return user
 
 def admin_only(request: Request):
-    role = request.cookies.get("role")
-    if role != "admin":
+    user = auth.sessions.verify(request.cookies.get(auth.SESSION_COOKIE))
+    if user is None or user["role"] != "admin":
         raise HTTPException(status_code=403, detail="Admins only")
     
 @app.exception_handler(StarletteHTTPException)
@@ -69,9 +105,12 @@ async def favicon():
 
 # Login endpoint
 @app.post("/login-check")
-async def login(username: str = Form(...), password: str = Form(...), role: str = Form(...)):
-    users = load_users()
-    user = next((u for u in users if u["username"] == username and u["password"] == password), None)
+async def login(request: Request, username: str = Form(...), password: str = Form(...), role: str = Form(...)):
+    if not auth.sessions.available:
+        raise HTTPException(status_code=503, detail="Logins are unavailable: the server has no session secret configured")
+
+    # PBKDF2 is slow on purpose, so it runs off the event loop
+    user = await run_in_threadpool(auth.directory.authenticate, username, password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid username or password")
 
@@ -82,10 +121,22 @@ async def login(username: str = Form(...), password: str = Form(...), role: str
         url="/admin" if user["role"] == "admin" else "/projectList", 
         status_code=303
     )
-    response.set_cookie(key="username", value=user["username"])
-    response.set_cookie(key="role", value=user["role"])
+    response.set_cookie(
+        key=auth.SESSION_COOKIE,
+        value=auth.sessions.issue(user["username"], user["role"]),
+        max_age=auth.SESSION_TTL,
+        httponly=True,
+        samesite="lax",
+        secure=is_https(request),
+    )
     return response
 
+
+def is_https(request: Request) -> bool:
+    # behind a proxy (Vercel, nginx) the app itself is spoken to over http
+    forwarded = request.headers.get("x-forwarded-proto", "").split(",")[0].strip().lower()
+    return request.url.scheme == "https" or forwarded == "https"
+
 @app.get("/login", include_in_schema=False)
 async def serve_login_page():
     html_path = Path(__file__).parent / "static" / "login.html"
@@ -102,6 +153,8 @@ async def serve_login_page():
 @app.get("/logout", include_in_schema=False)
 async def logout():
     response = RedirectResponse(url="/login", status_code=303)
+    response.delete_cookie(auth.SESSION_COOKIE, path="/")
+    # cookies from before sessions were signed
     response.delete_cookie("username", path="/")
     response.delete_cookie("role", path="/")
     return response
@@ -165,6 +218,12 @@ async def serve_admin_allocation():
     html_path = Path(__file__).parent / "static" / "admin_allocation.html"
     return FileResponse(html_path)
 
+@app.get("/admin/allocation/changes", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def serve_admin_run_changes():
+    """Serve the page comparing two allocation runs"""
+    html_path = Path(__file__).parent / "static" / "admin_run_changes.html"
+    return FileResponse(html_path)
+
 
 # Admin endpoints for project management
 @app.get("/admin/projects", dependencies=[Depends(admin_only)], include_in_schema=False)
@@ -230,6 +289,8 @@ async def update_admin_project(project_id: str, project_data: dict = Body(...)):
         # Save updated projects
         with open(json_path, "w", encoding="utf-8") as f:
             json.dump(projects, f, ensure_ascii=False, indent=2)
+
+        events.publish("project_updated", {"project_id": project_id, "project": projects[project_index]})
         
         return {"ok": True, "message": f"Project {project_id} updated successfully"}
     except HTTPException:
@@ -259,6 +320,8 @@ async def delete_admin_project(project_id: str):
 
         with open(json_path, "w", encoding="utf-8") as f:
             json.dump(projects, f, ensure_ascii=False, indent=2)
+
+        events.publish("project_deleted", {"project_id": project_id})
         
         return {"ok": True, "message": f"Project {project_id} deleted successfully"}
     except HTTPException:
@@ -284,7 +347,7 @@ async def get_project_statistics():
         
         for project in projects:
             if project.get("required_skills"):
-                all_skills.update(project["required_skills"])
+                all_skills.update(skill_vocab.parse_skills(project["required_skills"]))
             if project.get("related_disciplines"):
                 all_disciplines.update(project["related_disciplines"])
         
@@ -312,7 +375,7 @@ async def get_all_skills():
         all_skills = set()
         for project in projects:
             if project.get("required_skills"):
-                all_skills.update(project["required_skills"])
+                all_skills.update(skill_vocab.parse_skills(project["required_skills"]))
         
         return sorted(list(all_skills))
     except Exception as e:
@@ -341,116 +404,74 @@ async def get_all_disciplines():
         raise HTTPException(status_code=500, detail=str(e))
 
 # Student Application API endpoints
+def validation_error_detail(exc: ValidationError) -> str:
+    """First validation problem as the same short message the form used to get"""
+    error = exc.errors()[0]
+    field = str(error["loc"][0]) if error["loc"] else ""
+    if error["type"] == "json_invalid":
+        return "Request body must be valid JSON"
+    if error["type"] == "value_error":
+        return str(error["ctx"]["error"])
+    if field == "group_name" and error["type"] == "string_pattern_mismatch":
+        return "Group name must be in format: TutorialCode_TutorialDayTime_GroupNumber"
+    if field == "students" and error["type"] == "string_pattern_mismatch":
+        return (
+            f"Student {error['loc'][1] + 1} must be in format: name, student_id, unikey, UoS_code "
+            f"(student_id: up to 18 digits)"
+        )
+    if field == "students" and error["type"] in ("too_short", "too_long"):
+        return "Group must have 5-7 students"
+    if error["type"] in ("missing", "string_too_short", "too_short"):
+        return f"Missing required field: {field}"
+    if field == "dual_enrollment":
+        return "Dual enrollment must be 'Yes' or 'No'"
+    if field == "wam_distribution" and error["type"] == "greater_than_equal":
+        return "WAM distribution counts can't be negative"
+    location = ".".join(str(part) for part in error["loc"])
+    return f"{location}: {error['msg']}" if location else error["msg"]
+
 @app.post("/api/students", include_in_schema=False)
-async def submit_student_application(group_data: dict = Body(...)):
+async def submit_student_application(request: Request):
     """Submit a group project selection application"""
     try:
-        # Validate required fields
-        required_fields = ["group_name", "students", "wam_distribution", "dual_enrollment", "suitability_description"]
-        for field in required_fields:
-            if not group_data.get(field):
-                raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
-        
-        # Validate group name format
-        group_name = group_data.get("group_name")
-        if not group_name or len(group_name.split('_')) != 3:
-            raise HTTPException(status_code=400, detail="Group name must be in format: TutorialCode_TutorialDayTime_GroupNumber")
-        
-        # Validate students (5-7 students required)
-        students = group_data.get("students", [])
-        if len(students) < 5 or len(students) > 7:
-            raise HTTPException(status_code=400, detail="Group must have 5-7 students")
-        
-        # Validate each student entry format
-        for i, student in enumerate(students):
-            if not student or len(student.split(',')) != 4:
-                raise HTTPException(status_code=400, detail=f"Student {i+1} must be in format: name, student_id, unikey, UoS_code")
-        
-        
-        # Validate WAM distribution
-        wam_dist = group_data.get("wam_distribution", {})
-        total_wam = wam_dist.get("hd", 0) + wam_dist.get("d", 0) + wam_dist.get("cr", 0) + wam_dist.get("p", 0)
-        if total_wam != len(students):
-            raise HTTPException(status_code=400, detail="WAM distribution must sum to the number of students in the group")
-        
-        # Validate dual enrollment
-        dual_enrollment = group_data.get("dual_enrollment")
-        if dual_enrollment not in ["Yes", "No"]:
-            raise HTTPException(status_code=400, detail="Dual enrollment must be 'Yes' or 'No'")
-        
-        # Convert group data to individual student records
-        student_records = []
-        for i, student_info in enumerate(students):
-            if student_info and student_info.strip():
-                parts = student_info.split(',')
-                if len(parts) == 4:
-                    name, student_id, unikey, uos_code = [part.strip() for part in parts]
-                    student_record = {
-                        "name": name,
-                        "student_id": student_id,
-                        "unikey": unikey,
-                        "unit_code": uos_code,
-                        "wam": 0,  # Default WAM, will be calculated from distribution
-                        "group_id": group_name,
-                        "tutor_code": "T01",  # Default tutor
-                        "dual_project_enrollment": dual_enrollment == "Yes",
-                        "skills": group_data.get("skills", []),
-                        "project_preferences": group_data.get("project_preferences", [])
-                    }
-                    student_records.append(student_record)
-        
-        # Calculate WAM for each student based on distribution
-        wam_dist = group_data.get("wam_distribution", {})
-        hd_count = wam_dist.get("hd", 0)
-        d_count = wam_dist.get("d", 0)
-        cr_count = wam_dist.get("cr", 0)
-        p_count = wam_dist.get("p", 0)
-        
-        wam_index = 0
-        for i in range(hd_count):
-            if wam_index < len(student_records):
-                student_records[wam_index]["wam"] = 87.5  # Mid-point of HD range
-                wam_index += 1
-        
-        for i in range(d_count):
-            if wam_index < len(student_records):
-                student_records[wam_index]["wam"] = 80.0  # Mid-point of D range
-                wam_index += 1
-        
-        for i in range(cr_count):
-            if wam_index < len(student_records):
-                student_records[wam_index]["wam"] = 70.0  # Mid-point of CR range
-                wam_index += 1
-        
-        for i in range(p_count):
-            if wam_index < len(student_records):
-                student_records[wam_index]["wam"] = 57.5  # Mid-point of P range
-                wam_index += 1
-        
-        # Load existing students or create new file
-        students_path = Path(__file__).parent.parent / "data" / "students.json"
-        students_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        existing_students = []
-        if students_path.exists():
-            try:
-                with open(students_path, "r", encoding="utf-8") as f:
-                    existing_students = json.load(f)
-            except json.JSONDecodeError:
-                existing_students = []
-        
-        # Check if any student ID already exists
-        existing_student_ids = {student.get("student_id") for student in existing_students}
-        new_student_ids = {student["student_id"] for student in student_records}
+        # validated straight from the raw body by the cached adapter (see models.GroupSubmission)
+        try:
+            submission = SUBMISSION_ADAPTER.validate_json(await request.body())
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=validation_error_detail(e))
+
+        if not scheduler.scheduler.submissions_open():
+            raise HTTPException(status_code=409, detail="The submission deadline has passed")
+
+        group_name = submission.group_name
+        student_records = submission.to_records()
         
-        if existing_student_ids & new_student_ids:
+        # queued and committed together with any other submissions from the same few ms
+        # (students.json, the "Student" table and the aggregates, see app/submission_writer.py)
+        try:
+            stored = await submission_writer.writer.submit(student_records)
+        except submission_writer.InvalidSubmission as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not stored:
             raise HTTPException(status_code=409, detail="One or more student IDs already exist")
-        
-        # Save student applications
-        existing_students.extend(student_records)
-        
-        with open(students_path, "w", encoding="utf-8") as f:
-            json.dump(existing_students, f, ensure_ascii=False, indent=2)
+
+        stats = submission_stats.aggregates
+        events.publish("submission", {
+            "group_name": group_name,
+            "students": len(student_records),
+            "student_count": stats.student_count,
+            "group_count": stats.group_count,
+            "project_demand": {
+                pid: stats.project_demand[pid] for pid in submission.project_preferences
+            },
+            "project_student_demand": {
+                pid: stats.project_student_demand[pid] for pid in submission.project_preferences
+            },
+        }, student_data={
+            # students only see that the cohort is filling up, not who applied or for what
+            "student_count": stats.student_count,
+            "group_count": stats.group_count,
+        })
         
         return {"ok": True, "message": "Group application submitted successfully", "group_name": group_name}
         
@@ -468,14 +489,47 @@ async def get_student_applications():
         if not students_path.exists():
             return []
         
-        with open(students_path, "r", encoding="utf-8") as f:
-            students = json.load(f)
-        
-        return students
+        # rows are rebuilt from the shared columnar table rather than re-reading the file
+        return list(cohort_table.get_table(students_path).records())
     except Exception as e:
         print(f"Error getting student applications: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/admin/queries", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def get_query_report(reset: bool = False):
+    """Query tracing report (QUERY_TRACE=1): slowest statements, per-route query counts, N+1 flags"""
+    report = query_trace.report()
+    if reset:
+        query_trace.reset()
+    return report
+
+@app.get("/api/admin/admission", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def admission_status():
+    """In-flight, queued and configured limits of each admission policy in this worker"""
+    return {"enabled": admission.ENABLED, "policies": admission.status()}
+
+@app.get("/api/admin/profiles", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def list_request_profiles():
+    """Requests profiled on demand (most recent first)"""
+    return profiling.list_profiles()
+
+@app.get("/api/admin/profiles/{profile_id}", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def get_request_profile(profile_id: int):
+    """One profile as collapsed stacks (flamegraph.pl / speedscope input)"""
+    profile = profiling.get_profile(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(content=profile.collapsed(), media_type="text/plain; charset=utf-8")
+
+@app.get("/api/submissions/summary", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def get_submission_summary():
+    """Demand, skill coverage, WAM bands and dual enrolment counts over all submissions"""
+    try:
+        return submission_stats.get_aggregates().snapshot()
+    except Exception as e:
+        print(f"Error getting submission summary: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/api/groups", include_in_schema=False)
 async def get_group_applications():
     """Get all group applications (admin only)"""
@@ -493,6 +547,223 @@ async def get_group_applications():
         raise HTTPException(status_code=500, detail=str(e))
 
 
+# Allocation endpoints
+# allocation engines selectable per run, all returning the match_projects result shape
+def checked_cohort(cohort: Optional[str]) -> str:
+    try:
+        return cohorts.validate_cohort(cohort) if cohort else cohorts.current_cohort()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+ALLOCATION_ENGINES = {
+    "greedy": match_projects,
+    # preference-restricted: groups are placed within their preference component first
+    "decomposed": match_projects_decomposed,
+    "stable": match_projects_stable,
+}
+# upper bound on the optional local-search pass so a request can't hold a worker for long
+MAX_IMPROVE_SECONDS = 30.0
+
+@app.post("/api/allocations/run", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def run_allocation(
+    preview: bool = False,
+    engine: str = "greedy",
+    improve_seconds: float = 0.0,
+    improve_iterations: Optional[int] = None,
+    cohort: Optional[str] = None,
+):
+    """Run the allocation over the current submissions (preview=true doesn't save anything).
+    improve_seconds/improve_iterations > 0 add a local-search pass over the engine's result. After
+    engine=stable that pass leaves unallocated groups alone, but its swaps can break stability:
+    improvement.stable is false once it has moved anything.
+    Results are saved under cohort (default: the current semester)."""
+    try:
+        if engine not in ALLOCATION_ENGINES:
+            raise HTTPException(status_code=400, detail=f"Unknown allocation engine: {engine}")
+        cohort = checked_cohort(cohort)
+
+        groups = group_builder.load_groups()
+        if not groups:
+            raise HTTPException(status_code=400, detail="No student submissions to allocate")
+
+        aggregates = submission_stats.get_aggregates().snapshot()
+        events.publish("allocation", {"phase": "started", "groups": len(groups), "preview": preview})
+        try:
+            improve = improve_seconds > 0 or bool(improve_iterations)
+            # iteration-only requests still get the time cap
+            improve_budget = min(improve_seconds, MAX_IMPROVE_SECONDS) if improve_seconds > 0 else MAX_IMPROVE_SECONDS
+            result = await run_in_threadpool(
+                ALLOCATION_ENGINES[engine], groups,
+                save_to_db=not preview and not improve, aggregates=aggregates, cohort=cohort
+            )
+            if improve:
+                result = await run_in_threadpool(
+                    local_search.improve_result, groups, result,
+                    time_budget=improve_budget,
+                    max_iterations=improve_iterations,
+                    aggregates=aggregates, save_to_db=not preview, cohort=cohort,
+                    place_unallocated=engine != "stable",
+                )
+                if engine == "stable":
+                    result["improvement"]["stable"] = result["improvement"]["moves_applied"] == 0
+        except Exception:
+            events.publish("allocation", {"phase": "failed"})
+            raise
+        events.publish("allocation", {"phase": "finished", "allocated": len(result["allocations"])})
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error running allocation: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/api/allocations/summary", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def get_allocation_summary(cohort: Optional[str] = None):
+    """Summary of the cohort's last saved allocation run (served from the read cache)"""
+    try:
+        return await run_in_threadpool(save_load.load_summary_from_db, checked_cohort(cohort))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error loading allocation summary: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/allocations/runs", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def list_allocation_runs(cohort: Optional[str] = None):
+    """The cohort's saved allocation runs kept for comparison, newest first"""
+    try:
+        return await run_in_threadpool(run_history.list_runs, checked_cohort(cohort))
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error listing allocation runs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/allocations/diff", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def diff_allocation_runs(base: Optional[int] = None, head: Optional[int] = None, cohort: Optional[str] = None):
+    """Groups that moved, got or lost a project, and per-project demand/fill changes between two
+    saved runs (default: the latest run against the one before it)"""
+    try:
+        diff = await run_in_threadpool(run_history.diff_runs, checked_cohort(cohort), base, head)
+        if diff is None:
+            raise HTTPException(status_code=404, detail="No such pair of allocation runs to compare")
+        return diff
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error diffing allocation runs: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/allocations/{group_id}/explain", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def explain_allocation(group_id: str, cohort: Optional[str] = None):
+    """Top candidate projects (with score components) recorded for a group by the cohort's last allocation run"""
+    try:
+        candidates = await run_in_threadpool(
+            save_load.load_explanation_from_db, group_id, cohort=checked_cohort(cohort)
+        )
+        if not candidates:
+            raise HTTPException(status_code=404, detail="No allocation explanation for this group")
+
+        return {"group_id": group_id, "candidates": candidates}
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error loading explanation for {group_id}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/allocations", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def list_allocations(
+    group_id: Optional[str] = None,
+    project_id: Optional[str] = None,
+    unikey: Optional[str] = None,
+    tutor_code: Optional[str] = None,
+    cohort: Optional[str] = None,
+):
+    """A cohort's saved allocations with their members, filtered by any of group/project/unikey/tutor"""
+    try:
+        return await run_in_threadpool(
+            allocation_index.lookup, checked_cohort(cohort),
+            group_id=group_id, project_id=project_id, unikey=unikey, tutor_code=tutor_code,
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error looking up allocations: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+def my_allocation_lookup(username: str):
+    # logins aren't unikeys (the shipped student login is shared by the class), so only a login whose
+    # users.json entry names its student's "unikey" has an allocation of its own
+    unikey = auth.directory.unikey_of(username)
+    if not unikey:
+        return None, False
+    return allocation_index.index.for_unikey(unikey), True
+
+@app.get("/api/me/allocation", include_in_schema=False)
+async def my_allocation(user: dict = Depends(get_current_user)):
+    """The logged-in student's group and project (their users.json entry links the login to a unikey)"""
+    try:
+        found, linked = await run_in_threadpool(my_allocation_lookup, user["username"])
+        if not linked:
+            raise HTTPException(status_code=404, detail="This login isn't linked to a student unikey")
+        if not found:
+            raise HTTPException(status_code=404, detail="No allocation yet")
+        return found
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error loading allocation for {user['username']}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Spreadsheet exports (streamed straight off the database cursor)
+EXPORT_QUERIES = {
+    "allocations": export.allocation_query,
+    "students": export.student_query,
+}
+
+@app.get("/api/export/{dataset}", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def export_dataset(dataset: str, format: str = "csv", cohort: Optional[str] = None):
+    """Stream a cohort's allocation results (joined with members and projects) or students as CSV/NDJSON"""
+    try:
+        if dataset not in EXPORT_QUERIES:
+            raise HTTPException(status_code=404, detail=f"Unknown export: {dataset}")
+        if format not in export.EXPORT_FORMATS:
+            raise HTTPException(status_code=400, detail="format must be csv or ndjson")
+        cohort = checked_cohort(cohort)
+
+        query = await run_in_threadpool(EXPORT_QUERIES[dataset], cohort)
+        if query is None:
+            raise HTTPException(status_code=404, detail=f"No {dataset} saved for cohort {cohort}")
+        sql, columns = query
+        body = await export.open_stream(sql, columns, format)
+        return StreamingResponse(
+            body,
+            media_type=export.EXPORT_FORMATS[format],
+            headers={"Content-Disposition": f'attachment; filename="{dataset}_{cohort}.{format}"'},
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"Error exporting {dataset}: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+# Live updates for open dashboard/student tabs
+@app.get("/api/events", include_in_schema=False)
+async def stream_events(user: dict = Depends(get_current_user)):
+    """Server-Sent Events stream of submissions, project edits and allocation progress.
+
+    Admins get every event; students only the cohort-wide submission counts.
+    """
+    return StreamingResponse(
+        events.broadcaster.stream(admin=user["role"] == "admin"),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 # API endpoint for projects (used by frontend)
 @app.get("/api/projects", include_in_schema=False)
 async def get_api_projects():
@@ -520,22 +791,19 @@ async def get_projects():
 # Schedule Management API endpoints
 @app.get("/api/schedule", include_in_schema=False)
 async def get_allocation_schedule():
-    """Get the current allocation schedule"""
+    """Get the current allocation schedule (held in memory by app/scheduler.py)"""
     try:
-        schedule_path = Path(__file__).parent.parent / "data" / "schedule.json"
-        if not schedule_path.exists():
-            return {
-                "end_date": None
-            }
-        
-        with open(schedule_path, "r", encoding="utf-8") as f:
-            schedule = json.load(f)
-        return schedule
+        return scheduler.scheduler.get()
     except Exception as e:
         print(f"Error loading schedule: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/api/schedule", include_in_schema=False)
+@app.get("/api/schedule/status", dependencies=[Depends(admin_only)], include_in_schema=False)
+async def get_schedule_status():
+    """Deadline phase (open / warming / closed), last pre-warm and the scheduled run"""
+    return scheduler.scheduler.status()
+
+@app.post("/api/schedule", dependencies=[Depends(admin_only)], include_in_schema=False)
 async def update_allocation_schedule(schedule_data: dict = Body(...)):
     """Update the allocation schedule"""
     try:
@@ -545,18 +813,12 @@ async def update_allocation_schedule(schedule_data: dict = Body(...)):
         
         # Validate date format
         try:
-            from datetime import datetime
-            if schedule_data["end_date"]:
-                datetime.fromisoformat(schedule_data["end_date"].replace('Z', '+00:00'))
+            scheduler.parse_deadline(schedule_data["end_date"])
         except ValueError:
             raise HTTPException(status_code=400, detail="Invalid date format. Use ISO format (YYYY-MM-DDTHH:MM)")
         
-        # Save schedule
-        schedule_path = Path(__file__).parent.parent / "data" / "schedule.json"
-        schedule_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        with open(schedule_path, "w", encoding="utf-8") as f:
-            json.dump(schedule_data, f, ensure_ascii=False, indent=2)
+        # Save schedule (the scheduler re-arms for the new deadline)
+        scheduler.scheduler.update(schedule_data)
         
         return {"ok": True, "message": "Allocation deadline updated successfully"}
         
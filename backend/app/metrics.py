@@ -0,0 +1,247 @@
+# app/metrics.py
+# small in-process metrics registry (counters, gauges, histograms) rendered in the Prometheus
+# text exposition format. Recording is a dict lookup plus a bisect, all the formatting work only
+# happens when /metrics is scraped, so it costs next to nothing when nobody is looking.
+import threading
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Sequence, Tuple
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    @abstractmethod
+    def _samples(self) -> List[str]:
+        """The exposition lines for this metric's current values"""
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.label_names, lv)} {_format_value(v)}"
+            for lv, v in items
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, *label_values: str, amount: float = 1.0) -> None:
+        self.inc(*label_values, amount=-amount)
+
+    def set(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            self._values[label_values] = float(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [per-bucket counts (non cumulative) + overflow, sum]
+        self._series: Dict[LabelValues, List] = {}
+
+    def observe(self, value: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *label_values: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(lv, list(counts), total) for lv, (counts, total) in self._series.items()]
+
+        lines = []
+        for lv, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.label_names, lv, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.label_names, lv)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.label_names, lv)} {cumulative}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+HTTP_REQUESTS = REGISTRY.register(Counter(
+    "http_requests_total", "HTTP requests handled, by route and status code.",
+    ("method", "route", "status"),
+))
+HTTP_LATENCY = REGISTRY.register(Histogram(
+    "http_request_duration_seconds", "Time spent handling HTTP requests.",
+    ("method", "route"),
+))
+HTTP_IN_FLIGHT = REGISTRY.register(Gauge(
+    "http_requests_in_flight", "HTTP requests currently being handled.",
+))
+ALLOCATION_PHASE = REGISTRY.register(Histogram(
+    "allocation_phase_duration_seconds", "Time spent in each phase of an allocation run.",
+    ("phase",),
+))
+ALLOCATION_RUNS = REGISTRY.register(Counter(
+    "allocation_runs_total", "Allocation runs started.",
+))
+ADMISSION_REJECTED = REGISTRY.register(Counter(
+    "admission_rejected_total", "Requests turned away with 429 by admission control, by policy and reason.",
+    ("policy", "reason"),
+))
+ADMISSION_WAIT = REGISTRY.register(Histogram(
+    "admission_wait_seconds", "Time admitted requests spent queued for a slot.",
+    ("policy",),
+))
+
+
+_phase_listeners: List[Callable[[str, float], None]] = []
+
+
+def add_phase_listener(listener: Callable[[str, float], None]) -> None:
+    _phase_listeners.append(listener)
+
+
+def observe_phase(phase: str, seconds: float) -> None:
+    ALLOCATION_PHASE.observe(seconds, phase)
+    for listener in _phase_listeners:
+        listener(phase, seconds)
+
+
+@contextmanager
+def phase_timer(phase: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_phase(phase, time.perf_counter() - start)
+
+
+# long-lived responses (SSE, streamed exports): their "latency" is how long the client stayed,
+# so they'd swamp the histogram and sit in the in-flight gauge for as long as they're open
+STREAMING_PATHS = ("/api/events", "/api/export/")
+
+
+def is_streaming(scope) -> bool:
+    return scope.get("path", "").startswith(STREAMING_PATHS)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, status and in-flight counts per route template.
+
+    Streaming routes (STREAMING_PATHS) are only counted, not timed or kept in flight."""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        timed = not is_streaming(scope)
+        if timed:
+            HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            # route templates (not raw paths) keep the label set small
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            if timed:
+                HTTP_IN_FLIGHT.dec()
+                HTTP_LATENCY.observe(elapsed, method, route_path)
+            HTTP_REQUESTS.inc(method, route_path, str(status["code"]))
@@ -1,7 +1,8 @@
 # app/models.py
 
-from pydantic import BaseModel
-from typing import List, Dict, Optional
+from pydantic import BaseModel, Field, StringConstraints, TypeAdapter, model_validator
+from typing import Annotated, Any, List, Dict, Literal, Optional
+from app import skill_vocab
 
 class Student(BaseModel):
     name: str
@@ -34,4 +35,85 @@ class AllocationSummary(BaseModel):
 
 class AllocationResult(BaseModel):
     allocations: Dict[str, str]   
-    summary: AllocationSummary
\ No newline at end of file
+    summary: AllocationSummary
+
+
+# --- submission request models ---
+# the student form posts the whole group at once, students as "name, student_id, unikey, UoS_code"
+# strings and the WAM as a count per grade band. These replace the hand-rolled checks in
+# POST /api/students and turn a submission straight into Student records.
+
+# mid-point WAM given to each student of a band (the form only collects band counts)
+WAM_BAND_MIDPOINTS = (("hd", 87.5), ("d", 80.0), ("cr", 70.0), ("p", 57.5))
+
+class WamDistribution(BaseModel):
+    hd: Optional[int] = Field(0, ge=0)
+    d: Optional[int] = Field(0, ge=0)
+    cr: Optional[int] = Field(0, ge=0)
+    p: Optional[int] = Field(0, ge=0)
+
+    @property
+    def total(self) -> int:
+        # the form sends null for a band left blank
+        return (self.hd or 0) + (self.d or 0) + (self.cr or 0) + (self.p or 0)
+
+
+# TutorialCode_TutorialDayTime_GroupNumber, and "name, student_id, unikey, UoS_code". The student ID
+# is stored as BIGINT ("Student") and int64 (app/cohort_table.py), so it's 1-18 digits
+GroupName = Annotated[str, StringConstraints(min_length=1, pattern=r"^[^_]*_[^_]*_[^_]*$")]
+StudentString = Annotated[str, StringConstraints(pattern=r"^[^,]*,\s*[0-9]{1,18}\s*,[^,]*,[^,]*$")]
+
+
+class GroupSubmission(BaseModel):
+    # format checks are regex/length constraints run inside pydantic-core straight off the
+    # JSON bytes; only the WAM total needs a python validator
+    group_name: GroupName
+    students: List[StudentString] = Field(min_length=5, max_length=7)
+    wam_distribution: WamDistribution
+    dual_enrollment: Literal["Yes", "No"]
+    suitability_description: str = Field(min_length=1)
+    skills: List[str] = []
+    project_preferences: List[str] = []
+
+    @model_validator(mode="after")
+    def _wam_matches_group_size(self) -> "GroupSubmission":
+        if self.wam_distribution.total != len(self.students):
+            raise ValueError("WAM distribution must sum to the number of students in the group")
+        return self
+
+    def to_records(self, tutor_code: str = "T01") -> List[Dict[str, Any]]:
+        """Student records (Student fields, as stored in students.json), one per group member"""
+        # students are given their band's mid-point WAM in form order: HD first, then D, CR, P
+        wams: List[float] = []
+        for band, midpoint in WAM_BAND_MIDPOINTS:
+            wams.extend([midpoint] * (getattr(self.wam_distribution, band) or 0))
+
+        dual = self.dual_enrollment == "Yes"
+        # like the form always did, group members share the group's skills/preferences lists
+        skills = list(skill_vocab.parse_skills(self.skills))
+        preferences = self.project_preferences
+        records = []
+        for entry, wam in zip(self.students, wams):
+            name, student_id, unikey, unit_code = [part.strip() for part in entry.split(",")]
+            records.append({
+                "name": name,
+                "student_id": student_id,
+                "unikey": unikey,
+                "unit_code": unit_code,
+                "wam": wam,
+                "group_id": self.group_name,
+                "tutor_code": tutor_code,
+                "dual_project_enrollment": dual,
+                "skills": skills,
+                "project_preferences": preferences,
+            })
+        return records
+
+    def to_students(self, tutor_code: str = "T01") -> List[Student]:
+        # the records come from already validated fields, so skip re-validating them
+        return [Student.model_construct(**r) for r in self.to_records(tutor_code)]
+
+
+# built once at import, TypeAdapter construction is the expensive part
+SUBMISSION_ADAPTER = TypeAdapter(GroupSubmission)
+
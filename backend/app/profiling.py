@@ -0,0 +1,228 @@
+# app/profiling.py
+# on-demand profiling of single requests in production. An admin adds "X-Profile: 1" (or
+# ?profile=1) to a request; the middleware then samples the stacks of the threads working on it
+# every PROFILE_INTERVAL_MS until the response is done and keeps the result as collapsed stacks
+# ("outer;inner;leaf count" lines), which flamegraph.pl and speedscope read directly.
+#
+# The threads sampled are the event loop thread (the handler itself) and any threadpool thread
+# while it works for the request: functions decorated with @profiled (the allocation engines) and
+# anything handed to this module's run_in_threadpool, which main.py uses for its DB work (summary,
+# run diffs, explanations, ...). The loop thread also serves other requests meanwhile, so their
+# frames can show up too.
+#
+# Requests without the header/parameter only pay for looking for it. At most MAX_ACTIVE profiles
+# run at once and the last PROFILE_KEEP are kept (GET /api/admin/profiles). Streaming routes
+# (metrics.is_streaming: the event stream, exports) are never profiled, since they'd hold a slot
+# for as long as the client stays connected.
+import itertools
+import os
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from functools import wraps
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from urllib.parse import parse_qs
+
+from fastapi.concurrency import run_in_threadpool as _run_in_threadpool
+
+from app import auth, metrics
+
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "2"))
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "20"))
+MAX_ACTIVE = 2
+# deepest stack kept per sample
+MAX_DEPTH = 128
+
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_profiles: "OrderedDict[int, Profile]" = OrderedDict()
+_active_count = 0
+_current: ContextVar[Optional["Profile"]] = ContextVar("request_profile", default=None)
+
+
+class Profile:
+    def __init__(self, method: str, path: str, interval: float) -> None:
+        self.id = next(_ids)
+        self.method = method
+        self.path = path
+        self.route: Optional[str] = None
+        self.status: Optional[int] = None
+        self.interval = interval
+        self.started = time.time()
+        self.seconds = 0.0
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        # thread id -> how many profiled calls it's inside
+        self._threads: Counter = Counter()
+        self._threads_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sampler = threading.Thread(target=self._sample_loop, name=f"profile-{self.id}", daemon=True)
+
+    # --- threads to sample ---
+    def enter_thread(self) -> None:
+        with self._threads_lock:
+            self._threads[threading.get_ident()] += 1
+
+    def leave_thread(self) -> None:
+        ident = threading.get_ident()
+        with self._threads_lock:
+            self._threads[ident] -= 1
+            if self._threads[ident] <= 0:
+                del self._threads[ident]
+
+    # --- sampling ---
+    def start(self) -> None:
+        self._start = time.perf_counter()
+        self._sampler.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._sampler.join()
+        self.seconds = time.perf_counter() - self._start
+
+    def _sample_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            with self._threads_lock:
+                threads = list(self._threads)
+            for ident in threads:
+                frame = frames.get(ident)
+                if frame is not None:
+                    self.stacks[_collapse(frame)] += 1
+                    self.samples += 1
+
+    # --- output ---
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "route": self.route,
+            "status": self.status,
+            "started": self.started,
+            "ms": round(self.seconds * 1000, 2),
+            "interval_ms": round(self.interval * 1000, 3),
+            "samples": self.samples,
+        }
+
+
+def _frame_name(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({Path(code.co_filename).name}:{code.co_firstlineno})"
+
+
+def _collapse(frame) -> str:
+    names: List[str] = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+def profiled(fn):
+    """Sample this function's thread too when it runs for a profiled request (threadpool work)"""
+    @wraps(fn)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return fn(*args, **kwargs)
+        profile.enter_thread()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profile.leave_thread()
+    return wrapper
+
+
+async def run_in_threadpool(fn, *args, **kwargs):
+    """fastapi's run_in_threadpool, sampling the worker thread too when the request is profiled"""
+    if _current.get() is not None:
+        fn = profiled(fn)
+    return await _run_in_threadpool(fn, *args, **kwargs)
+
+
+# --- requests ---
+def _requested(scope) -> bool:
+    for name, value in scope["headers"]:
+        if name == b"x-profile" and value not in (b"", b"0"):
+            return True
+    query = scope.get("query_string") or b""
+    return b"profile=" in query and parse_qs(query.decode("latin-1")).get("profile", ["0"])[0] not in ("", "0")
+
+
+def _is_admin(scope) -> bool:
+    user = auth.user_from_scope(scope)
+    return user is not None and user["role"] == "admin"
+
+
+def _begin(scope) -> Optional[Profile]:
+    global _active_count
+    with _lock:
+        if _active_count >= MAX_ACTIVE:
+            return None
+        _active_count += 1
+    return Profile(scope.get("method", ""), scope.get("path", ""), PROFILE_INTERVAL_MS / 1000)
+
+
+def _finish(profile: Profile) -> None:
+    global _active_count
+    with _lock:
+        _active_count -= 1
+        _profiles[profile.id] = profile
+        while len(_profiles) > PROFILE_KEEP:
+            _profiles.popitem(last=False)
+
+
+class ProfilingMiddleware:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http" or not _requested(scope)
+            or metrics.is_streaming(scope) or not _is_admin(scope)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        profile = _begin(scope)
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_id(message):
+            if message["type"] == "http.response.start":
+                profile.status = message["status"]
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", str(profile.id).encode())]
+            await send(message)
+
+        token = _current.set(profile)
+        profile.enter_thread()
+        profile.start()
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            profile.stop()
+            profile.leave_thread()
+            _current.reset(token)
+            profile.route = getattr(scope.get("route"), "path", None)
+            _finish(profile)
+
+
+# --- stored profiles ---
+def list_profiles() -> List[Dict[str, Any]]:
+    with _lock:
+        return [p.info() for p in reversed(_profiles.values())]
+
+
+def get_profile(profile_id: int) -> Optional[Profile]:
+    with _lock:
+        return _profiles.get(profile_id)
@@ -0,0 +1,174 @@
+# app/run_history.py
+# every saved allocation run is also kept as history, so two runs can be compared. "Allocation_Runs"
+# holds one row per run. Per cohort, "Allocation_Run_Results" holds each run's (group, project)
+# rows and "Allocation_Run_Demand" each run's per-project demand. The newest RUN_HISTORY_KEEP
+# runs per cohort are kept.
+#
+# A diff is two queries the database answers in one pass each: both runs' results grouped by
+# group_id, which pairs each group's project before and after (an outer join of the two runs
+# without a per-row lookup; moved / newly allocated / unallocated groups), and both runs' demand
+# and fill rows grouped by project_id (per-project deltas). Both read through the (cohort, run_id,
+# ...) primary key, and only the rows that differ come back to Python.
+import os
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from data.cohorts import ensure_partition, existing_partition, partition_name, validate_cohort
+from data.db_connection import fetch_all_dicts, get_conn
+
+RUNS_TABLE = '"Allocation_Runs"'
+RUN_RESULTS_TABLE = '"Allocation_Run_Results"'
+RUN_DEMAND_TABLE = '"Allocation_Run_Demand"'
+RUN_HISTORY_KEEP = int(os.getenv("RUN_HISTORY_KEEP", "20"))
+
+
+def _ensure_tables(cur, cohort: str):
+    cur.execute(f"""
+    CREATE TABLE IF NOT EXISTS {RUNS_TABLE} (
+        id SERIAL PRIMARY KEY,
+        cohort     TEXT NOT NULL,
+        created_at DOUBLE PRECISION NOT NULL,
+        group_count INT,
+        allocated_count INT
+    );
+    """)
+    results = ensure_partition(cur, RUN_RESULTS_TABLE, cohort)
+    demand = ensure_partition(cur, RUN_DEMAND_TABLE, cohort)
+    return results, demand
+
+
+def record_run(
+    allocations: Dict[str, str],
+    summary: Dict[str, Any],
+    group_count: int,
+    cohort: str,
+) -> int:
+    """Keep a saved run for later diffs; returns its run id"""
+    cohort = validate_cohort(cohort)
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            results, demand = _ensure_tables(cur, cohort)
+            cur.execute(
+                f"INSERT INTO {RUNS_TABLE} (cohort, created_at, group_count, allocated_count) "
+                f"VALUES (%s, %s, %s, %s) RETURNING id;",
+                (cohort, time.time(), group_count, len(allocations)),
+            )
+            run_id = cur.fetchone()["id"]
+            cur.executemany(
+                f"INSERT INTO {results} (cohort, run_id, group_id, project_id) VALUES (%s, %s, %s, %s);",
+                [(cohort, run_id, gid, pid) for gid, pid in allocations.items()],
+            )
+            cur.executemany(
+                f"INSERT INTO {demand} (cohort, run_id, project_id, chosen_count) VALUES (%s, %s, %s, %s);",
+                [(cohort, run_id, pid, int(n)) for pid, n in (summary.get("project_demand") or {}).items()],
+            )
+
+            # everything older than the newest RUN_HISTORY_KEEP runs of this cohort goes
+            cur.execute(
+                f"SELECT id FROM {RUNS_TABLE} WHERE cohort = %s ORDER BY id DESC LIMIT 1 OFFSET %s;",
+                (cohort, RUN_HISTORY_KEEP),
+            )
+            cutoff = cur.fetchone()
+            if cutoff:
+                for table in (results, demand):
+                    cur.execute(f"DELETE FROM {table} WHERE run_id <= %s;", (cutoff["id"],))
+                cur.execute(f"DELETE FROM {RUNS_TABLE} WHERE cohort = %s AND id <= %s;", (cohort, cutoff["id"]))
+        conn.commit()
+        return run_id
+    finally:
+        conn.close()
+
+
+def list_runs(cohort: str) -> List[Dict[str, Any]]:
+    """The cohort's kept runs, newest first"""
+    cohort = validate_cohort(cohort)
+    # record_run creates the runs table and the cohort's tables together; none means no runs
+    if existing_partition(RUN_RESULTS_TABLE, cohort) is None:
+        return []
+
+    rows = fetch_all_dicts(
+        f"SELECT id, created_at, group_count, allocated_count FROM {RUNS_TABLE} "
+        f"WHERE cohort = %s ORDER BY id DESC;",
+        (cohort,),
+    )
+    return [dict(r) for r in rows]
+
+
+def diff_runs(cohort: str, base: Optional[int] = None, head: Optional[int] = None) -> Optional[Dict[str, Any]]:
+    """What changed from run base to run head (defaults: the latest run against the one before it).
+
+    None when the cohort doesn't have those runs.
+    """
+    cohort = validate_cohort(cohort)
+    runs = {r["id"]: r for r in list_runs(cohort)}
+    order = list(runs)
+    if head is None:
+        head = order[0] if order else None
+    if base is None and head in runs:
+        older = [rid for rid in order if rid < head]
+        base = older[0] if older else None
+    if base not in runs or head not in runs:
+        return None
+
+    # list_runs found runs, so the cohort's tables exist
+    results = partition_name(RUN_RESULTS_TABLE, cohort)
+    demand = partition_name(RUN_DEMAND_TABLE, cohort)
+
+    # both runs' rows side by side per group; a group missing from one run has NULL there
+    groups = fetch_all_dicts(
+        f"""
+        SELECT group_id, project_before, project_after,
+               CASE WHEN project_before IS NULL THEN 'allocated'
+                    WHEN project_after IS NULL THEN 'unallocated'
+                    ELSE 'moved' END AS change
+        FROM (
+            SELECT group_id,
+                   MAX(CASE WHEN run_id = %s THEN project_id END) AS project_before,
+                   MAX(CASE WHEN run_id = %s THEN project_id END) AS project_after
+            FROM {results} WHERE cohort = %s AND run_id IN (%s, %s)
+            GROUP BY group_id
+        ) paired
+        WHERE project_before IS DISTINCT FROM project_after
+        ORDER BY group_id;
+        """,
+        (base, head, cohort, base, head),
+    )
+
+    # demand and fill of both runs as one stream of rows, summed per project
+    projects = fetch_all_dicts(
+        f"""
+        SELECT project_id, demand_before, demand_after, demand_after - demand_before AS demand_delta,
+               filled_before, filled_after, filled_after - filled_before AS filled_delta
+        FROM (
+            SELECT project_id,
+                   SUM(CASE WHEN run_id = %s THEN chosen ELSE 0 END) AS demand_before,
+                   SUM(CASE WHEN run_id = %s THEN chosen ELSE 0 END) AS demand_after,
+                   SUM(CASE WHEN run_id = %s THEN filled ELSE 0 END) AS filled_before,
+                   SUM(CASE WHEN run_id = %s THEN filled ELSE 0 END) AS filled_after
+            FROM (
+                SELECT run_id, project_id, chosen_count AS chosen, 0 AS filled
+                FROM {demand} WHERE cohort = %s AND run_id IN (%s, %s)
+                UNION ALL
+                SELECT run_id, project_id, 0 AS chosen, 1 AS filled
+                FROM {results} WHERE cohort = %s AND run_id IN (%s, %s)
+            ) per_run
+            GROUP BY project_id
+        ) totals
+        WHERE demand_before <> demand_after OR filled_before <> filled_after
+        ORDER BY project_id;
+        """,
+        (base, head, base, head, cohort, base, head, cohort, base, head),
+    )
+
+    groups = [dict(r) for r in groups]
+    counts = Counter(r["change"] for r in groups)
+    return {
+        "cohort": cohort,
+        "base": runs[base],
+        "head": runs[head],
+        "counts": {change: counts.get(change, 0) for change in ("moved", "allocated", "unallocated")},
+        "groups": groups,
+        "projects": [dict(r) for r in projects],
+    }
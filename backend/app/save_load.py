@@ -1,34 +1,109 @@
 
 # app/save_load.py
-from typing import Any, List, Dict, Tuple
+import copy
+import os
+import threading
+import time
+from typing import Any, Callable, List, Dict, Optional, Tuple
 from data.db_connection import get_conn, fetch_all_dicts
+from data.cohorts import current_cohort, ensure_partition, existing_partition, partition_name, validate_cohort
+from app import skill_vocab
 
 PROJECTS_TABLE = '"Project_List"'
 ALLOC_TABLE = '"Allocation_Results"'
+EXPLAIN_TABLE = '"Allocation_Explanations"'
+MEMBERS_TABLE = '"Allocation_Members"'
+SUMMARY_TABLE = '"Allocation_Summary"'
+DEMAND_TABLE = '"Project_Demand"'
+SKILL_TABLE = '"Skill_Coverage"'
+CACHE_VERSION_TABLE = '"Cache_Version"'
+TRIGGER_TABLE = '"Schedule_Triggers"'
 
+# --- read cache ---
+# summary and project reads are served from memory. Within CACHE_TTL_SECONDS nothing is checked;
+# after that one cheap query compares a version counter row (bumped in the same transaction as
+# every save) so workers notice each other's writes. Saves in this process invalidate right away.
+CACHE_TTL_SECONDS = float(os.getenv("READ_CACHE_TTL", "5"))
 
+_read_cache: Dict[str, Tuple[int, float, Any]] = {}
+_read_cache_lock = threading.Lock()
+_version_table_ready = False
 
-def normalize_required_skills(value: Any) -> List[str]:
-    if value is None:
-        return []
-    if isinstance(value, (list, tuple)):
-        return [str(x).strip() for x in value]
 
-    s = str(value).strip()
-    if not s:
-        return []
-    try:
-        import json
-        parsed = json.loads(s)
-        if isinstance(parsed, (list, tuple)):
-            return [str(x).strip() for x in parsed]
-    except Exception:
-        pass
-    parts = [p.strip() for p in s.replace(";", ",").split(",")]
-    return [p for p in parts if p]
+def _ensure_version_table(cur) -> None:
+    cur.execute(f"""
+    CREATE TABLE IF NOT EXISTS {CACHE_VERSION_TABLE} (
+        name    TEXT PRIMARY KEY,
+        version BIGINT NOT NULL
+    );
+    """)
+
+
+def bump_cache_version(cur, name: str) -> None:
+    """Call inside the writing transaction so the new version commits with the data"""
+    _ensure_version_table(cur)
+    cur.execute(
+        f"""
+        INSERT INTO {CACHE_VERSION_TABLE} (name, version) VALUES (%s, 1)
+        ON CONFLICT (name) DO UPDATE SET version = {CACHE_VERSION_TABLE}.version + 1;
+        """,
+        (name,),
+    )
+
+
+def invalidate_read_cache(name: str = None) -> None:
+    with _read_cache_lock:
+        if name is None:
+            _read_cache.clear()
+        else:
+            _read_cache.pop(name, None)
+
+
+def cache_version(name: str) -> int:
+    global _version_table_ready
+    if not _version_table_ready:
+        conn = get_conn()
+        try:
+            with conn.cursor() as cur:
+                _ensure_version_table(cur)
+            conn.commit()
+        finally:
+            conn.close()
+        _version_table_ready = True
+
+    rows = fetch_all_dicts(f"SELECT version FROM {CACHE_VERSION_TABLE} WHERE name = %s;", (name,))
+    return int(rows[0]["version"]) if rows else 0
+
+
+def _cached_read(name: str, loader: Callable[[], Any]) -> Any:
+    now = time.monotonic()
+    with _read_cache_lock:
+        entry = _read_cache.get(name)
+    if entry and now - entry[1] < CACHE_TTL_SECONDS:
+        return copy.deepcopy(entry[2])
+
+    # version is read before loading: a write racing the load just means a reload next time
+    version = cache_version(name)
+    if entry and entry[0] == version:
+        value = entry[2]
+    else:
+        value = loader()
+    with _read_cache_lock:
+        _read_cache[name] = (version, now, value)
+    return copy.deepcopy(value)
+
+
+
+def normalize_required_skills(value: Any) -> List[str]:
+    # parsing is cached per distinct stored string in the shared vocabulary
+    return list(skill_vocab.parse_skills(value))
 
 
 def load_projects_from_db(table_fullname: str = PROJECTS_TABLE) -> List[Dict[str, Any]]:
+    return _cached_read(f"projects:{table_fullname}", lambda: _load_projects(table_fullname))
+
+
+def _load_projects(table_fullname: str) -> List[Dict[str, Any]]:
     sql = f"""
         SELECT project_id AS id, required_skills
         FROM {table_fullname}
@@ -43,61 +118,154 @@ def load_projects_from_db(table_fullname: str = PROJECTS_TABLE) -> List[Dict[str
     return projects
 
 
+def _index_name(table_fullname: str, column: str) -> str:
+    return table_fullname.strip('"') + f"_{column}_idx"
+
+
+def _ensure_alloc_table(cur, table_fullname: str, cohort: str) -> str:
+    table = ensure_partition(cur, table_fullname, cohort, layout=ALLOC_TABLE)
+    # lookups by project on results day
+    cur.execute(f'CREATE INDEX IF NOT EXISTS "{_index_name(table, "project")}" ON {table} (project_id);')
+    return table
+
+
+def _ensure_members_table(cur, table_fullname: str, cohort: str) -> str:
+    table = ensure_partition(cur, table_fullname, cohort, layout=MEMBERS_TABLE)
+    for column in ("group_id", "tutor_code"):
+        cur.execute(f'CREATE INDEX IF NOT EXISTS "{_index_name(table, column)}" ON {table} ({column});')
+    return table
+
+
 def save_allocations_to_db(
     allocations: Dict[str, str],
     table_fullname: str = ALLOC_TABLE,
     upsert: bool = True,
     replace_all: bool = False,
+    cohort: Optional[str] = None,
 ):
     if not allocations:
         return
 
+    cohort = validate_cohort(cohort or current_cohort())
     conn = get_conn()
     try:
         with conn.cursor() as cur:
-            cur.execute(f"""
-            CREATE TABLE IF NOT EXISTS {table_fullname} (
-                group_id   TEXT PRIMARY KEY,
-                project_id TEXT NOT NULL
-            );
-            """)
+            # only this cohort's partition is written (and truncated)
+            table = _ensure_alloc_table(cur, table_fullname, cohort)
 
             if replace_all:
-                cur.execute(f"TRUNCATE TABLE {table_fullname};")
+                cur.execute(f"TRUNCATE TABLE {table};")
 
             if upsert:
                 sql = f"""
-                INSERT INTO {table_fullname} (group_id, project_id)
-                VALUES (%s, %s)
-                ON CONFLICT (group_id)
+                INSERT INTO {table} (cohort, group_id, project_id)
+                VALUES (%s, %s, %s)
+                ON CONFLICT (cohort, group_id)
                 DO UPDATE SET project_id = EXCLUDED.project_id;
                 """
             else:
-                sql = f'INSERT INTO {table_fullname} (group_id, project_id) VALUES (%s, %s);'
+                sql = f'INSERT INTO {table} (cohort, group_id, project_id) VALUES (%s, %s, %s);'
 
-            params = [(gid, pid) for gid, pid in allocations.items()]
+            params = [(cohort, gid, pid) for gid, pid in allocations.items()]
             cur.executemany(sql, params)
+            bump_cache_version(cur, f"allocations:{cohort}")
+
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def save_allocation_members_to_db(
+    members: List[Dict[str, Any]],
+    table_fullname: str = MEMBERS_TABLE,
+    cohort: Optional[str] = None,
+    replace_all: bool = False,
+) -> None:
+    """Who is in each allocated group (one row per student, keyed by unikey)"""
+    if not members and not replace_all:
+        return
+
+    cohort = validate_cohort(cohort or current_cohort())
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            table = _ensure_members_table(cur, table_fullname, cohort)
+
+            if replace_all:
+                cur.execute(f"TRUNCATE TABLE {table};")
+            cur.executemany(
+                f"""
+                INSERT INTO {table} (cohort, unikey, group_id, student_id, name, tutor_code)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON CONFLICT (cohort, unikey) DO UPDATE SET
+                    group_id = EXCLUDED.group_id,
+                    student_id = EXCLUDED.student_id,
+                    name = EXCLUDED.name,
+                    tutor_code = EXCLUDED.tutor_code;
+                """,
+                [
+                    (cohort, m["unikey"], m["group_id"], m.get("student_id"), m.get("name"), m.get("tutor_code"))
+                    for m in members
+                ],
+            )
+            bump_cache_version(cur, f"allocations:{cohort}")
 
         conn.commit()
     finally:
         conn.close()
 
 
+def load_allocation_rows(
+    table_fullname: str = ALLOC_TABLE,
+    members_table: str = MEMBERS_TABLE,
+    cohort: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    """A cohort's saved allocations joined with their members (groups without member rows come back once, unikey NULL)"""
+    cohort = validate_cohort(cohort or current_cohort())
+    table = existing_partition(table_fullname, cohort)
+    if table is None:
+        return []  # no run saved for this cohort
+    members = existing_partition(members_table, cohort)
+    if members is None:
+        rows = fetch_all_dicts(
+            f"SELECT group_id, project_id, NULL AS unikey, NULL AS student_id, NULL AS name, NULL AS tutor_code "
+            f"FROM {table} ORDER BY group_id;"
+        )
+    else:
+        rows = fetch_all_dicts(
+            f"SELECT r.group_id, r.project_id, m.unikey, m.student_id, m.name, m.tutor_code "
+            f"FROM {table} r LEFT JOIN {members} m ON m.group_id = r.group_id "
+            f"ORDER BY r.group_id;"
+        )
+    return [dict(r) for r in rows]
+
+
 
-def load_summary_from_db() -> Dict[str, Any]:
+def load_summary_from_db(cohort: Optional[str] = None) -> Dict[str, Any]:
+    cohort = validate_cohort(cohort or current_cohort())
+    return _cached_read(f"summary:{cohort}", lambda: _load_summary(cohort))
+
+
+def _load_summary(cohort: str) -> Dict[str, Any]:
     summary_rows = fetch_all_dicts(
         'SELECT average_preference_score, average_skills_score, average_wam_score, dual_project_count '
-        'FROM "Allocation_Summary" ORDER BY id DESC LIMIT 1;'
+        'FROM "Allocation_Summary" WHERE cohort = %s ORDER BY id DESC LIMIT 1;',
+        (cohort,),
     )
     if not summary_rows:
         return {} 
 
     summary: Dict[str, Any] = dict(summary_rows[0])
 
-    demand_rows = fetch_all_dicts('SELECT project_id, chosen_count FROM "Project_Demand";')
+    # a saved summary means its cohort's partitions exist
+    demand_rows = fetch_all_dicts(
+        f'SELECT project_id, chosen_count FROM {partition_name(DEMAND_TABLE, cohort)};'
+    )
     summary["project_demand"] = {r["project_id"]: r["chosen_count"] for r in demand_rows}
 
-    skill_rows = fetch_all_dicts('SELECT skill_name, skill_percentage FROM "Skill_Coverage";')
+    skill_rows = fetch_all_dicts(
+        f'SELECT skill_name, skill_percentage FROM {partition_name(SKILL_TABLE, cohort)};'
+    )
     summary["skill_coverage"] = {r["skill_name"]: float(r["skill_percentage"]) for r in skill_rows}
 
     return summary
@@ -105,14 +273,16 @@ def load_summary_from_db() -> Dict[str, Any]:
 
 def save_summary_to_db(
     summary: Dict[str, Any],
-    summary_table: str = '"Allocation_Summary"',
-    demand_table: str = '"Project_Demand"',
-    skill_table: str = '"Skill_Coverage"',
-    replace_all: bool = True
+    summary_table: str = SUMMARY_TABLE,
+    demand_table: str = DEMAND_TABLE,
+    skill_table: str = SKILL_TABLE,
+    replace_all: bool = True,
+    cohort: Optional[str] = None,
 ) -> None:
     if not summary:
         return
 
+    cohort = validate_cohort(cohort or current_cohort())
     conn = get_conn()
     try:
         with conn.cursor() as cur:
@@ -120,6 +290,7 @@ def save_summary_to_db(
             cur.execute(f'''
                 CREATE TABLE IF NOT EXISTS {summary_table} (
                     id SERIAL PRIMARY KEY,
+                    cohort                  TEXT,
                     average_preference_score FLOAT,
                     average_skills_score    FLOAT,
                     average_wam_score       FLOAT,
@@ -130,10 +301,11 @@ def save_summary_to_db(
             cur.execute(
                 f'''
                 INSERT INTO {summary_table}
-                (average_preference_score, average_skills_score, average_wam_score, dual_project_count)
-                VALUES (%s, %s, %s, %s);
+                (cohort, average_preference_score, average_skills_score, average_wam_score, dual_project_count)
+                VALUES (%s, %s, %s, %s, %s);
                 ''',
                 (
+                    cohort,
                     summary.get("average_preference_score"),
                     summary.get("average_skills_score"),
                     summary.get("average_wam_score"),
@@ -141,54 +313,181 @@ def save_summary_to_db(
                 ),
             )
 
-            # 2) Project_Demand
-            cur.execute(f'''
-                CREATE TABLE IF NOT EXISTS {demand_table} (
-                    project_id   TEXT PRIMARY KEY,
-                    chosen_count INT NOT NULL
-                );
-            ''')
+            # 2) Project_Demand (this cohort's partition)
+            demand_part = ensure_partition(cur, demand_table, cohort, layout=DEMAND_TABLE)
             if replace_all:
-                cur.execute(f'TRUNCATE TABLE {demand_table};')
+                cur.execute(f'TRUNCATE TABLE {demand_part};')
 
-            demand_rows: List[Tuple[str, int]] = [
-                (pid, int(count)) for pid, count in (summary.get("project_demand") or {}).items()
+            demand_rows: List[Tuple[str, str, int]] = [
+                (cohort, pid, int(count)) for pid, count in (summary.get("project_demand") or {}).items()
             ]
             if demand_rows:
                 cur.executemany(
                     f'''
-                    INSERT INTO {demand_table} (project_id, chosen_count)
-                    VALUES (%s, %s)
-                    ON CONFLICT (project_id) DO UPDATE
+                    INSERT INTO {demand_part} (cohort, project_id, chosen_count)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (cohort, project_id) DO UPDATE
                     SET chosen_count = EXCLUDED.chosen_count;
                     ''',
                     demand_rows,
                 )
 
-            # 3) Skill_Coverage
-            cur.execute(f'''
-                CREATE TABLE IF NOT EXISTS {skill_table} (
-                    skill_name       TEXT PRIMARY KEY,
-                    skill_percentage FLOAT NOT NULL
-                );
-            ''')
+            # 3) Skill_Coverage (this cohort's partition)
+            skill_part = ensure_partition(cur, skill_table, cohort, layout=SKILL_TABLE)
             if replace_all:
-                cur.execute(f'TRUNCATE TABLE {skill_table};')
+                cur.execute(f'TRUNCATE TABLE {skill_part};')
 
-            skill_rows: List[Tuple[str, float]] = [
-                (name, float(pct)) for name, pct in (summary.get("skill_coverage") or {}).items()
+            skill_rows: List[Tuple[str, str, float]] = [
+                (cohort, name, float(pct)) for name, pct in (summary.get("skill_coverage") or {}).items()
             ]
             if skill_rows:
                 cur.executemany(
                     f'''
-                    INSERT INTO {skill_table} (skill_name, skill_percentage)
-                    VALUES (%s, %s)
-                    ON CONFLICT (skill_name) DO UPDATE
+                    INSERT INTO {skill_part} (cohort, skill_name, skill_percentage)
+                    VALUES (%s, %s, %s)
+                    ON CONFLICT (cohort, skill_name) DO UPDATE
                     SET skill_percentage = EXCLUDED.skill_percentage;
                     ''',
                     skill_rows,
                 )
 
+            bump_cache_version(cur, f"summary:{cohort}")
+
+        conn.commit()
+        invalidate_read_cache(f"summary:{cohort}")
+    finally:
+        conn.close()
+
+
+def save_explanations_to_db(
+    explanations: Dict[str, List[Dict[str, Any]]],
+    table_fullname: str = EXPLAIN_TABLE,
+    replace_all: bool = True,
+    cohort: Optional[str] = None,
+) -> None:
+    if not explanations:
+        return
+
+    cohort = validate_cohort(cohort or current_cohort())
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            # only this cohort's partition is written (and truncated)
+            table = ensure_partition(cur, table_fullname, cohort, layout=EXPLAIN_TABLE)
+
+            if replace_all:
+                cur.execute(f"TRUNCATE TABLE {table};")
+
+            rows = [
+                (
+                    cohort,
+                    gid,
+                    c["rank"],
+                    c["project_id"],
+                    c["total_score"],
+                    c["preference_score"],
+                    c["skills_score"],
+                    c["wam_score"],
+                    c["dual_penalty"],
+                )
+                for gid, candidates in explanations.items()
+                for c in candidates
+            ]
+            cur.executemany(
+                f"""
+                INSERT INTO {table}
+                (cohort, group_id, rank, project_id, total_score, preference_score, skills_score, wam_score, dual_penalty)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (cohort, group_id, rank) DO UPDATE SET
+                    project_id = EXCLUDED.project_id,
+                    total_score = EXCLUDED.total_score,
+                    preference_score = EXCLUDED.preference_score,
+                    skills_score = EXCLUDED.skills_score,
+                    wam_score = EXCLUDED.wam_score,
+                    dual_penalty = EXCLUDED.dual_penalty;
+                """,
+                rows,
+            )
+
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def load_explanation_from_db(
+    group_id: str,
+    table_fullname: str = EXPLAIN_TABLE,
+    cohort: Optional[str] = None,
+) -> List[Dict[str, Any]]:
+    cohort = validate_cohort(cohort or current_cohort())
+    table = existing_partition(table_fullname, cohort)
+    if table is None:
+        return []
+
+    rows = fetch_all_dicts(
+        f'SELECT rank, project_id, total_score, preference_score, skills_score, wam_score, dual_penalty '
+        f'FROM {table} WHERE group_id = %s ORDER BY rank;',
+        (group_id,),
+    )
+    return [dict(r) for r in rows]
+
+
+# --- scheduled runs ---
+# one row per (deadline, cohort): the worker whose INSERT lands runs the allocation, every other
+# worker (or a restart of the same one) sees the row and leaves it alone
+def _ensure_trigger_table(cur) -> None:
+    cur.execute(f"""
+    CREATE TABLE IF NOT EXISTS {TRIGGER_TABLE} (
+        deadline   TEXT NOT NULL,
+        cohort     TEXT NOT NULL,
+        worker     TEXT,
+        status     TEXT,
+        claimed_at DOUBLE PRECISION,
+        PRIMARY KEY (deadline, cohort)
+    );
+    """)
+
+
+def claim_trigger(deadline: str, cohort: str, worker: str, lease: float = 900.0) -> bool:
+    """True for exactly one caller per (deadline, cohort).
+
+    A claim still "running" after lease seconds is taken to belong to a worker that died, and the
+    next caller takes it over.
+    """
+    now = time.time()
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            _ensure_trigger_table(cur)
+            cur.execute(
+                f"""
+                INSERT INTO {TRIGGER_TABLE} (deadline, cohort, worker, status, claimed_at)
+                VALUES (%s, %s, %s, 'running', %s)
+                ON CONFLICT (deadline, cohort) DO UPDATE SET
+                    worker = EXCLUDED.worker,
+                    claimed_at = EXCLUDED.claimed_at
+                WHERE {TRIGGER_TABLE}.status = 'running' AND {TRIGGER_TABLE}.claimed_at < %s;
+                """,
+                (deadline, cohort, worker, now, now - lease),
+            )
+            claimed = cur.rowcount == 1
+        conn.commit()
+        return claimed
+    finally:
+        conn.close()
+
+
+def finish_trigger(deadline: str, cohort: str, status: str, worker: Optional[str] = None) -> None:
+    """Record how a claimed run ended (only if worker still holds the claim, when given)"""
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            sql = f"UPDATE {TRIGGER_TABLE} SET status = %s WHERE deadline = %s AND cohort = %s"
+            params = [status, deadline, cohort]
+            if worker is not None:
+                sql += " AND worker = %s"
+                params.append(worker)
+            cur.execute(sql + ";", params)
         conn.commit()
     finally:
-        conn.close()
\ No newline at end of file
+        conn.close()
@@ -0,0 +1,218 @@
+# app/scheduler.py
+# acts on schedule.json's end_date instead of just storing it. The schedule is kept in memory
+# (re-read only when the file signature changes), and a background thread per worker ticks every
+# SCHEDULER_TICK seconds:
+#   open     more than PREWARM_SECONDS before the deadline: nothing to do
+#   warming  inside that window: keep the cohort table, Groups, aggregates, project list and cohort
+#            snapshot built, so the run at the deadline starts hot
+#   closed   deadline passed: submissions are refused and the allocation is run once
+#
+# Every worker ticks, but a claim row in "Schedule_Triggers" (save_load.claim_trigger) lets only
+# one of them run the allocation for a given deadline and cohort, restarts included. A claim whose
+# run never finished (the worker died) can be taken over once it is TRIGGER_LEASE seconds old.
+# A deadline that was already more than AUTO_ALLOCATE_GRACE seconds old when we noticed it is not run.
+#
+# end_date comes from the admin form as a wall-clock time without an offset; it is read in
+# SCHEDULE_TZ (default Australia/Sydney), whatever timezone the server itself runs in.
+#
+# Off unless asked for: with SCHEDULER=1 the thread is started by the app's startup (lifespan)
+# handler, not on import.
+#   SCHEDULER=0  (default) no thread, no freeze, no automatic run (schedule is still served from memory)
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+from app import cohort_snapshot, events, group_builder, save_load, submission_stats
+from app.algorithm import match_projects
+from app.file_signature import file_signature
+from data.cohorts import current_cohort
+
+SCHEDULE_PATH = Path(__file__).parent.parent / "data" / "schedule.json"
+
+ENABLED = os.getenv("SCHEDULER", "0").strip().lower() in ("1", "true", "yes", "on")
+TICK_SECONDS = float(os.getenv("SCHEDULER_TICK", "5"))
+PREWARM_SECONDS = float(os.getenv("PREWARM_SECONDS", "600"))
+AUTO_ALLOCATE_GRACE = float(os.getenv("AUTO_ALLOCATE_GRACE", "3600"))
+TRIGGER_LEASE = float(os.getenv("TRIGGER_LEASE", "900"))
+
+try:
+    SCHEDULE_TZ = ZoneInfo(os.getenv("SCHEDULE_TZ", "Australia/Sydney"))
+except ZoneInfoNotFoundError as e:
+    print(f"Unknown SCHEDULE_TZ ({e}); reading deadlines as UTC")
+    SCHEDULE_TZ = timezone.utc
+
+
+def parse_deadline(value: Any) -> Optional[float]:
+    """end_date as a unix timestamp; times without an offset (the admin form's) are in SCHEDULE_TZ"""
+    if not value:
+        return None
+    deadline = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if deadline.tzinfo is None:
+        deadline = deadline.replace(tzinfo=SCHEDULE_TZ)
+    return deadline.timestamp()
+
+
+class DeadlineScheduler:
+    def __init__(self, path: Path = SCHEDULE_PATH) -> None:
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._loaded = False
+        self.schedule: Dict[str, Any] = {"end_date": None}
+        self.deadline: Optional[float] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self.worker = f"{socket.gethostname()}:{os.getpid()}"
+        self._reset_run()
+
+    def _reset_run(self) -> None:
+        self.last_prewarm: Optional[Dict[str, Any]] = None
+        self.run: Dict[str, Any] = {"status": "pending"}
+
+    # --- the schedule itself ---
+    def get(self) -> Dict[str, Any]:
+        self._refresh()
+        return dict(self.schedule)
+
+    def update(self, schedule: Dict[str, Any]) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(schedule, f, ensure_ascii=False, indent=2)
+        with self._lock:
+            self._apply(dict(schedule), file_signature(self.path))
+
+    def _refresh(self) -> None:
+        # another worker may have saved a new deadline; a stat per call is all this costs
+        signature = file_signature(self.path)
+        if self._loaded and signature == self._signature:
+            return
+        schedule = {"end_date": None}
+        if signature is not None:
+            with open(self.path, "r", encoding="utf-8") as f:
+                schedule = json.load(f)
+        with self._lock:
+            self._apply(schedule, signature)
+
+    def _apply(self, schedule: Dict[str, Any], signature) -> None:
+        if schedule.get("end_date") != self.schedule.get("end_date"):
+            self._reset_run()
+        self.schedule = schedule
+        self.deadline = parse_deadline(schedule.get("end_date"))
+        self._signature = signature
+        self._loaded = True
+
+    # --- state ---
+    def phase(self, now: Optional[float] = None) -> str:
+        self._refresh()
+        now = time.time() if now is None else now
+        if self.deadline is None or now < self.deadline - PREWARM_SECONDS:
+            return "open"
+        if now < self.deadline:
+            return "warming"
+        return "closed"
+
+    def submissions_open(self) -> bool:
+        return not ENABLED or self.phase() != "closed"
+
+    def status(self) -> Dict[str, Any]:
+        now = time.time()
+        phase = self.phase(now)
+        return {
+            "enabled": ENABLED,
+            "end_date": self.schedule.get("end_date"),
+            "phase": phase,
+            "seconds_left": round(self.deadline - now, 1) if self.deadline is not None and phase != "closed" else None,
+            "last_prewarm": self.last_prewarm,
+            "run": dict(self.run),
+        }
+
+    # --- background work ---
+    def tick(self, now: Optional[float] = None) -> None:
+        now = time.time() if now is None else now
+        phase = self.phase(now)
+        if phase == "warming":
+            self.prewarm()
+        elif phase == "closed" and self.run["status"] == "pending":
+            if now - self.deadline > AUTO_ALLOCATE_GRACE:
+                self.run = {"status": "skipped", "reason": "deadline had already passed"}
+            else:
+                self.trigger()
+
+    def prewarm(self) -> None:
+        start = time.perf_counter()
+        try:
+            # each of these is cached and only rebuilds what changed since the last tick
+            groups = group_builder.load_groups()
+            submission_stats.get_aggregates()
+            projects = save_load.load_projects_from_db()
+            # written once here so the run's pool workers just map it
+            cohort_snapshot.for_groups(groups, projects)
+        except Exception as e:
+            print(f"Error pre-warming allocation inputs: {e}")
+            return
+        self.last_prewarm = {"at": time.time(), "groups": len(groups), "ms": round((time.perf_counter() - start) * 1000, 1)}
+
+    def trigger(self) -> None:
+        end_date = str(self.schedule.get("end_date"))
+        cohort = current_cohort()
+        try:
+            claimed = save_load.claim_trigger(end_date, cohort, self.worker, lease=TRIGGER_LEASE)
+        except Exception as e:
+            print(f"Error claiming scheduled allocation: {e}")
+            return  # tried again next tick
+        if not claimed:
+            self.run = {"status": "claimed elsewhere", "cohort": cohort}
+            return
+
+        self.run = {"status": "running", "cohort": cohort, "started_at": time.time()}
+        status = "failed"
+        try:
+            groups = group_builder.load_groups()
+            if not groups:
+                status = "no submissions"
+                return
+            events.publish("allocation", {"phase": "started", "groups": len(groups), "preview": False, "scheduled": True})
+            result = match_projects(
+                groups, save_to_db=True, aggregates=submission_stats.get_aggregates().snapshot(), cohort=cohort
+            )
+            events.publish("allocation", {"phase": "finished", "allocated": len(result["allocations"]), "scheduled": True})
+            self.run["allocated"] = len(result["allocations"])
+            status = "finished"
+        except Exception as e:
+            print(f"Error running scheduled allocation: {e}")
+            events.publish("allocation", {"phase": "failed", "scheduled": True})
+            self.run["error"] = str(e)
+        finally:
+            self.run.update(status=status, finished_at=time.time())
+            try:
+                save_load.finish_trigger(end_date, cohort, status, self.worker)
+            except Exception as e:
+                print(f"Error recording scheduled allocation: {e}")
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="deadline-scheduler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=TICK_SECONDS)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(TICK_SECONDS):
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Error in deadline scheduler: {e}")
+
+
+scheduler = DeadlineScheduler()
@@ -3,23 +3,16 @@
 # using raw sclae like 1-4 first allows for more flexibility and control as we can emphaisise a grade more and allows us more control over grade weighting (so if client says HD should have more impact we can easily adjust) cleaner math as well 
 # These are used by the matching algorithm in algorithm.py
 # wanted to implement linear skill rating adds more depth to the calcualion and we can justify as well since computer science capstone assumptions were made on what skills are neeeded based on degree capstone graduate qualities
+# the skill ratings themselves live in skill_vocab, next to the aliases that map onto them
+
+from app import skill_vocab
+from app.skill_vocab import skill_ratings
 
-skill_ratings = {
-    "Web Development": 4,
-    "Database": 4,
-    "Algorithms": 4,
-    "Data Science/Analytics/Visualisation": 3,
-    "UI/UX": 3,
-    "Cloud Computing (AWS/AZURE/GCP)": 3,
-    "Image Processing/ Segmentation": 2,
-    "Machine learning /Deep Learning": 4,
-    "Python": 4,
-    "Data analysis": 3,
-}
 wam_weights = {
     "HD": 4,
     "D": 3,
     "C": 2,
+    "CR": 2,  # submissions and the group builder use CR for credit
     "P": 1,
 }
 
@@ -31,8 +24,11 @@ def calculate_preference_score(preferences, project_id):
         return 0
 
 def calculate_skills_score(group_skills, project_skills):
+    # both sides go through the shared vocabulary so "Data Analysis"/"SQL"/"ML" etc. hit the rated keys
+    group_skills = {skill_vocab.rated(skill) for skill in group_skills}
     score = 0
     for skill in project_skills:
+        skill = skill_vocab.rated(skill)
         if skill in group_skills:
             score += skill_ratings.get(skill, 0)
             # matches = set(group_skills) & set(project_skills) # commented out because doesnt account for weights of skills as its flat match ratio
@@ -45,4 +41,4 @@ def calculate_wam_score(wam_breakdown):
     if total == 0:
         return 0
     weighted_score = sum(wam_weights.get(k, 0) * v for k, v in wam_breakdown.items())
-    return weighted_score / (total * 4)  # normalise into the 0-1 scale 
\ No newline at end of file
+    return weighted_score / (total * 4)  # normalise into the 0-1 scale
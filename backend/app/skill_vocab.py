@@ -0,0 +1,178 @@
+# app/skill_vocab.py
+# one shared vocabulary for skill names. Projects, students and the scoring table all spell skills
+# differently ("Data Analysis" vs "Data analysis", "SQL" vs "Database", "ML" vs "Machine learning"),
+# so every name goes through canonical() once: aliases and case/spacing variants resolve through a
+# precomputed lookup table, and each canonical skill is interned to a stable integer ID. Scoring
+# goes one step further with rated(), which maps a canonical name onto the rated skill it counts as.
+# Unknown skills are learned (first spelling seen becomes canonical) up to MAX_LEARNED of them;
+# past that they are only normalised, so user-supplied names can't grow the vocabulary forever.
+# Parsing a stored required_skills string is cached, so each distinct string is only split once.
+import json
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Tuple
+
+# the skills scoring_helpers rates (linear 1-4 weights) are the canonical names everything maps onto
+skill_ratings = {
+    "Web Development": 4,
+    "Database": 4,
+    "Algorithms": 4,
+    "Data Science/Analytics/Visualisation": 3,
+    "UI/UX": 3,
+    "Cloud Computing (AWS/AZURE/GCP)": 3,
+    "Image Processing/ Segmentation": 2,
+    "Machine learning /Deep Learning": 4,
+    "Python": 4,
+    "Data analysis": 3,
+}
+
+# unknown skill spellings remembered at most
+MAX_LEARNED = 1024
+
+# alias -> canonical name (keys are matched case-insensitively). These are the spellings the old
+# export_projects_to_json CANON table wrote, so stored and exported skill names stay as they were.
+ALIASES = {
+    "ml": "ML",
+    "dl": "DL",
+    "ai": "AI",
+    "cv": "CV",
+    "pytorch": "PyTorch",
+    "db": "Database",
+    "sql": "Database",
+    "uiux": "UI/UX",
+    "ui/ux": "UI/UX",
+    "web dev": "Web Development",
+    "web": "Web Development",
+    "js": "JavaScript",
+}
+
+# canonical name -> the rated skill it counts as when scoring (matched case-insensitively). Only
+# rated() uses these, so "ML" is still stored and exported as "ML" but scores as machine learning
+RATED_ALIASES = {
+    "ml": "Machine learning /Deep Learning",
+    "dl": "Machine learning /Deep Learning",
+    "machine learning": "Machine learning /Deep Learning",
+    "deep learning": "Machine learning /Deep Learning",
+    "databases": "Database",
+    "data analytics": "Data analysis",
+    "data science": "Data Science/Analytics/Visualisation",
+    "data visualisation": "Data Science/Analytics/Visualisation",
+    "data visualization": "Data Science/Analytics/Visualisation",
+    "cloud computing": "Cloud Computing (AWS/AZURE/GCP)",
+    "image processing": "Image Processing/ Segmentation",
+    "image segmentation": "Image Processing/ Segmentation",
+    "algorithm design": "Algorithms",
+}
+
+_lock = threading.Lock()
+_lookup: Dict[str, str] = {}
+_ids: Dict[str, int] = {}
+_names: List[str] = []
+_learned = 0
+
+
+def _key(name: str) -> str:
+    return " ".join(name.split()).casefold()
+
+
+def _intern(name: str) -> int:
+    skill_id = _ids.get(name)
+    if skill_id is None:
+        skill_id = _ids[name] = len(_names)
+        _names.append(name)
+        _lookup.setdefault(_key(name), name)
+    return skill_id
+
+
+# rated skills first so their IDs are the same in every process
+for _name in skill_ratings:
+    _intern(_name)
+for _alias, _name in ALIASES.items():
+    _intern(_name)
+    _lookup[_key(_alias)] = _name
+_rated_lookup = {_key(alias): name for alias, name in RATED_ALIASES.items()}
+
+
+@lru_cache(maxsize=4096)
+def canonical(name: str) -> str:
+    key = _key(name)
+    if not key:
+        return ""
+    found = _lookup.get(key)
+    if found is not None:
+        return found
+    # first spelling we see of an unknown skill becomes its canonical form, while there is room
+    global _learned
+    with _lock:
+        found = _lookup.get(key)
+        if found is None:
+            found = " ".join(name.split())
+            if _learned < MAX_LEARNED:
+                _learned += 1
+                _intern(found)
+        return found
+
+
+@lru_cache(maxsize=4096)
+def rated(name: str) -> str:
+    """The rated skill a name counts as when scoring; its canonical name if it isn't one"""
+    found = canonical(name)
+    return _rated_lookup.get(_key(found), found)
+
+
+def skill_id(name: str) -> int:
+    """Stable ID of a skill; -1 for an unknown skill that arrived after the vocabulary filled up"""
+    return _ids.get(canonical(name), -1)
+
+
+def skill_name(skill_id: int) -> str:
+    return _names[skill_id]
+
+
+def vocabulary() -> List[str]:
+    return list(_names)
+
+
+def _split(s: str) -> List[str]:
+    s = s.strip()
+    if not s:
+        return []
+    if s.startswith("["):
+        try:
+            parsed = json.loads(s)
+            if isinstance(parsed, list):
+                return [str(x) for x in parsed]
+        except ValueError:
+            pass
+    # stored lists are ";"-joined (import scripts); fall back to "," / "|" for hand-entered ones.
+    # ";" wins so entries like "DL (CNN,DNN,GNN)" survive
+    return s.split(";") if ";" in s else s.replace("|", ",").split(",")
+
+
+def _dedupe(items: List[str]) -> Tuple[str, ...]:
+    seen = set()
+    out = []
+    for item in items:
+        name = canonical(str(item))
+        if name and name not in seen:
+            seen.add(name)
+            out.append(name)
+    return tuple(out)
+
+
+@lru_cache(maxsize=4096)
+def _parse_string(s: str) -> Tuple[str, ...]:
+    return _dedupe(_split(s))
+
+
+def parse_skills(value: Any) -> Tuple[str, ...]:
+    """Canonical, de-duplicated skills from a list or a stored required_skills string"""
+    if value is None:
+        return ()
+    if isinstance(value, (list, tuple)):
+        return _dedupe(list(value))
+    return _parse_string(str(value))
+
+
+def skill_ids(value: Any) -> Tuple[int, ...]:
+    return tuple(skill_id(name) for name in parse_skills(value))
@@ -0,0 +1,133 @@
+# app/stable_matching.py
+# group-proposing deferred acceptance (Gale-Shapley), as an alternative to the greedy loop in
+# algorithm.py whose result depends on the order groups come in.
+# Groups propose down their project_preferences; each project keeps its best proposers (up to its
+# capacity) ranked by the project-side score, skills and WAM from scoring_helpers, in a min-heap
+# so the weakest held group is the one bumped. Every preference entry is proposed at most once,
+# so the whole run is O(total preference-list length x log capacity).
+# Groups left without a project once their list runs out get no allocation (unlike greedy, which
+# hands out whatever is left); they show up as unallocated in the result.
+import heapq
+from typing import Any, Dict, List, Optional
+
+from app.models import Group
+from app import algorithm, metrics, profiling, save_load, scoring_helpers
+
+
+def project_side_score(group: Group, project: Dict[str, Any]) -> float:
+    # how much a project "wants" a group: the same skills/WAM weights the greedy score uses
+    skills_score = scoring_helpers.calculate_skills_score(group.skills, project["required_skills"])
+    wam_score = scoring_helpers.calculate_wam_score(group.wam_breakdown)
+    return skills_score * algorithm.WEIGHTS["skills"] + wam_score * algorithm.WEIGHTS["wam"]
+
+
+def deferred_acceptance(
+    groups_data: List[Group],
+    projects: List[Dict[str, Any]],
+    capacities: Optional[Dict[str, int]] = None,
+    default_capacity: int = 1,
+) -> Dict[str, str]:
+    """group_id -> project_id for a group-optimal stable matching"""
+    by_id = {p["id"]: p for p in projects}
+    capacities = capacities or {}
+
+    # preference lists restricted to known projects, duplicates dropped
+    prefs: List[List[str]] = []
+    for group in groups_data:
+        prefs.append([pid for pid in dict.fromkeys(group.project_preferences) if pid in by_id])
+
+    next_choice = [0] * len(groups_data)
+    # project_id -> heap of (score, group index); ties go to the group that came first
+    held: Dict[str, List] = {}
+    free = list(range(len(groups_data) - 1, -1, -1))
+
+    while free:
+        gi = free.pop()
+        if next_choice[gi] >= len(prefs[gi]):
+            continue  # list exhausted, stays unallocated
+        pid = prefs[gi][next_choice[gi]]
+        next_choice[gi] += 1
+
+        capacity = capacities.get(pid, default_capacity)
+        if capacity <= 0:
+            free.append(gi)
+            continue
+
+        entry = (project_side_score(groups_data[gi], by_id[pid]), -gi)
+        heap = held.setdefault(pid, [])
+        if len(heap) < capacity:
+            heapq.heappush(heap, entry)
+        elif entry > heap[0]:
+            _, bumped = heapq.heapreplace(heap, entry)
+            free.append(-bumped)
+        else:
+            free.append(gi)
+
+    allocations = {}
+    for pid, heap in held.items():
+        for _, neg_gi in heap:
+            allocations[groups_data[-neg_gi].group_id] = pid
+    # caller's group order
+    return {g.group_id: allocations[g.group_id] for g in groups_data if g.group_id in allocations}
+
+
+@profiling.profiled
+def match_projects_stable(
+    groups_data: List[Group],
+    projects_table: str = save_load.PROJECTS_TABLE,
+    save_to_db: bool = True,
+    explain_top_k: int = algorithm.EXPLAIN_TOP_K,
+    aggregates: Optional[Dict[str, Any]] = None,
+    capacities: Optional[Dict[str, int]] = None,
+    cohort: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Same inputs and result shape as algorithm.match_projects, using deferred acceptance."""
+    metrics.ALLOCATION_RUNS.inc()
+    with metrics.phase_timer("load_projects"):
+        projects = save_load.load_projects_from_db(projects_table)
+
+    with metrics.phase_timer("assign"):
+        allocations = deferred_acceptance(groups_data, projects, capacities)
+
+    with metrics.phase_timer("score"):
+        by_id = {p["id"]: p for p in projects}
+        components: Dict[str, Any] = {}
+        explanations: Dict[str, Any] = {}
+        for group in groups_data:
+            pid = allocations.get(group.group_id)
+            if pid is not None:
+                _, pref, skills, wam, _ = algorithm.score_pair(group, by_id[pid])
+                components[group.group_id] = (pref, skills, wam)
+            if explain_top_k > 0:
+                # only the group's own list matters here, so explain over that
+                scored = [
+                    (algorithm.score_pair(group, by_id[p]), p)
+                    for p in group.project_preferences if p in by_id
+                ]
+                explanations[group.group_id] = [
+                    {
+                        "rank": rank,
+                        "project_id": p,
+                        "total_score": round(total, 4),
+                        "preference_score": round(pref, 4),
+                        "skills_score": round(skills, 4),
+                        "wam_score": round(wam, 4),
+                        "dual_penalty": dual,
+                    }
+                    for rank, ((total, pref, skills, wam, dual), p) in enumerate(
+                        heapq.nlargest(explain_top_k, scored, key=lambda t: t[0][0]), start=1
+                    )
+                ]
+
+    with metrics.phase_timer("summarise"):
+        summary = algorithm.summarise(groups_data, projects, allocations, components, aggregates)
+
+    if save_to_db:
+        with metrics.phase_timer("persist"):
+            algorithm.persist(allocations, summary, explanations, groups_data, cohort)
+
+    return {
+        "allocations": allocations,
+        "summary": summary,
+        "explanations": explanations
+    }
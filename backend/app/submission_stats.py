@@ -0,0 +1,165 @@
+# app/submission_stats.py
+# running totals over the submitted student records (project demand, skill coverage, WAM bands,
+# dual enrolment) so the admin dashboards and allocation runs don't recount everything each time.
+# The totals are built once from the shared cohort table (app/cohort_table.py) and then updated
+# as each submission comes in.
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+from app.cohort_table import STUDENTS_PATH, CohortTable
+from app.group_builder import group_key, wam_band
+from app import cohort_table, skill_vocab
+from app.file_signature import STALE, file_signature
+
+
+class SubmissionAggregates:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.student_count = 0
+        self.wam_total = 0.0
+        self.wam_counted = 0
+        self.wam_histogram: Counter = Counter()
+        self.unit_counts: Counter = Counter()
+        # project/skill counts are per group, each student only counts towards student_demand
+        self.project_demand: Counter = Counter()
+        self.project_student_demand: Counter = Counter()
+        self.skill_counts: Counter = Counter()
+        self.dual_groups: Set[str] = set()
+        self._group_prefs: Dict[str, Set[str]] = {}
+        self._group_skills: Dict[str, Set[str]] = {}
+        self.version = 0
+
+    def add_records(self, records: Iterable[Dict[str, Any]]) -> None:
+        with self._lock:
+            for record in records:
+                self._add(record)
+            self.version += 1
+
+    def _add(self, record: Dict[str, Any]) -> None:
+        gid = group_key(record)
+        prefs = self._group_prefs.setdefault(gid, set())
+        skills = self._group_skills.setdefault(gid, set())
+
+        self.student_count += 1
+        if record.get("unit_code"):
+            self.unit_counts[record["unit_code"]] += 1
+
+        wam = record.get("wam")
+        if isinstance(wam, (int, float)) and wam:
+            self.wam_total += wam
+            self.wam_counted += 1
+        self.wam_histogram[wam_band(wam)] += 1
+
+        for pref in record.get("project_preferences") or []:
+            self.project_student_demand[pref] += 1
+            if pref not in prefs:
+                prefs.add(pref)
+                self.project_demand[pref] += 1
+
+        for skill in skill_vocab.parse_skills(record.get("skills")):
+            if skill not in skills:
+                skills.add(skill)
+                self.skill_counts[skill] += 1
+
+        if record.get("dual_project_enrollment"):
+            self.dual_groups.add(gid)
+
+    @property
+    def group_count(self) -> int:
+        return len(self._group_prefs)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            groups = self.group_count
+            return {
+                "version": self.version,
+                "student_count": self.student_count,
+                "group_count": groups,
+                "average_wam": round(self.wam_total / self.wam_counted, 1) if self.wam_counted else None,
+                "wam_histogram": dict(self.wam_histogram),
+                "unit_counts": dict(self.unit_counts),
+                "project_demand": dict(self.project_demand),
+                "project_student_demand": dict(self.project_student_demand),
+                "skill_counts": dict(self.skill_counts),
+                "skill_coverage": {
+                    k: round(v / groups, 2) for k, v in self.skill_counts.items()
+                } if groups else {},
+                "dual_project_count": len(self.dual_groups),
+            }
+
+    # keeping in step with students.json: a changed file signature means someone else
+    # (another worker, an import script) wrote it, so we recount from scratch once
+    def ensure_loaded(self, path: Path = STUDENTS_PATH) -> None:
+        if file_signature(path) == self._signature:
+            return
+
+        # the submission writer holds this from replacing the file until it has added the records
+        # here, so a recount can't see them in the file and then get them added again
+        with cohort_table.shared.lock:
+            signature = file_signature(path)
+            if signature == self._signature:
+                return
+            table = cohort_table.get_table(path)
+            with self._lock:
+                self._reset()
+                self._load_table(table)
+                self.version += 1
+                self._signature = signature
+
+    def _load_table(self, table: CohortTable) -> None:
+        # same totals as _add over every record, but column at a time: the per-group sets
+        # only need each distinct shared skill/preference tuple once
+        self.student_count = len(table)
+        for unit, n in table.count_by("unit_code").items():
+            if unit:
+                self.unit_counts[unit] += n
+
+        for row in range(len(table)):
+            value = table.wam_at(row)
+            if value:
+                self.wam_total += value
+                self.wam_counted += 1
+            self.wam_histogram[wam_band(value)] += 1
+
+        for gid, rows in table.group_rows().items():
+            prefs = self._group_prefs.setdefault(gid, set())
+            skills = self._group_skills.setdefault(gid, set())
+            for code in {table.preferences[row] for row in rows}:
+                for pref in table.preference_lists.values[code]:
+                    if pref not in prefs:
+                        prefs.add(pref)
+                        self.project_demand[pref] += 1
+            for row in rows:
+                for pref in table.preferences_at(row):
+                    self.project_student_demand[pref] += 1
+            for code in {table.skills[row] for row in rows}:
+                for skill in table.canonical_skills(code):
+                    if skill not in skills:
+                        skills.add(skill)
+                        self.skill_counts[skill] += 1
+            if any(table.dual[row] for row in rows):
+                self.dual_groups.add(gid)
+
+    def mark_synced(self, path: Path = STUDENTS_PATH) -> None:
+        # called after we wrote the file ourselves and already applied the records
+        with self._lock:
+            self._signature = file_signature(path)
+
+    def mark_stale(self) -> None:
+        # the writer put an older file back after adding some records here: recount on next use
+        with self._lock:
+            self._signature = STALE
+
+
+aggregates = SubmissionAggregates()
+
+
+def get_aggregates(path: Path = STUDENTS_PATH) -> SubmissionAggregates:
+    aggregates.ensure_loaded(path)
+    return aggregates
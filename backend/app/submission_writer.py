@@ -0,0 +1,242 @@
+# app/submission_writer.py
+# group commit for POST /api/students. Each request drops its validated records on a queue and
+# waits; one writer task per worker collects whatever arrives within SUBMISSION_BATCH_MS (or until
+# SUBMISSION_BATCH_RECORDS records are waiting) and commits the lot together: one multi-row upsert
+# into the cohort's "Student" partition, one rewrite of students.json, one update of the cohort
+# table and submission aggregates. Every request in the batch is then answered at once.
+# The upsert is only committed once the file has been replaced (students.json is what everything
+# else reads), and anything failing after that puts the old file back and has the table and
+# aggregates rebuilt from it, so none of them drift apart. A submission whose records don't
+# validate is turned away on its own; the rest of its batch still goes in.
+#
+# A deadline burst becomes a handful of large transactions instead of a file rewrite per group,
+# and "Student" stays current without running import_students_from_json.py.
+#   STUDENT_WRITE_THROUGH=0  keep submissions in students.json only (no database write)
+import asyncio
+import json
+import os
+from collections import deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple, Union
+
+from fastapi.concurrency import run_in_threadpool
+from pydantic import ValidationError
+
+from app import cohort_table, submission_stats
+from app.cohort_table import STUDENTS_PATH, CohortTable
+from app.models import Student
+from data.cohorts import current_cohort, ensure_partition
+from data.db_connection import get_conn
+from data.import_students_from_json import TABLE_NAME, student_row, upsert_students
+
+BATCH_MS = float(os.getenv("SUBMISSION_BATCH_MS", "5"))
+BATCH_RECORDS = int(os.getenv("SUBMISSION_BATCH_RECORDS", "500"))
+WRITE_THROUGH = os.getenv("STUDENT_WRITE_THROUGH", "1").strip().lower() in ("1", "true", "yes", "on")
+
+
+class InvalidSubmission(ValueError):
+    """A submission whose records can't be stored; only that request fails"""
+
+
+class _Pending:
+    __slots__ = ("records", "future")
+
+    def __init__(self, records: List[Dict[str, Any]], future: asyncio.Future) -> None:
+        self.records = records
+        self.future = future
+
+
+class SubmissionWriter:
+    def __init__(self, path: Path = STUDENTS_PATH, batch_ms: float = BATCH_MS,
+                 batch_records: int = BATCH_RECORDS, write_through: bool = WRITE_THROUGH) -> None:
+        self.path = Path(path)
+        self.batch_seconds = batch_ms / 1000
+        self.batch_records = batch_records
+        self.write_through = write_through
+        self._pending: Deque[_Pending] = deque()
+        self._task: Optional[asyncio.Task] = None
+        # student IDs already in the file, rebuilt whenever the cohort table is reloaded
+        self._known_ids: Set[str] = set()
+        self._known_version: Optional[Tuple[int, int]] = None
+        self.batches = 0
+
+    async def submit(self, records: List[Dict[str, Any]]) -> bool:
+        """Queue one group's records; True once committed, False if a student ID already exists.
+
+        Raises InvalidSubmission if the records themselves can't be stored.
+        """
+        loop = asyncio.get_running_loop()
+        item = _Pending(records, loop.create_future())
+        self._pending.append(item)
+        # the writer exits when the queue runs dry, the next submission starts it again
+        if self._task is None or self._task.done() or self._task.get_loop() is not loop:
+            self._task = loop.create_task(self._run())
+        return await item.future
+
+    async def _run(self) -> None:
+        while self._pending:
+            if sum(len(p.records) for p in self._pending) < self.batch_records:
+                await asyncio.sleep(self.batch_seconds)
+
+            batch: List[_Pending] = []
+            taken = 0
+            while self._pending and (not batch or taken + len(self._pending[0].records) <= self.batch_records):
+                item = self._pending.popleft()
+                batch.append(item)
+                taken += len(item.records)
+
+            try:
+                accepted = await run_in_threadpool(self._flush, [p.records for p in batch])
+            except Exception as e:
+                print(f"Error committing {len(batch)} submissions: {e}")
+                for p in batch:
+                    if not p.future.done():
+                        p.future.set_exception(e)
+                continue
+
+            for p, ok in zip(batch, accepted):
+                if p.future.done():
+                    continue
+                if isinstance(ok, InvalidSubmission):
+                    p.future.set_exception(ok)
+                else:
+                    p.future.set_result(ok)
+
+    # --- on the threadpool, one batch at a time ---
+    def _flush(self, submissions: List[List[Dict[str, Any]]]) -> List[Union[bool, InvalidSubmission]]:
+        # aggregates have to be in step with the file before we change it, or they'd recount
+        # this batch from the file and then add it again
+        stats = submission_stats.get_aggregates(self.path)
+        known = self._known(cohort_table.get_table(self.path))
+
+        accepted: List[Union[bool, InvalidSubmission]] = []
+        records: List[Dict[str, Any]] = []
+        for group in submissions:
+            # a bad submission is turned away on its own instead of failing the whole batch
+            problem = _check(group)
+            if problem is not None:
+                accepted.append(InvalidSubmission(problem))
+                continue
+            ids = {r["student_id"] for r in group}
+            ok = not (ids & known)
+            if ok:
+                known |= ids
+                records.extend(group)
+            accepted.append(ok)
+        if not records:
+            return accepted
+
+        # the student rows go in first but stay uncommitted until students.json has been replaced, so
+        # a failed file write leaves the database as it was
+        conn = None
+        written = False
+        previous: Optional[bytes] = None
+        try:
+            if self.write_through:
+                conn = self._write_db(records)
+            # from replacing the file until the shared table and aggregates hold the batch, nobody may
+            # reload from the file (they'd count the batch, then have it added again)
+            with cohort_table.shared.lock:
+                # another worker may have written the file meanwhile: count its records first
+                submission_stats.get_aggregates(self.path)
+                previous = self._write_file(records)
+                written = True
+                cohort_table.shared.append(records, self.path)
+                stats.add_records(records)
+                stats.mark_synced(self.path)
+            if conn is not None:
+                conn.commit()
+        except Exception:
+            self._known_version = None  # IDs above were never stored
+            if written:
+                # put the file back, and have the table and aggregates rebuilt from it: they may
+                # hold some or all of the batch by now
+                with cohort_table.shared.lock:
+                    self._restore_file(previous)
+                    cohort_table.shared.mark_stale(self.path)
+                    stats.mark_stale()
+            raise
+        finally:
+            if conn is not None:
+                conn.close()
+
+        self._known_version = _table_version(cohort_table.get_table(self.path))
+        self.batches += 1
+        return accepted
+
+    def _known(self, table: CohortTable) -> Set[str]:
+        version = _table_version(table)
+        if version != self._known_version:
+            self._known_ids = {table.student_id_at(row) for row in range(len(table))}
+            self._known_version = version
+        return self._known_ids
+
+    def _write_db(self, records: List[Dict[str, Any]]):
+        """Upsert the batch into the cohort's "Student" partition; returns the uncommitted connection"""
+        cohort = current_cohort()
+        rows = []
+        for r in records:
+            try:
+                rows.append(student_row(cohort, Student.model_construct(**r)))
+            except ValueError:
+                print(f"Student ID {r['student_id']!r} doesn't fit \"Student\"; kept in students.json only")
+        if not rows:
+            return None
+
+        conn = get_conn()
+        try:
+            with conn.cursor() as cur:
+                partition = ensure_partition(cur, TABLE_NAME, cohort, layout=TABLE_NAME)
+                upsert_students(cur, partition, rows)
+        except Exception:
+            conn.close()
+            raise
+        return conn
+
+    def _write_file(self, records: List[Dict[str, Any]]) -> Optional[bytes]:
+        """Append records to students.json; returns what the file held before (None: no file)"""
+        previous = None
+        existing = []
+        if self.path.exists():
+            previous = self.path.read_bytes()
+            try:
+                existing = json.loads(previous) if previous.strip() else []
+            except json.JSONDecodeError:
+                existing = []
+        existing.extend(records)
+        self._replace_file(json.dumps(existing, ensure_ascii=False, indent=2).encode("utf-8"))
+        return previous
+
+    def _restore_file(self, previous: Optional[bytes]) -> None:
+        if previous is None:
+            self.path.unlink(missing_ok=True)
+        else:
+            self._replace_file(previous)
+
+    def _replace_file(self, content: bytes) -> None:
+        # written aside and renamed, so readers never see half a file
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(content)
+        os.replace(tmp, self.path)
+
+
+def _check(group: List[Dict[str, Any]]) -> Optional[str]:
+    """Why one submission's records can't be stored, or None"""
+    ids = [r.get("student_id") for r in group]
+    if len(set(ids)) != len(ids):
+        return "The same student ID appears twice in the group"
+    try:
+        for r in group:
+            Student.model_validate(r)
+    except ValidationError as e:
+        return f"Invalid student record: {e.errors()[0].get('msg')}"
+    return None
+
+
+def _table_version(table: CohortTable) -> Tuple[int, int]:
+    return (id(table), table.version)
+
+
+writer = SubmissionWriter()
@@ -0,0 +1,209 @@
+# data/cohorts.py
+# cohort (semester) scoping for the tables that get reloaded every run: "Student",
+# "Allocation_Results", "Allocation_Members", "Allocation_Explanations", "Project_Demand" and
+# "Skill_Coverage", and for the run history kept next to them ("Allocation_Run_Results",
+# "Allocation_Run_Demand").
+#
+# Postgres: each of those is a parent table PARTITION BY LIST (cohort) with one partition per
+# cohort, e.g. "Allocation_Results_2026S2". SQLite has no partitioning, so there the per-cohort
+# tables simply exist on their own with the same name and columns. Either way callers read and
+# write the cohort's own table directly, so a run or a current-semester read only ever touches
+# its partition, TRUNCATE only clears that cohort, and an old cohort can be detached on its own.
+#
+# A database from before cohorts still has those tables flat and unsuffixed; they're moved over
+# once with python -m data.migrate_cohorts. Until that has happened ensure_partition refuses to
+# run, rather than writing partitions next to data nothing would read any more.
+#
+# Only the write and run paths create a cohort's tables (ensure_partition). Reads look them up with
+# existing_partition and come back empty for a cohort that has none, so a GET naming any valid
+# cohort can't create tables.
+import os
+import re
+from datetime import date
+from typing import List, Optional, Set
+
+from data.db_connection import DB_BACKEND, get_conn
+
+COHORT_PATTERN = re.compile(r"^[0-9]{4}S[12]$")
+
+# parents that are partitioned by cohort: (columns without cohort, key columns without cohort).
+# data/migrate_cohorts.py moves existing flat tables into this layout.
+PARTITIONED_TABLES = {
+    '"Student"': (
+        "student_id BIGINT NOT NULL, name TEXT, unikey TEXT, unit_code TEXT, wam TEXT, skill TEXT, "
+        "dual_project_enrollment BOOLEAN, group_name TEXT, tutor_code TEXT, project_preferences TEXT",
+        "student_id",
+    ),
+    '"Allocation_Results"': ("group_id TEXT NOT NULL, project_id TEXT NOT NULL", "group_id"),
+    '"Allocation_Members"': (
+        "unikey TEXT NOT NULL, group_id TEXT NOT NULL, student_id TEXT, name TEXT, tutor_code TEXT",
+        "unikey",
+    ),
+    '"Allocation_Explanations"': (
+        "group_id TEXT NOT NULL, rank INT NOT NULL, project_id TEXT NOT NULL, total_score FLOAT, "
+        "preference_score FLOAT, skills_score FLOAT, wam_score FLOAT, dual_penalty FLOAT",
+        "group_id, rank",
+    ),
+    '"Project_Demand"': ("project_id TEXT NOT NULL, chosen_count INT NOT NULL", "project_id"),
+    '"Skill_Coverage"': ("skill_name TEXT NOT NULL, skill_percentage FLOAT NOT NULL", "skill_name"),
+    # run history for diffs (app/run_history.py)
+    '"Allocation_Run_Results"': (
+        "run_id INT NOT NULL, group_id TEXT NOT NULL, project_id TEXT NOT NULL", "run_id, group_id"
+    ),
+    '"Allocation_Run_Demand"': (
+        "run_id INT NOT NULL, project_id TEXT NOT NULL, chosen_count INT NOT NULL", "run_id, project_id"
+    ),
+}
+
+# parents already seen in the cohort layout
+_layout_checked: Set[str] = set()
+
+
+def current_cohort(today: Optional[date] = None) -> str:
+    """COHORT from the environment, otherwise the semester we're in (S1 = Jan-Jun, S2 = Jul-Dec)"""
+    configured = os.getenv("COHORT")
+    if configured:
+        return validate_cohort(configured)
+    today = today or date.today()
+    return f"{today.year}S{1 if today.month <= 6 else 2}"
+
+
+def validate_cohort(cohort: str) -> str:
+    # the cohort ends up in table names and partition bounds, so only the fixed shape is allowed
+    cohort = cohort.strip().upper()
+    if not COHORT_PATTERN.match(cohort):
+        raise ValueError(f"Invalid cohort {cohort!r}, expected e.g. 2026S2")
+    return cohort
+
+
+def partition_name(parent: str, cohort: str) -> str:
+    bare = parent.strip('"')
+    return f'"{bare}_{validate_cohort(cohort)}"'
+
+
+def ensure_partition(cur, parent: str, cohort: Optional[str] = None, layout: Optional[str] = None) -> str:
+    """Create the cohort's table (and the partitioned parent on postgres) if needed, return its name.
+
+    layout: which PARTITIONED_TABLES entry to use when parent is a non-default table name.
+    """
+    cohort = validate_cohort(cohort or current_cohort())
+    name = partition_name(parent, cohort)
+    columns, primary_key = PARTITIONED_TABLES[layout or parent]
+    _check_layout(cur, parent)
+
+    if DB_BACKEND == "sqlite":
+        cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {name} (
+            cohort TEXT NOT NULL,
+            {columns},
+            PRIMARY KEY (cohort, {primary_key})
+        );
+        """)
+    else:
+        cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {parent} (
+            cohort TEXT NOT NULL,
+            {columns},
+            PRIMARY KEY (cohort, {primary_key})
+        ) PARTITION BY LIST (cohort);
+        """)
+        cur.execute(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {parent} FOR VALUES IN ('{cohort}');")
+    return name
+
+
+def existing_partition(parent: str, cohort: str) -> Optional[str]:
+    """The cohort's table if it has been created, else None (for reads: there's nothing to read)"""
+    name = partition_name(parent, cohort)
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            if DB_BACKEND == "sqlite":
+                cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s;", (name.strip('"'),))
+            else:
+                cur.execute("SELECT 1 WHERE to_regclass(%s) IS NOT NULL;", (name,))
+            found = cur.fetchone() is not None
+    finally:
+        conn.close()
+    return name if found else None
+
+
+def is_flat(cur, parent: str) -> bool:
+    """Whether parent is still a plain table from before cohorts"""
+    bare = parent.strip('"')
+    if DB_BACKEND == "sqlite":
+        # the per-cohort tables are all suffixed, so the bare name only exists in the old layout
+        cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s;", (bare,))
+        return cur.fetchone() is not None
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);", (parent,))
+    row = cur.fetchone()
+    return row is not None and row["relkind"] != "p"
+
+
+def _check_layout(cur, parent: str) -> None:
+    if parent in _layout_checked:
+        return
+    if is_flat(cur, parent):
+        raise RuntimeError(
+            f"{parent} is still a flat table from before cohorts; "
+            f"run python -m data.migrate_cohorts to move it into the cohort layout"
+        )
+    _layout_checked.add(parent)
+
+
+def list_cohorts(parent: str = '"Allocation_Results"') -> List[str]:
+    bare = parent.strip('"')
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            if DB_BACKEND == "sqlite":
+                # the "_" after the name is literal, not LIKE's any-character
+                pattern = bare.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "\\_%"
+                cur.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE %s ESCAPE '\\';",
+                    (pattern,),
+                )
+            else:
+                cur.execute(
+                    "SELECT c.relname AS name FROM pg_inherits i "
+                    "JOIN pg_class c ON c.oid = i.inhrelid JOIN pg_class p ON p.oid = i.inhparent "
+                    "WHERE p.relname = %s;",
+                    (bare,),
+                )
+            names = [r["name"] for r in cur.fetchall()]
+    finally:
+        conn.close()
+
+    cohorts = []
+    for name in names:
+        if not name.startswith(f"{bare}_"):
+            continue
+        suffix = name[len(bare) + 1:]
+        if COHORT_PATTERN.match(suffix):
+            cohorts.append(suffix)
+    return sorted(cohorts)
+
+
+def detach_cohort(cohort: str) -> List[str]:
+    """Take an old cohort out of the partitioned parents (postgres); its tables stay as plain tables.
+
+    On SQLite the per-cohort tables are already independent, so there is nothing to do.
+    """
+    cohort = validate_cohort(cohort)
+    if DB_BACKEND == "sqlite":
+        return []
+
+    detached = []
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            for parent in PARTITIONED_TABLES:
+                name = partition_name(parent, cohort)
+                cur.execute("SELECT to_regclass(%s) AS reg;", (name,))
+                row = cur.fetchone()
+                if row and row["reg"]:
+                    cur.execute(f"ALTER TABLE {parent} DETACH PARTITION {name};")
+                    detached.append(name)
+        conn.commit()
+    finally:
+        conn.close()
+    return detached
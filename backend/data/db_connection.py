@@ -1,12 +1,43 @@
 # data/db_connection.py
 import os
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import re
+import sqlite3
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
 from dotenv import load_dotenv
+from data import query_trace
+
+try:
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+except ImportError:  # only needed for the postgres backend
+    psycopg2 = None
+    RealDictCursor = None
 
 load_dotenv()
 
+# DB_BACKEND=postgres (default) talks to the remote database from .env,
+# DB_BACKEND=sqlite keeps everything in a local file (SQLITE_PATH) - no network needed
+DB_BACKEND = os.getenv("DB_BACKEND", "postgres").strip().lower()
+SQLITE_PATH = os.getenv("SQLITE_PATH", str(Path(__file__).parent / "local.sqlite3"))
+
+
 def get_conn():
+    if not query_trace.ENABLED:
+        return _connect()
+
+    start = time.perf_counter()
+    conn = _connect()
+    query_trace.record_acquire(time.perf_counter() - start)
+    return query_trace.TracedConnection(conn)
+
+
+def _connect():
+    if DB_BACKEND == "sqlite":
+        return _sqlite_conn()
+
     # connecting to the database using url information from .env
     return psycopg2.connect(
         host=os.getenv("PGHOST"),
@@ -26,3 +57,126 @@ def fetch_all_dicts(sql: str, params=None):
             return cur.fetchall()
     finally:
         conn.close()
+
+
+# --- SQLite backend ---
+# save_load and the importers are written against psycopg2 (%s params, TRUNCATE, SERIAL, ...).
+# The wrapper below rewrites those statements once (cached) into SQLite's dialect; ON CONFLICT
+# ... DO UPDATE SET x = EXCLUDED.x is already valid SQLite. Only the SQL outside quotes is rewritten,
+# so a '%s' string literal or a "TRUNCATE TABLE" identifier is left as it is. Closed connections go
+# back to a small per-thread pool instead of being closed, so sqlite3's prepared statement cache
+# gets reused.
+
+_SQL_REWRITES = (
+    (re.compile(r"\bTRUNCATE\s+TABLE\s+", re.I), "DELETE FROM "),
+    (re.compile(r"\bBIGSERIAL\s+PRIMARY\s+KEY\b", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bSERIAL\s+PRIMARY\s+KEY\b", re.I), "INTEGER PRIMARY KEY AUTOINCREMENT"),
+    (re.compile(r"\bSELECT\s+version\(\)", re.I), "SELECT 'SQLite ' || sqlite_version() AS version"),
+    (re.compile(r"%s"), "?"),
+)
+# '...' string literals and "..." identifiers, with doubled quotes as escapes
+_QUOTED = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")")
+
+_local = threading.local()
+_POOL_SIZE = 4
+
+
+@lru_cache(maxsize=512)
+def translate_sql(sql: str) -> str:
+    # split() keeps the quoted parts at the odd indices
+    parts = _QUOTED.split(sql)
+    for i in range(0, len(parts), 2):
+        for pattern, replacement in _SQL_REWRITES:
+            parts[i] = pattern.sub(replacement, parts[i])
+    return "".join(parts)
+
+
+def _dict_row(cursor, row):
+    return {col[0]: value for col, value in zip(cursor.description, row)}
+
+
+def _sqlite_conn():
+    idle = getattr(_local, "idle", None)
+    if idle is None:
+        idle = _local.idle = []
+    if idle:
+        return SQLiteConnection(idle.pop(), idle)
+
+    Path(SQLITE_PATH).parent.mkdir(parents=True, exist_ok=True)
+    raw = sqlite3.connect(SQLITE_PATH, timeout=30, cached_statements=512)
+    raw.row_factory = _dict_row
+    raw.execute("PRAGMA journal_mode=WAL;")
+    raw.execute("PRAGMA synchronous=NORMAL;")
+    return SQLiteConnection(raw, idle)
+
+
+class SQLiteCursor:
+    def __init__(self, cursor: sqlite3.Cursor):
+        self._cur = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def execute(self, sql: str, params=None):
+        self._cur.execute(translate_sql(sql), tuple(params or ()))
+        return self
+
+    def executemany(self, sql: str, seq_of_params):
+        # one prepared statement, all rows inside the caller's transaction
+        self._cur.executemany(translate_sql(sql), (tuple(p) for p in seq_of_params))
+        return self
+
+    def fetchone(self):
+        return self._cur.fetchone()
+
+    def fetchmany(self, size=None):
+        return self._cur.fetchmany(size or self._cur.arraysize)
+
+    def fetchall(self):
+        return self._cur.fetchall()
+
+    def __iter__(self):
+        return iter(self._cur)
+
+    @property
+    def rowcount(self):
+        return self._cur.rowcount
+
+    @property
+    def description(self):
+        return self._cur.description
+
+    def close(self):
+        self._cur.close()
+
+
+class SQLiteConnection:
+    """psycopg2-shaped handle over a pooled sqlite3 connection"""
+
+    def __init__(self, raw: sqlite3.Connection, pool: list):
+        self._raw = raw
+        self._pool = pool
+
+    def cursor(self, *args, **kwargs):
+        return SQLiteCursor(self._raw.cursor())
+
+    def commit(self):
+        self._raw.commit()
+
+    def rollback(self):
+        self._raw.rollback()
+
+    def close(self):
+        if self._raw is None:
+            return
+        # anything not committed is dropped, same as closing a psycopg2 connection
+        if self._raw.in_transaction:
+            self._raw.rollback()
+        if len(self._pool) < _POOL_SIZE:
+            self._pool.append(self._raw)
+        else:
+            self._raw.close()
+        self._raw = None
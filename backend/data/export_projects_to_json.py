@@ -4,44 +4,13 @@ from pathlib import Path
 from typing import Dict, List, Any
 
 from .db_connection import fetch_all_dicts
+from app import skill_vocab
 
 OUT_PATH = Path(__file__).parent / "projects.json"
 
-# normalize skill names(allow add or modyfy)
-CANON = {
-    "ml": "ML",
-    "dl": "DL",
-    "ai": "AI",
-    "cv": "CV",
-    "pytorch": "PyTorch",
-    "pyTorch": "PyTorch",
-    "db": "Database",
-    "sql": "Database",
-    "uiux": "UI/UX",
-    "ui/ux": "UI/UX",
-    "web dev": "Web Development",
-    "web": "Web Development",
-    "js": "JavaScript",
-}
-
+# skill names are normalised by the shared vocabulary (aliases live in app/skill_vocab.py)
 def split_list(x: Any) -> List[str]:
-    if x is None:
-        return []
-    if isinstance(x, (list, tuple)):
-        items = [str(i).strip() for i in x]
-    else:
-        s = str(x)
-        parts = (s.split(";") if ";" in s else s.replace("|", ",").split(","))
-        items = [p.strip() for p in parts]
-    seen, out = set(), []
-    for it in items:
-        if not it:
-            continue
-        it2 = CANON.get(it.lower(), it)
-        if it2 not in seen:
-            seen.add(it2)
-            out.append(it2)
-    return out
+    return list(skill_vocab.parse_skills(x))
 
 def export_projects() -> None:
     rows = fetch_all_dicts(
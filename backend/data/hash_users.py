@@ -0,0 +1,26 @@
+# data/hash_users.py
+# replaces the plaintext "password" of every users.json entry with a salted "password_hash"
+# (app/auth.py reads either, but only hashes belong on disk).
+# run from backend/: python -m data.hash_users [path]
+import json
+import sys
+from pathlib import Path
+
+from app.auth import USERS_PATH, hash_password
+
+
+def hash_users(path: Path = USERS_PATH) -> int:
+    users = json.loads(path.read_text(encoding="utf-8"))
+    changed = 0
+    for user in users:
+        password = user.pop("password", None)
+        if password is not None and not user.get("password_hash"):
+            user["password_hash"] = hash_password(password)
+            changed += 1
+    path.write_text(json.dumps(users, indent=2) + "\n", encoding="utf-8")
+    return changed
+
+
+if __name__ == "__main__":
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else USERS_PATH
+    print(f"Hashed {hash_users(target)} passwords in {target}")
@@ -3,6 +3,8 @@ import json
 from pathlib import Path
 from typing import List, Dict, Any
 from data.db_connection import get_conn
+from app import skill_vocab
+from app.save_load import bump_cache_version, invalidate_read_cache
 
 TABLE_NAME = '"Project_List"'
 JSON_PATH_DEFAULT = "data/projects.json"
@@ -30,7 +32,7 @@ def import_projects_from_json(
             project_id,
             p.get("title"),
             p.get("client"),
-            _coalesce_list_str(p.get("required_skills")),
+            ";".join(skill_vocab.parse_skills(p.get("required_skills"))),
             _coalesce_list_str(p.get("related_disciplines")),
         ))
 
@@ -41,6 +43,15 @@ def import_projects_from_json(
     conn = get_conn()
     try:
         with conn.cursor() as cur:
+            cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {table_name} (
+                project_id          TEXT PRIMARY KEY,
+                title               TEXT,
+                client              TEXT,
+                required_skills     TEXT,
+                related_disciplines TEXT
+            );
+            """)
             if replace_all:
                 cur.execute(f'TRUNCATE TABLE {table_name};')
             sql = f"""
@@ -55,8 +66,10 @@ def import_projects_from_json(
                 related_disciplines = EXCLUDED.related_disciplines;
             """
             cur.executemany(sql, rows)
+            bump_cache_version(cur, f"projects:{table_name}")
 
         conn.commit()
+        invalidate_read_cache(f"projects:{table_name}")
         print(f"Imported {len(rows)} projects into {table_name} (replace_all={replace_all})")
     finally:
         conn.close()
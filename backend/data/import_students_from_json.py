@@ -1,8 +1,12 @@
 # data/import_students_from_json.py
 import json
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Optional
+from pydantic import ValidationError
 from data.db_connection import get_conn
+from data.cohorts import current_cohort, ensure_partition, validate_cohort
+from app.models import Student
+from app import skill_vocab
 
 TABLE_NAME = '"Student"'
 JSON_PATH_DEFAULT = "data/students.json"
@@ -15,31 +19,86 @@ def _coalesce_list_str(lst: List[str] | None) -> str:
     return ";".join(cleaned)
 
 
+COLUMNS = (
+    "cohort", "student_id", "name", "unikey", "unit_code", "wam", "skill",
+    "dual_project_enrollment", "group_name", "tutor_code", "project_preferences",
+)
+# largest BIGINT
+MAX_STUDENT_ID = 2**63 - 1
+# rows per INSERT statement: 11 params each stays well under SQLite's bound-parameter limit
+UPSERT_CHUNK = 500
+
+
+def student_row(cohort: str, s: Student) -> tuple:
+    """One "Student" row; ValueError for an ID that isn't a number BIGINT can hold"""
+    student_id = int(s.student_id)
+    if not 0 <= student_id <= MAX_STUDENT_ID:
+        raise ValueError(f"student_id {s.student_id} is out of range")
+    return (
+        cohort,
+        student_id,
+        s.name,
+        s.unikey,
+        s.unit_code,
+        str(s.wam),
+        ";".join(skill_vocab.parse_skills(s.skills)),
+        s.dual_project_enrollment,
+        s.group_id,
+        s.tutor_code,
+        _coalesce_list_str(s.project_preferences),
+    )
+
+
+def upsert_students(cur, partition: str, rows: List[tuple]) -> None:
+    """multi-row INSERT ... ON CONFLICT upserts, UPSERT_CHUNK rows per statement"""
+    # one statement can't touch the same row twice on postgres, so a repeated ID keeps its last row
+    rows = list({(row[0], row[1]): row for row in rows}.values())
+    placeholders = "(" + ", ".join(["%s"] * len(COLUMNS)) + ")"
+    updates = ",\n        ".join(f"{c} = EXCLUDED.{c}" for c in COLUMNS[2:])
+    for start in range(0, len(rows), UPSERT_CHUNK):
+        chunk = rows[start:start + UPSERT_CHUNK]
+        sql = f"""
+        INSERT INTO {partition}
+            ({", ".join(COLUMNS)})
+        VALUES {", ".join([placeholders] * len(chunk))}
+        ON CONFLICT (cohort, student_id)
+        DO UPDATE SET
+        {updates};
+        """
+        cur.execute(sql, [value for row in chunk for value in row])
+
+
 def import_students_from_json(
         json_path: str = JSON_PATH_DEFAULT,
         table_name: str = TABLE_NAME,
         replace_all: bool = True,
+        cohort: Optional[str] = None,
 ) -> None:
+    cohort = validate_cohort(cohort or current_cohort())
     path = Path(json_path)
-    students: List[Dict[str, Any]] = json.loads(path.read_text(encoding="utf-8"))
+    records = json.loads(path.read_text(encoding="utf-8"))
 
+    # same validators the submission endpoint uses, one record at a time so a bad record is
+    # reported and skipped instead of failing the whole import
     rows = []
-    for s in students:
-        student_id = s.get("student_id")
-        if not student_id:
+    skipped = 0
+    for i, record in enumerate(records):
+        try:
+            s = Student.model_validate(record)
+        except ValidationError as e:
+            skipped += 1
+            student_id = record.get("student_id") if isinstance(record, dict) else None
+            print(f"Skipping record {i} (student_id={student_id}): {e.errors()[0]['msg']}")
+            continue
+        if not s.student_id:
             continue
-        rows.append((
-            int(student_id),
-            s.get("name"),
-            s.get("unikey"),
-            s.get("unit_code"),
-            str(s.get("wam")) if s.get("wam") is not None else None,
-            _coalesce_list_str(s.get("skills")),
-            s.get("dual_project_enrollment", False),
-            s.get("group_id"),
-            s.get("tutor_code"),
-            _coalesce_list_str(s.get("project_preferences")),
-        ))
+        try:
+            rows.append(student_row(cohort, s))
+        except ValueError as e:
+            skipped += 1
+            print(f"Skipping record {i} (student_id={s.student_id}): {e}")
+    if skipped:
+        print(f"Skipped {skipped} invalid record(s)")
 
     if not rows:
         print("No valid student rows found in JSON; aborting.")
@@ -48,28 +107,14 @@ def import_students_from_json(
     conn = get_conn()
     try:
         with conn.cursor() as cur:
+            # replace_all only clears this cohort's partition
+            partition = ensure_partition(cur, table_name, cohort, layout=TABLE_NAME)
             if replace_all:
-                cur.execute(f'TRUNCATE TABLE {table_name};')
-            sql = f"""
-            INSERT INTO {table_name}
-                (student_id, name, unikey, unit_code, wam, skill, dual_project_enrollment, group_name, tutor_code, project_preferences)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (student_id)
-            DO UPDATE SET
-                name = EXCLUDED.name,
-                unikey = EXCLUDED.unikey,
-                unit_code = EXCLUDED.unit_code,
-                wam = EXCLUDED.wam,
-                skill = EXCLUDED.skill,
-                dual_project_enrollment = EXCLUDED.dual_project_enrollment,
-                group_name = EXCLUDED.group_name,
-                tutor_code = EXCLUDED.tutor_code,
-                project_preferences = EXCLUDED.project_preferences;
-            """
-            cur.executemany(sql, rows)
+                cur.execute(f'TRUNCATE TABLE {partition};')
+            upsert_students(cur, partition, rows)
 
         conn.commit()
-        print(f"Imported {len(rows)} students into {table_name} (replace_all={replace_all})")
+        print(f"Imported {len(rows)} students into {partition} (replace_all={replace_all})")
     finally:
         conn.close()
 
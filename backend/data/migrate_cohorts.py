@@ -0,0 +1,89 @@
+# data/migrate_cohorts.py
+# one-off move of the old flat tables into the cohort layout (data/cohorts.py).
+# Each flat table is renamed to "<name>_flat", the cohort's partition is created and the old rows
+# are copied into it under the given cohort; "Allocation_Summary" gets a cohort column.
+# The _flat tables are left in place to check against and drop by hand.
+# Run it once, from one place, when upgrading a database from before cohorts (not from the app:
+# every worker and cold start would race on the renames). Until then the app refuses to write to
+# the old tables (data/cohorts.py); once everything is in the cohort layout it changes nothing.
+#
+#   python -m data.migrate_cohorts [COHORT]      migrate existing data into COHORT (default: current)
+#   python -m data.migrate_cohorts detach COHORT  detach an old cohort's partitions (postgres)
+import sys
+from typing import List, Optional
+
+from data.db_connection import DB_BACKEND, get_conn
+from data.cohorts import (
+    PARTITIONED_TABLES, current_cohort, detach_cohort, ensure_partition, validate_cohort,
+)
+
+SUMMARY_TABLE = '"Allocation_Summary"'
+
+
+def _table_kind(cur, table: str) -> Optional[str]:
+    # None if missing, "flat" for a plain table, "partitioned" for a partitioned parent
+    bare = table.strip('"')
+    if DB_BACKEND == "sqlite":
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = %s;", (bare,))
+        return "flat" if cur.fetchone() else None
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s);", (table,))
+    row = cur.fetchone()
+    if not row:
+        return None
+    return "partitioned" if row["relkind"] == "p" else "flat"
+
+
+def _column_names(columns: str) -> List[str]:
+    return [c.strip().split()[0] for c in columns.split(",")]
+
+
+def _has_column(cur, table: str, column: str) -> bool:
+    bare = table.strip('"')
+    if DB_BACKEND == "sqlite":
+        cur.execute(f"PRAGMA table_info({table});")
+        return any(r["name"] == column for r in cur.fetchall())
+    cur.execute(
+        "SELECT 1 FROM information_schema.columns WHERE table_name = %s AND column_name = %s;",
+        (bare, column),
+    )
+    return cur.fetchone() is not None
+
+
+def migrate(cohort: Optional[str] = None, quiet: bool = False) -> None:
+    cohort = validate_cohort(cohort or current_cohort())
+    conn = get_conn()
+    try:
+        with conn.cursor() as cur:
+            for parent, (columns, _) in PARTITIONED_TABLES.items():
+                if _table_kind(cur, parent) != "flat":
+                    if not quiet:
+                        print(f"{parent}: nothing to migrate")
+                    continue
+
+                bare = parent.strip('"')
+                flat = f'"{bare}_flat"'
+                cur.execute(f"ALTER TABLE {parent} RENAME TO {flat};")
+                partition = ensure_partition(cur, parent, cohort)
+                names = ", ".join(_column_names(columns))
+                cur.execute(
+                    f"INSERT INTO {partition} (cohort, {names}) SELECT %s, {names} FROM {flat};",
+                    (cohort,),
+                )
+                print(f"{parent}: {cur.rowcount} rows copied into {partition}, old table kept as {flat}")
+
+            if _table_kind(cur, SUMMARY_TABLE) and not _has_column(cur, SUMMARY_TABLE, "cohort"):
+                cur.execute(f"ALTER TABLE {SUMMARY_TABLE} ADD COLUMN cohort TEXT;")
+                cur.execute(f"UPDATE {SUMMARY_TABLE} SET cohort = %s;", (cohort,))
+                print(f"{SUMMARY_TABLE}: added cohort column ({cohort})")
+
+        conn.commit()
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    args = sys.argv[1:]
+    if args[:1] == ["detach"] and len(args) == 2:
+        print("Detached:", detach_cohort(args[1]) or "nothing")
+    else:
+        migrate(args[0] if args else None)
@@ -0,0 +1,255 @@
+# data/query_trace.py
+# optional query tracing for db_connection: per-statement timing and row counts, connection
+# acquire time, a slow-query log, and a per-request query counter that flags N+1 patterns
+# (the same statement run over and over inside one request).
+#
+# QUERY_TRACE=1 turns it on. When it's off get_conn hands out the plain connection and the
+# middleware isn't installed, so the only cost is one flag check per get_conn.
+#   SLOW_QUERY_MS        statements slower than this are printed and kept (default 200)
+#   N_PLUS_ONE_THRESHOLD same statement this many times in one request gets flagged (default 20)
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from functools import lru_cache
+from typing import Any, Deque, Dict, Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+
+ENABLED = os.getenv("QUERY_TRACE", "").strip().lower() in ("1", "true", "yes", "on")
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "20"))
+
+# how many slow queries / flagged requests the report keeps
+_RECENT = 100
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+@lru_cache(maxsize=1024)
+def statement_key(sql: str) -> str:
+    # statements are parametrised, so the text itself is a good grouping key
+    return _WHITESPACE.sub(" ", sql).strip()[:300]
+
+
+class _StatementStats:
+    __slots__ = ("calls", "seconds", "max_seconds", "rows")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+
+
+class _RequestQueries:
+    __slots__ = ("queries", "seconds", "by_statement")
+
+    def __init__(self) -> None:
+        self.queries = 0
+        self.seconds = 0.0
+        self.by_statement: Dict[str, int] = {}
+
+
+_lock = threading.Lock()
+_statements: Dict[str, _StatementStats] = {}
+_acquire = {"count": 0, "seconds": 0.0, "max_seconds": 0.0}
+_routes: Dict[str, Dict[str, Any]] = {}
+_slow: Deque[Dict[str, Any]] = deque(maxlen=_RECENT)
+_n_plus_one: Deque[Dict[str, Any]] = deque(maxlen=_RECENT)
+_current: ContextVar[Optional[_RequestQueries]] = ContextVar("query_trace_request", default=None)
+
+
+# --- recording ---
+def record_acquire(seconds: float) -> None:
+    with _lock:
+        _acquire["count"] += 1
+        _acquire["seconds"] += seconds
+        _acquire["max_seconds"] = max(_acquire["max_seconds"], seconds)
+
+
+def record_statement(key: str, seconds: float, rows: int = 0) -> None:
+    with _lock:
+        stats = _statements.get(key)
+        if stats is None:
+            stats = _statements[key] = _StatementStats()
+        stats.calls += 1
+        stats.seconds += seconds
+        stats.rows += rows
+        if seconds > stats.max_seconds:
+            stats.max_seconds = seconds
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            _slow.append({"sql": key, "ms": round(seconds * 1000, 2), "at": time.time()})
+            print(f"Slow query ({seconds * 1000:.1f} ms): {key}")
+
+    request = _current.get()
+    if request is not None:
+        request.queries += 1
+        request.seconds += seconds
+        request.by_statement[key] = request.by_statement.get(key, 0) + 1
+
+
+def record_rows(key: str, rows: int) -> None:
+    if rows:
+        with _lock:
+            stats = _statements.get(key)
+            if stats is not None:
+                stats.rows += rows
+
+
+# --- wrappers ---
+class TracedCursor:
+    def __init__(self, cursor) -> None:
+        self._cur = cursor
+        self._key: Optional[str] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cur.close()
+
+    def _timed(self, method, sql, params):
+        key = self._key = statement_key(sql)
+        start = time.perf_counter()
+        try:
+            method(sql, params)
+        finally:
+            elapsed = time.perf_counter() - start
+            # SELECTs are counted as they're fetched; writes report rowcount
+            rowcount = self._cur.rowcount if self._cur.description is None else 0
+            record_statement(key, elapsed, max(rowcount or 0, 0))
+        return self
+
+    def execute(self, sql, params=None):
+        return self._timed(self._cur.execute, sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._timed(self._cur.executemany, sql, seq_of_params)
+
+    def fetchone(self):
+        row = self._cur.fetchone()
+        if row is not None:
+            record_rows(self._key, 1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cur.fetchmany(*args, **kwargs)
+        record_rows(self._key, len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cur.fetchall()
+        record_rows(self._key, len(rows))
+        return rows
+
+    def __iter__(self):
+        count = 0
+        try:
+            for row in self._cur:
+                count += 1
+                yield row
+        finally:
+            record_rows(self._key, count)
+
+    def __getattr__(self, name):
+        return getattr(self._cur, name)
+
+
+class TracedConnection:
+    def __init__(self, conn) -> None:
+        self._conn = conn
+
+    def cursor(self, *args, **kwargs):
+        return TracedCursor(self._conn.cursor(*args, **kwargs))
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+# --- per request ---
+class QueryTraceMiddleware:
+    """ASGI middleware giving every request its own query counter (installed only when ENABLED)"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # threadpool calls copy the context, so they all add to this one object
+        request = _RequestQueries()
+        token = _current.set(request)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _current.reset(token)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            finish_request(f'{scope.get("method", "")} {route}', request)
+
+
+def finish_request(label: str, request: _RequestQueries) -> None:
+    with _lock:
+        stats = _routes.get(label)
+        if stats is None:
+            stats = _routes[label] = {"requests": 0, "queries": 0, "seconds": 0.0, "max_queries": 0}
+        stats["requests"] += 1
+        stats["queries"] += request.queries
+        stats["seconds"] += request.seconds
+        stats["max_queries"] = max(stats["max_queries"], request.queries)
+
+        for key, calls in request.by_statement.items():
+            if calls >= N_PLUS_ONE_THRESHOLD:
+                _n_plus_one.append({"route": label, "sql": key, "calls": calls, "at": time.time()})
+
+
+# --- report ---
+def report(top: int = 25) -> Dict[str, Any]:
+    with _lock:
+        statements = sorted(_statements.items(), key=lambda kv: kv[1].seconds, reverse=True)[:top]
+        return {
+            "enabled": ENABLED,
+            "slow_query_ms": SLOW_QUERY_MS,
+            "n_plus_one_threshold": N_PLUS_ONE_THRESHOLD,
+            "connections": {
+                "acquired": _acquire["count"],
+                "total_ms": round(_acquire["seconds"] * 1000, 2),
+                "max_ms": round(_acquire["max_seconds"] * 1000, 2),
+            },
+            "statements": [
+                {
+                    "sql": key,
+                    "calls": s.calls,
+                    "total_ms": round(s.seconds * 1000, 2),
+                    "avg_ms": round(s.seconds * 1000 / s.calls, 3),
+                    "max_ms": round(s.max_seconds * 1000, 2),
+                    "rows": s.rows,
+                }
+                for key, s in statements
+            ],
+            "routes": {
+                label: {
+                    "requests": r["requests"],
+                    "avg_queries": round(r["queries"] / r["requests"], 2),
+                    "max_queries": r["max_queries"],
+                    "db_ms": round(r["seconds"] * 1000, 2),
+                }
+                for label, r in sorted(_routes.items())
+            },
+            "slow_queries": list(_slow),
+            "n_plus_one": list(_n_plus_one),
+        }
+
+
+def reset() -> None:
+    with _lock:
+        _statements.clear()
+        _routes.clear()
+        _slow.clear()
+        _n_plus_one.clear()
+        _acquire.update(count=0, seconds=0.0, max_seconds=0.0)
@@ -0,0 +1,77 @@
+# bench_cohort_snapshot.py
+# the decomposed engine scoring from the mapped cohort snapshot (app/cohort_snapshot.py) against
+# scoring from pickled Groups, on a synthetic cohort whose units prefer their own projects (so the
+# preference graph splits and the process pool is used). Also times building and opening the file.
+# No database needed: the project list is swapped in for save_load's loader.
+# run from backend/: python -m test.bench_cohort_snapshot [groups] [units]
+import json
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app import cohort_snapshot, decompose, group_builder, save_load
+
+SKILLS = ["Python", "Web Development", "Database", "Algorithms", "UI/UX", "Data analysis", "Machine Learning"]
+
+
+def synthetic(n_groups: int, n_units: int, seed: int = 3888):
+    rnd = random.Random(seed)
+    per_unit = max(1, n_groups // n_units // 3)
+    projects = [
+        {"id": f"U{u}P{i:04d}", "required_skills": rnd.sample(SKILLS, 3)}
+        for u in range(n_units) for i in range(per_unit)
+    ]
+    records = []
+    for g in range(n_groups):
+        u = g % n_units
+        skills = rnd.sample(SKILLS, 3)
+        prefs = [f"U{u}P{rnd.randrange(per_unit):04d}" for _ in range(5)]
+        dual = rnd.random() < 0.1
+        for _ in range(4):
+            n = len(records)
+            records.append({
+                "name": f"Student {n}", "student_id": str(510000000 + n), "unikey": f"abcd{n:06d}",
+                "unit_code": f"UNIT{u}", "wam": round(rnd.uniform(50, 95), 1), "group_id": f"G{g:06d}",
+                "tutor_code": "T01", "dual_project_enrollment": dual, "skills": skills, "project_preferences": prefs,
+            })
+    return records, projects
+
+
+def timed(fn):
+    start = time.perf_counter()
+    value = fn()
+    return value, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    n_groups = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    n_units = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    records, projects = synthetic(n_groups, n_units)
+    save_load.load_projects_from_db = lambda *args, **kwargs: projects
+
+    with tempfile.TemporaryDirectory() as tmp:
+        students = Path(tmp) / "students.json"
+        students.write_text(json.dumps(records))
+        cohort_snapshot.SNAPSHOT_DIR = Path(tmp) / "snapshots"
+        groups = group_builder.load_groups(students)
+
+        def run(groups_data):
+            return decompose.match_projects_decomposed(groups_data, save_to_db=False)
+
+        # a copy of the list still holds the cached Groups; fresh copies of them don't
+        plain, plain_seconds = timed(lambda: run([g.model_copy() for g in groups]))
+        snap, build_seconds = timed(lambda: cohort_snapshot.for_groups(groups, projects))
+        mapped, mapped_seconds = timed(lambda: run(groups))
+        cohort_snapshot._open.clear()
+        _, open_seconds = timed(lambda: cohort_snapshot.open_snapshot(snap.path).group_ids())
+
+        for key in ("allocations", "summary", "explanations"):
+            assert json.dumps(plain[key]) == json.dumps(mapped[key]), key
+
+        print(f"{n_groups} groups, {len(projects)} projects, {plain['components']} components")
+        print(f"pickled Groups    {plain_seconds:7.3f}s")
+        print(f"cohort snapshot   {mapped_seconds:7.3f}s  ({plain_seconds / mapped_seconds:.1f}x)")
+        print(f"snapshot build    {build_seconds:7.3f}s  {snap.path.stat().st_size / 2**20:.1f} MiB,"
+              f"  cold open + decode IDs {open_seconds * 1000:.1f}ms")
@@ -0,0 +1,79 @@
+# bench_cohort_table.py
+# memory and group-by time of the cohort held as parsed students.json (one dict per student)
+# against app/cohort_table.CohortTable, on a synthetic cohort of 4-5 student groups.
+# run from backend/: python -m test.bench_cohort_table [students]
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from app import group_builder
+from app.cohort_table import CohortTable
+from app.submission_stats import SubmissionAggregates
+
+SKILLS = ["Python", "Web Development", "Database", "Algorithms", "UI/UX", "Data analysis", "Machine Learning"]
+UNITS = ["SOFT3888", "COMP3888", "DATA3888", "ISYS3888"]
+
+
+def synthetic_students(n_students: int, seed: int = 3888) -> bytes:
+    """students.json content: group fields repeated on every member, like the real file"""
+    rnd = random.Random(seed)
+    records = []
+    g = 0
+    while len(records) < n_students:
+        skills = rnd.sample(SKILLS, 3)
+        prefs = [f"P{rnd.randrange(500):03d}" for _ in range(5)]
+        tutor = f"T{rnd.randint(1, 40):02d}"
+        dual = rnd.random() < 0.1
+        for _ in range(rnd.randint(4, 5)):
+            n = len(records)
+            records.append({
+                "name": f"Student {n}", "student_id": str(510000000 + n), "unikey": f"abcd{n:05d}",
+                "unit_code": rnd.choice(UNITS), "wam": round(rnd.uniform(50, 95), 1),
+                "group_id": f"G{g:05d}", "tutor_code": tutor, "dual_project_enrollment": dual,
+                "skills": skills, "project_preferences": prefs,
+            })
+        g += 1
+    return json.dumps(records[:n_students]).encode("utf-8")
+
+
+def measure(build):
+    tracemalloc.start()
+    start = time.perf_counter()
+    value = build()
+    seconds = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return value, size, seconds
+
+
+if __name__ == "__main__":
+    n_students = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    raw = synthetic_students(n_students)
+
+    records, dict_bytes, _ = measure(lambda: json.loads(raw))
+    # parsed afresh so the table owns its own strings rather than sharing the dicts'
+    table, table_bytes, build_seconds = measure(lambda: CohortTable.from_records(json.loads(raw)))
+
+    # group_builder only builds from the table; from the dicts that means building one first
+    start = time.perf_counter()
+    from_table = group_builder.build_groups_from_table(table)
+    table_group_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    by_dict = SubmissionAggregates()
+    by_dict.add_records(records)
+    dict_stats_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    by_table = SubmissionAggregates()
+    by_table._load_table(table)
+    table_stats_seconds = time.perf_counter() - start
+    assert by_dict.project_demand == by_table.project_demand
+    assert by_dict.skill_counts == by_table.skill_counts
+
+    print(f"{n_students} students, {len(from_table)} groups")
+    print(f"list of dicts  {dict_bytes / 2**20:8.1f} MiB  groups      -    aggregates {dict_stats_seconds:6.3f}s")
+    print(f"CohortTable    {table_bytes / 2**20:8.1f} MiB  groups {table_group_seconds:6.3f}s  aggregates {table_stats_seconds:6.3f}s"
+          f"  (parsed and built in {build_seconds:.3f}s)")
+    print(f"memory ratio   {dict_bytes / table_bytes:8.1f}x")
@@ -0,0 +1,75 @@
+# bench_stable_matching.py
+# deferred acceptance (app/stable_matching.py) against the greedy loop (app/algorithm.py) on a
+# synthetic cohort. No database needed: the project list is passed in directly.
+# run from backend/: python -m test.bench_stable_matching [groups] [projects]
+import random
+import sys
+import time
+
+from app.models import Group, Student
+from app import algorithm, stable_matching
+
+SKILLS = ["Python", "Web Development", "Database", "Algorithms", "UI/UX", "Data analysis", "Machine Learning"]
+
+
+def synthetic_cohort(n_groups: int, n_projects: int, seed: int = 3888):
+    rnd = random.Random(seed)
+    projects = [{"id": f"P{i:05d}", "required_skills": rnd.sample(SKILLS, 3)} for i in range(n_projects)]
+    ids = [p["id"] for p in projects]
+    # a few popular projects, like the real data
+    weights = [1.0 / (1 + i) ** 0.6 for i in range(n_projects)]
+    groups = []
+    for g in range(n_groups):
+        student = Student(
+            name=f"Student {g}", student_id=str(510000000 + g), unikey=f"abcd{g:04d}", unit_code="SOFT3888",
+            wam=70.0, tutor_code="T01", dual_project_enrollment=False, skills=[], project_preferences=[],
+        )
+        groups.append(Group(
+            group_id=f"G{g:05d}",
+            students=[student],
+            project_preferences=list(dict.fromkeys(rnd.choices(ids, weights, k=5))),
+            wam_breakdown={"HD": rnd.randint(0, 2), "D": rnd.randint(0, 2), "CR": rnd.randint(0, 2), "P": 1},
+            dual_project_enrollment=rnd.random() < 0.1,
+            skills=rnd.sample(SKILLS, 3),
+            justification="",
+        ))
+    return groups, projects
+
+
+def blocked_groups(groups, projects, allocations) -> int:
+    """groups with a project they ranked higher that would rather have them than its holder"""
+    by_id = {p["id"]: p for p in projects}
+    holder = {pid: gid for gid, pid in allocations.items()}
+    by_gid = {g.group_id: g for g in groups}
+    count = 0
+    for group in groups:
+        current = allocations.get(group.group_id)
+        for pid in group.project_preferences:
+            if pid == current:
+                break
+            other = holder.get(pid)
+            if other is None or (
+                stable_matching.project_side_score(group, by_id[pid])
+                > stable_matching.project_side_score(by_gid[other], by_id[pid])
+            ):
+                count += 1
+                break
+    return count
+
+
+if __name__ == "__main__":
+    n_groups = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    n_projects = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    groups, projects = synthetic_cohort(n_groups, n_projects)
+
+    start = time.perf_counter()
+    greedy = algorithm.assign_groups(groups, projects, explain_top_k=0)["allocations"]
+    greedy_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    stable = stable_matching.deferred_acceptance(groups, projects)
+    stable_seconds = time.perf_counter() - start
+
+    print(f"{n_groups} groups, {n_projects} projects")
+    print(f"greedy              {greedy_seconds:8.3f}s  allocated {len(greedy):6d}  blocked groups {blocked_groups(groups, projects, greedy)}")
+    print(f"deferred acceptance {stable_seconds:8.3f}s  allocated {len(stable):6d}  blocked groups {blocked_groups(groups, projects, stable)}")
@@ -0,0 +1,66 @@
+# bench_submission_validation.py
+# per-submission CPU of the old hand-rolled checks in POST /api/students (json.loads + string
+# splits + dict building) against the cached TypeAdapter parsing the raw body bytes.
+# run from backend/: python -m test.bench_submission_validation
+import json
+import timeit
+
+from app.models import SUBMISSION_ADAPTER
+
+PAYLOAD = json.dumps({
+    "group_name": "COMP3888_M10_03",
+    "students": [f"Student {i}, 51000{i:04d}, abcd{i:04d}, COMP3888" for i in range(6)],
+    "wam_distribution": {"hd": 2, "d": 2, "cr": 1, "p": 1},
+    "dual_enrollment": "No",
+    "suitability_description": "We have built similar web apps before.",
+    "skills": ["Python", "Web Development", "Database"],
+    "project_preferences": ["P01", "P07", "P09", "P10", "P30"],
+}).encode()
+
+
+def legacy(raw: bytes):
+    group_data = json.loads(raw)
+    for field in ["group_name", "students", "wam_distribution", "dual_enrollment", "suitability_description"]:
+        if not group_data.get(field):
+            raise ValueError(field)
+    group_name = group_data.get("group_name")
+    if len(group_name.split('_')) != 3:
+        raise ValueError("group_name")
+    students = group_data.get("students", [])
+    if len(students) < 5 or len(students) > 7:
+        raise ValueError("students")
+    for student in students:
+        if not student or len(student.split(',')) != 4:
+            raise ValueError("student")
+    wam_dist = group_data.get("wam_distribution", {})
+    if wam_dist.get("hd", 0) + wam_dist.get("d", 0) + wam_dist.get("cr", 0) + wam_dist.get("p", 0) != len(students):
+        raise ValueError("wam")
+    if group_data.get("dual_enrollment") not in ["Yes", "No"]:
+        raise ValueError("dual")
+
+    records = []
+    for student_info in students:
+        name, student_id, unikey, uos_code = [part.strip() for part in student_info.split(',')]
+        records.append({
+            "name": name, "student_id": student_id, "unikey": unikey, "unit_code": uos_code,
+            "wam": 0, "group_id": group_name, "tutor_code": "T01",
+            "dual_project_enrollment": group_data["dual_enrollment"] == "Yes",
+            "skills": group_data.get("skills", []),
+            "project_preferences": group_data.get("project_preferences", []),
+        })
+    wams = [87.5] * wam_dist["hd"] + [80.0] * wam_dist["d"] + [70.0] * wam_dist["cr"] + [57.5] * wam_dist["p"]
+    for record, wam in zip(records, wams):
+        record["wam"] = wam
+    return records
+
+
+def typed(raw: bytes):
+    return SUBMISSION_ADAPTER.validate_json(raw).to_records()
+
+
+if __name__ == "__main__":
+    assert legacy(PAYLOAD) == typed(PAYLOAD)
+    n = 20000
+    for label, fn in (("legacy dict path", legacy), ("TypeAdapter.validate_json", typed)):
+        seconds = min(timeit.repeat(lambda: fn(PAYLOAD), number=n, repeat=5))
+        print(f"{label:28s} {seconds / n * 1e6:8.2f} us/submission")
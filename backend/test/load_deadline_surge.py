@@ -0,0 +1,421 @@
+# load_deadline_surge.py
+# deadline-surge load generator: many virtual users browsing projects, submitting groups and
+# admins polling the dashboards all at once, like the last hour before end_date in schedule.json.
+# Reports throughput, p50/p95/p99 latency and error rate per route so storage/caching changes
+# can be compared by numbers. Stdlib only (asyncio), no extra packages.
+#
+# run from backend/:
+#   python -m test.load_deadline_surge --users 100 --duration 30            (app in-process)
+#   python -m test.load_deadline_surge --url http://127.0.0.1:8000 --allow-writes
+#
+# In-process runs drive app.main:app directly over ASGI, give every virtual student a session of
+# their own and put data/students.json back the way it was afterwards. Against a URL the submit
+# scenario writes to that server's students.json, so it only runs with --allow-writes; all users
+# share one login and one address there, so if that server has per-client rates turned on
+# (ADMISSION_SUBMIT, ADMISSION_CATALOG in app/admission.py) most of them get 429.
+import argparse
+import asyncio
+import http.client
+import json
+import math
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from http.cookies import SimpleCookie
+from urllib.parse import urlencode, urlsplit
+
+STUDENTS_PATH = Path(__file__).resolve().parents[1] / "data" / "students.json"
+PROJECTS_PATH = Path(__file__).resolve().parents[1] / "data" / "projects.json"
+
+
+# --- clients ---
+class InProcessClient:
+    """Calls the ASGI app directly (no sockets), one request at a time per virtual user"""
+
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def request(self, method: str, path: str, body: bytes = b"", headers=None) -> Tuple[int, int]:
+        path, _, query = path.partition("?")
+        raw_headers = [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]
+        raw_headers.append((b"content-length", str(len(body)).encode()))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0", "spec_version": "2.4"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "root_path": "",
+            "query_string": query.encode(),
+            "headers": raw_headers,
+            "client": ("127.0.0.1", 50000),
+            "server": ("testserver", 80),
+        }
+        done = asyncio.Event()
+        sent_body = False
+        status = 0
+        size = 0
+
+        async def receive():
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            await done.wait()
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+                if not message.get("more_body"):
+                    done.set()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            done.set()
+        return status, size
+
+    async def close(self) -> None:
+        pass
+
+
+class HTTPClient:
+    """Minimal keep-alive HTTP/1.1 client, one connection per virtual user"""
+
+    def __init__(self, base_url: str) -> None:
+        parts = urlsplit(base_url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def _connect(self) -> None:
+        self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+
+    async def request(self, method: str, path: str, body: bytes = b"", headers=None) -> Tuple[int, int]:
+        if self.writer is None:
+            await self._connect()
+        lines = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}", f"Content-Length: {len(body)}"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        self.writer.write(("\r\n".join(lines) + "\r\n\r\n").encode() + body)
+        await self.writer.drain()
+
+        status_line = await self.reader.readline()
+        if not status_line:
+            await self.close()
+            raise ConnectionError("server closed the connection")
+        status = int(status_line.split()[1])
+        response_headers: Dict[str, str] = {}
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            response_headers[key.strip().lower()] = value.strip()
+
+        size = 0
+        if response_headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                chunk_size = int((await self.reader.readline()).split(b";")[0], 16)
+                if chunk_size == 0:
+                    await self.reader.readline()
+                    break
+                size += len(await self.reader.readexactly(chunk_size))
+                await self.reader.readline()
+        else:
+            length = int(response_headers.get("content-length", "0"))
+            size = len(await self.reader.readexactly(length)) if length else 0
+
+        if response_headers.get("connection", "").lower() == "close":
+            await self.close()
+        return status, size
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+            self.reader = None
+
+
+# --- results ---
+class Recorder:
+    def __init__(self) -> None:
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.statuses: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+
+    def add(self, route: str, seconds: float, status: str) -> None:
+        self.latencies[route].append(seconds)
+        self.statuses[route][status] += 1
+
+    def report(self, elapsed: float) -> Dict[str, Any]:
+        routes = {}
+        for route in sorted(self.latencies):
+            samples = sorted(self.latencies[route])
+            statuses = dict(self.statuses[route])
+            errors = sum(n for s, n in statuses.items() if s == "exc" or s.startswith("5"))
+            routes[route] = {
+                "requests": len(samples),
+                "rps": round(len(samples) / elapsed, 1),
+                "p50_ms": round(_percentile(samples, 50) * 1000, 2),
+                "p95_ms": round(_percentile(samples, 95) * 1000, 2),
+                "p99_ms": round(_percentile(samples, 99) * 1000, 2),
+                "max_ms": round(samples[-1] * 1000, 2),
+                "error_rate": round(errors / len(samples), 4),
+                "statuses": statuses,
+            }
+        total = sum(r["requests"] for r in routes.values())
+        return {"elapsed_s": round(elapsed, 2), "requests": total, "rps": round(total / elapsed, 1), "routes": routes}
+
+
+def _percentile(samples: List[float], pct: float) -> float:
+    # nearest rank on an already sorted list
+    if not samples:
+        return 0.0
+    rank = max(1, math.ceil(pct / 100 * len(samples)))
+    return samples[min(rank, len(samples)) - 1]
+
+
+# --- scenarios ---
+class User:
+    def __init__(self, client, recorder: Recorder, think: float, rnd: random.Random,
+                 sessions: Dict[str, Dict[str, str]]) -> None:
+        self.client = client
+        self.recorder = recorder
+        self.think = think
+        self.rnd = rnd
+        self.sessions = sessions
+
+    async def call(self, method: str, path: str, route: Optional[str] = None, body: bytes = b"",
+                   headers: Optional[Dict[str, str]] = None) -> int:
+        start = time.perf_counter()
+        try:
+            status, _ = await self.client.request(method, path, body, headers)
+            label = str(status)
+        except Exception:
+            status, label = 0, "exc"
+            await self.client.close()
+        name = f"{method} {route or path}"
+        # turned away by admission control: kept apart so the route's own percentiles are admitted requests
+        if status == 429:
+            name += " (429)"
+        self.recorder.add(name, time.perf_counter() - start, label)
+        return status
+
+    async def pause(self) -> None:
+        if self.think > 0:
+            await asyncio.sleep(self.rnd.uniform(0, self.think))
+
+
+def _project_ids() -> List[str]:
+    try:
+        return [p["id"] for p in json.loads(PROJECTS_PATH.read_text(encoding="utf-8")) if p.get("id")]
+    except (OSError, ValueError):
+        return []
+
+
+PROJECT_IDS = _project_ids() or [f"P{i:02d}" for i in range(1, 31)]
+# "Cookie" headers for each role, filled in by main() once it has a session for them
+SESSIONS: Dict[str, Dict[str, str]] = {"student": {}, "admin": {}}
+
+
+def shared_sessions(i: int) -> Dict[str, Dict[str, str]]:
+    return SESSIONS
+
+
+def login_headers(base_url: str, username: str, password: str, role: str) -> Dict[str, str]:
+    """log in through /login-check once and reuse the signed session cookie for every request"""
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname or "127.0.0.1", parts.port or 80, timeout=30)
+    try:
+        conn.request(
+            "POST", "/login-check", urlencode({"username": username, "password": password, "role": role}),
+            {"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        response = conn.getresponse()
+        response.read()
+        cookie = SimpleCookie(response.getheader("set-cookie") or "")
+    finally:
+        conn.close()
+    if "session" not in cookie:
+        raise SystemExit(f"login as {username} failed (HTTP {response.status})")
+    return {"Cookie": f"session={cookie['session'].value}"}
+
+
+def submission_body(rnd: random.Random) -> bytes:
+    # unique IDs per submission so the 409 duplicate check doesn't kick in
+    size = rnd.randint(5, 7)
+    base = rnd.randrange(100_000_000, 999_000_000)
+    tag = uuid.uuid4().hex[:6]
+    bands = [rnd.choice(("hd", "d", "cr", "p")) for _ in range(size)]
+    return json.dumps({
+        "group_name": f"T{rnd.randint(1, 20):02d}_MON{rnd.randint(9, 17)}_{tag}",
+        "students": [f"Load Student {i}, {base + i}, lt{tag}{i}, COMP3888" for i in range(size)],
+        "wam_distribution": {b: bands.count(b) for b in ("hd", "d", "cr", "p")},
+        "dual_enrollment": rnd.choice(("Yes", "No")),
+        "suitability_description": "Load test submission.",
+        "skills": rnd.sample(["Python", "Web Development", "Database", "UI/UX", "Machine learning"], 3),
+        "project_preferences": rnd.sample(PROJECT_IDS, min(5, len(PROJECT_IDS))),
+    }).encode()
+
+
+async def browse_projects(user: User) -> None:
+    await user.call("GET", "/projects/page", headers=user.sessions["student"])
+    await user.pause()
+    await user.call("GET", "/projects", headers=user.sessions["student"])
+    await user.call("GET", "/api/skills", headers=user.sessions["student"])
+    await user.call("GET", "/api/schedule", headers=user.sessions["student"])
+
+
+async def submit_group(user: User) -> None:
+    await user.call("GET", "/student/form", headers=user.sessions["student"])
+    await user.call("GET", "/projects", headers=user.sessions["student"])
+    await user.pause()
+    await user.call(
+        "POST", "/api/students", body=submission_body(user.rnd),
+        headers={**user.sessions["student"], "Content-Type": "application/json"},
+    )
+
+
+async def admin_polling(user: User) -> None:
+    await user.call("GET", "/api/submissions/summary", headers=user.sessions["admin"])
+    await user.call("GET", "/api/stats", headers=user.sessions["admin"])
+    await user.call("GET", "/api/allocations/summary", headers=user.sessions["admin"])
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "browse": browse_projects,
+    "submit": submit_group,
+    "admin": admin_polling,
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}, choose from {', '.join(SCENARIOS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+
+async def run_load(make_client: Callable, users: int, duration: float, think: float,
+                   mix: Dict[str, float], ramp: float, seed: int,
+                   sessions_for: Callable[[int], Dict[str, Dict[str, str]]] = shared_sessions) -> Dict[str, Any]:
+    recorder = Recorder()
+    names = list(mix)
+    weights = [mix[n] for n in names]
+    deadline = time.perf_counter() + duration
+
+    async def virtual_user(i: int) -> None:
+        rnd = random.Random(seed + i)
+        # spread the arrivals over the ramp period rather than all on the first tick
+        await asyncio.sleep(ramp * i / max(users, 1))
+        client = make_client()
+        user = User(client, recorder, think, rnd, sessions_for(i))
+        try:
+            while time.perf_counter() < deadline:
+                await SCENARIOS[rnd.choices(names, weights)[0]](user)
+                await user.pause()
+        finally:
+            await client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(virtual_user(i) for i in range(users)))
+    return recorder.report(time.perf_counter() - start)
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{report['requests']} requests in {report['elapsed_s']}s ({report['rps']} req/s)\n")
+    header = f"{'route':<34}{'reqs':>7}{'rps':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'err %':>7}  statuses"
+    print(header)
+    print("-" * len(header))
+    for route, r in report["routes"].items():
+        print(
+            f"{route:<34}{r['requests']:>7}{r['rps']:>8}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+            f"{r['p99_ms']:>9}{r['error_rate'] * 100:>7.1f}  {r['statuses']}"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Deadline-surge load test")
+    parser.add_argument("--url", help="base URL of a running server (default: drive the app in-process)")
+    parser.add_argument("--users", type=int, default=50, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of load")
+    parser.add_argument("--ramp", type=float, default=2.0, help="seconds over which users arrive")
+    parser.add_argument("--think", type=float, default=0.5, help="max random pause between steps (s)")
+    parser.add_argument("--mix", default="browse=6,submit=3,admin=1", help="scenario weights")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--allow-writes", action="store_true", help="run the submit scenario against --url")
+    parser.add_argument("--json", help="also write the report to this file")
+    parser.add_argument("--student", default="student1:studentpass", help="student login (user:password)")
+    parser.add_argument("--admin", default="admin1:adminpass", help="admin login (user:password)")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    backup = None
+    created = False
+    sessions_for = shared_sessions
+    if args.url:
+        if "submit" in mix and not args.allow_writes:
+            print("submit scenario writes to the server's students.json; skipping it (use --allow-writes)")
+            mix.pop("submit")
+        make_client = lambda: HTTPClient(args.url)
+        for role in SESSIONS:
+            username, _, password = getattr(args, role).partition(":")
+            SESSIONS[role] = login_headers(args.url, username, password, role)
+    else:
+        # the point is to load the app as if the deadline were close, not past: with the scheduler
+        # on, a passed end_date in schedule.json would turn every submission away
+        os.environ.setdefault("SCHEDULER", "0")
+        from app.main import app
+        # submissions land in data/students.json; put it back afterwards
+        created = not STUDENTS_PATH.exists()
+        if not created:
+            backup = Path(tempfile.mkdtemp()) / "students.json"
+            shutil.copy2(STUDENTS_PATH, backup)
+        from app import auth
+        for role in SESSIONS:
+            username = getattr(args, role).partition(":")[0]
+            SESSIONS[role] = {"Cookie": f"{auth.SESSION_COOKIE}={auth.sessions.issue(username, role)}"}
+        student = args.student.partition(":")[0]
+
+        # a session per virtual student, as if every student had a login of their own
+        def sessions_for(i: int) -> Dict[str, Dict[str, str]]:
+            cookie = f"{auth.SESSION_COOKIE}={auth.sessions.issue(f'{student}-{i}', 'student')}"
+            return {**SESSIONS, "student": {"Cookie": cookie}}
+
+        make_client = lambda: InProcessClient(app)
+
+    if not mix:
+        raise SystemExit("no scenarios left to run")
+    try:
+        report = asyncio.run(run_load(
+            make_client, args.users, args.duration, args.think, mix, args.ramp, args.seed, sessions_for
+        ))
+    finally:
+        if backup is not None:
+            shutil.copy2(backup, STUDENTS_PATH)
+            shutil.rmtree(backup.parent, ignore_errors=True)
+        elif not args.url and created:
+            STUDENTS_PATH.unlink(missing_ok=True)
+
+    print_report(report)
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+# test_admission.py
+# AdmissionPolicy slots, queueing and the per-client token bucket, driven on a plain event loop.
+# run from backend/: python -m pytest test/test_admission.py
+import asyncio
+
+import pytest
+
+from app import admission
+from app.admission import AdmissionPolicy, Rejected
+
+
+def _policy(**overrides):
+    config = {"concurrency": 1, "queue": 1, "wait": 0.5, "rate": 0.0, "burst": 1}
+    config.update(overrides)
+    return AdmissionPolicy("test", **config)
+
+
+async def _settle():
+    # a handed-over slot reaches its waiter a few loop iterations later (asyncio.wait)
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+def test_release_hands_the_slot_to_the_first_waiter():
+    async def scenario():
+        policy = _policy(queue=2)
+        await policy.acquire()
+        order = []
+
+        async def waiter(name):
+            await policy.acquire()
+            order.append(name)
+
+        tasks = [asyncio.create_task(waiter("first")), asyncio.create_task(waiter("second"))]
+        await asyncio.sleep(0)
+        assert policy.status()["waiting"] == 2
+
+        policy.release()
+        await _settle()
+        assert order == ["first"] and policy.in_flight == 1
+        policy.release()
+        await asyncio.gather(*tasks)
+        assert order == ["first", "second"]
+        policy.release()
+        assert policy.in_flight == 0 and policy.status()["waiting"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_full_queue_and_wait_timeout_are_rejected():
+    async def scenario():
+        policy = _policy(queue=1, wait=0.05)
+        await policy.acquire()
+        queued = asyncio.create_task(policy.acquire())
+        await asyncio.sleep(0)
+
+        with pytest.raises(Rejected) as full:
+            await policy.acquire()
+        assert full.value.reason == "queue_full" and full.value.retry_after >= 1
+
+        with pytest.raises(Rejected) as late:
+            await queued
+        assert late.value.reason == "wait_timeout"
+        # the timed-out waiter gave up its place and the slot is still the first holder's
+        assert policy.in_flight == 1 and policy.status()["waiting"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def scenario():
+        policy = _policy(queue=1, wait=5)
+        await policy.acquire()
+        queued = asyncio.create_task(policy.acquire())
+        await asyncio.sleep(0)
+        queued.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await queued
+        assert policy.status()["waiting"] == 0
+        policy.release()
+        assert policy.in_flight == 0
+
+    asyncio.run(scenario())
+
+
+def test_token_bucket_is_per_client(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(admission.time, "monotonic", lambda: now[0])
+    policy = _policy(rate=2.0, burst=2)
+
+    policy.take_token("addr:a")
+    policy.take_token("addr:a")
+    with pytest.raises(Rejected) as limited:
+        policy.take_token("addr:a")
+    assert limited.value.reason == "rate" and limited.value.retry_after == 1
+    policy.take_token("addr:b")
+
+    now[0] += 0.5  # one token back at 2/s
+    policy.take_token("addr:a")
+    with pytest.raises(Rejected):
+        policy.take_token("addr:a")
+
+
+def test_rate_off_by_default():
+    policy = _policy()
+    for _ in range(100):
+        policy.take_token("addr:a")
+    assert all(config["rate"] == 0 for config in admission.POLICIES.values())
+
+
+def test_client_key_ignores_forwarded_for_unless_trusted(monkeypatch):
+    scope = {"headers": [(b"x-forwarded-for", b"203.0.113.7, 10.0.0.1")], "client": ("10.0.0.9", 443)}
+    assert admission._client_key(scope) == "addr:10.0.0.9"
+    monkeypatch.setattr(admission, "TRUST_FORWARDED", True)
+    assert admission._client_key(scope) == "addr:203.0.113.7"
+    assert admission._client_key({"headers": [], "client": None}) == "addr:unknown"
@@ -0,0 +1,68 @@
+# test_auth.py
+# signed session cookies: round trip, tampering, key rotation, expiry, and no key at all.
+# run from backend/: python -m pytest test/test_auth.py
+import pytest
+
+from app import auth
+from app.auth import SessionSigner
+
+
+def test_issue_and_verify():
+    signer = SessionSigner([b"key"])
+    token = signer.issue("abcd1234", "student")
+    assert signer.verify(token) == {"username": "abcd1234", "role": "student"}
+    # cached the second time round, same answer
+    assert signer.verify(token) == {"username": "abcd1234", "role": "student"}
+
+
+def test_rejects_tampered_and_foreign_tokens():
+    signer = SessionSigner([b"key"])
+    token = signer.issue("abcd1234", "student")
+    payload, _, signature = token.partition(".")
+    forged = SessionSigner([b"other"]).issue("admin1", "admin")
+
+    assert signer.verify(forged) is None
+    # someone else's payload under our signature
+    assert signer.verify(f"{forged.partition('.')[0]}.{signature}") is None
+    assert signer.verify(f"{payload}.") is None
+    assert signer.verify("not a token") is None
+    assert signer.verify("") is None and signer.verify(None) is None
+
+
+def test_old_keys_still_verify():
+    old = SessionSigner([b"old"]).issue("abcd1234", "student")
+    rotated = SessionSigner([b"new", b"old"])
+    assert rotated.verify(old) == {"username": "abcd1234", "role": "student"}
+    assert SessionSigner([b"new"]).verify(old) is None
+
+
+def test_expiry(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(auth.time, "time", lambda: now[0])
+    signer = SessionSigner([b"key"], ttl=60)
+    token = signer.issue("abcd1234", "student")
+    assert signer.verify(token) is not None
+
+    now[0] += 61
+    # expired both from the cache and when decoded afresh
+    assert signer.verify(token) is None
+    assert SessionSigner([b"key"], ttl=60).verify(token) is None
+
+
+def test_missing_required_secret_refuses_sessions_instead_of_failing_import(monkeypatch):
+    monkeypatch.delenv("SESSION_SECRET", raising=False)
+    monkeypatch.setenv("VERCEL", "1")
+    keys = auth._load_keys()
+    assert keys == []
+
+    signer = SessionSigner(keys)
+    assert not signer.available
+    with pytest.raises(auth.SessionsUnavailable):
+        signer.issue("admin1", "admin")
+    # a cookie signed elsewhere doesn't get in either
+    assert signer.verify(SessionSigner([b"key"]).issue("admin1", "admin")) is None
+
+
+def test_dummy_hash_is_made_on_first_use(tmp_path):
+    directory = auth.UserDirectory(tmp_path / "users.json")
+    assert directory._dummy_hash is None
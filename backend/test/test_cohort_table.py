@@ -0,0 +1,72 @@
+# test_cohort_table.py
+# the columnar cohort table: student IDs of any shape round-trip, and submissions are appended in
+# place without disturbing what a reader has already counted.
+# run from backend/: python -m pytest test/test_cohort_table.py
+import asyncio
+import json
+
+from app import cohort_table
+from app.cohort_table import CohortTable
+from app.submission_writer import SubmissionWriter
+
+
+def _record(student_id, group_id="G1"):
+    return {
+        "name": f"Student {student_id}", "student_id": student_id, "unikey": "abcd0001",
+        "unit_code": "COMP3888", "wam": 80.0, "group_id": group_id, "tutor_code": "T01",
+        "dual_project_enrollment": False, "skills": ["Database"], "project_preferences": ["P1"],
+    }
+
+
+def test_student_ids_of_any_shape_round_trip():
+    ids = [
+        "510000001", "0042", "abc123", "",
+        # more than an int64 holds, and digits that aren't ASCII
+        "99999999999999999990", str(2**63), str(2**63 - 1), "١٢",
+    ]
+    table = CohortTable.from_records([_record(sid) for sid in ids])
+    assert [table.student_id_at(row) for row in range(len(table))] == ids
+    assert [r["student_id"] for r in table.records()] == ids
+
+
+def test_very_long_id_doesnt_break_later_submissions(tmp_path):
+    path = tmp_path / "students.json"
+    writer = SubmissionWriter(path=path, batch_ms=1, write_through=False)
+
+    assert asyncio.run(writer.submit([_record("99999999999999999990")]))
+    assert asyncio.run(writer.submit([_record("510000001", "G2")]))
+    table = cohort_table.get_table(path)
+    assert [table.student_id_at(row) for row in range(len(table))] == ["99999999999999999990", "510000001"]
+    # and a fresh load of the file builds too
+    cohort_table.shared._tables.pop(path)
+    assert len(cohort_table.get_table(path)) == 2
+    assert len(json.loads(path.read_text(encoding="utf-8"))) == 2
+
+
+def test_extend_in_place_keeps_readers_view():
+    table = CohortTable.from_records([_record("1"), _record("2", None)])
+    version = table.version
+    n = len(table)
+    groups = table.group_rows()
+
+    table.extend([_record("3", "G2"), _record("4", "G2")])
+    assert len(table) == 4 and table.version == version + 1
+    # rows a reader already counted are unchanged
+    assert [table.student_id_at(row) for row in range(n)] == ["1", "2"]
+    assert groups == {"G1": [0], "2": [1]}
+    assert table.group_rows() == {"G1": [0], "2": [1], "G2": [2, 3]}
+    assert table.count_by("group_id") == {"G1": 1, "G2": 2, None: 1}
+    assert table.skills_at(3) == ("Database",)
+
+
+def test_shared_append_extends_the_same_table(tmp_path):
+    path = tmp_path / "students.json"
+    records = [_record("1")]
+    path.write_text(json.dumps(records), encoding="utf-8")
+    table = cohort_table.get_table(path)
+
+    records.append(_record("2"))
+    path.write_text(json.dumps(records), encoding="utf-8")
+    with cohort_table.shared.lock:
+        cohort_table.shared.append([records[-1]], path)
+    assert cohort_table.get_table(path) is table and len(table) == 2
@@ -0,0 +1,76 @@
+# test_decompose.py
+# the decomposed engine against the greedy one. With one preference component holding every project
+# they must agree exactly; on a cohort that splits, decomposed is a different (preference-restricted)
+# allocator, so the test pins down what it does instead of expecting greedy's answer.
+# run from backend/: python -m pytest test/test_decompose.py
+import pytest
+
+from app import algorithm, decompose, group_builder, save_load
+from test.bench_cohort_snapshot import synthetic
+
+
+def _cohort(n_groups, n_units, seed=3888):
+    records, projects = synthetic(n_groups, n_units, seed=seed)
+    return group_builder.build_groups(records), projects
+
+
+@pytest.fixture
+def use_projects(monkeypatch):
+    def use(projects):
+        monkeypatch.setattr(save_load, "load_projects_from_db", lambda *args, **kwargs: projects)
+    return use
+
+
+def _run(engine, groups):
+    return engine(groups, save_to_db=False)
+
+
+def test_one_component_matches_greedy(use_projects):
+    groups, projects = _cohort(120, 1)
+    # every project preferred by someone, so the single component holds all of them
+    preferred = {pid for g in groups for pid in g.project_preferences}
+    projects = [p for p in projects if p["id"] in preferred]
+    use_projects(projects)
+
+    greedy = _run(algorithm.match_projects, groups)
+    decomposed = _run(decompose.match_projects_decomposed, groups)
+
+    assert decomposed["components"] == 1
+    assert decomposed["allocations"] == greedy["allocations"]
+    assert decomposed["explanations"] == greedy["explanations"]
+    assert decomposed["summary"] == greedy["summary"]
+
+
+def test_split_cohort_is_preference_restricted(use_projects):
+    groups, projects = _cohort(300, 4)
+    use_projects(projects)
+
+    greedy = _run(algorithm.match_projects, groups)
+    decomposed = _run(decompose.match_projects_decomposed, groups)
+    parts = decompose.find_components(groups, projects)
+    assert decomposed["components"] == len(parts["components"]) == 4
+
+    # no project is handed out twice, and both place as many groups as there are projects
+    allocations = decomposed["allocations"]
+    assert len(set(allocations.values())) == len(allocations)
+    assert len(allocations) == len(greedy["allocations"]) == min(len(groups), len(projects))
+
+    # whatever a component places stays inside that component's projects
+    component_of = {}
+    for i, comp in enumerate(parts["components"]):
+        component_of.update({p["id"]: i for p in comp["projects"]})
+        component_of.update({g.group_id: i for g in comp["groups"]})
+    per_component = [
+        algorithm.assign_groups(c["groups"], c["projects"], explain_top_k=0)["allocations"]
+        for c in parts["components"]
+    ]
+    for placed in per_component:
+        for gid, pid in placed.items():
+            assert allocations[gid] == pid
+            assert component_of[pid] == component_of[gid]
+
+    # greedy lets a group take an unpreferred project from another unit, decomposed doesn't, so on
+    # this cohort some groups end up on different projects: that is expected, not a regression
+    moved = [gid for gid, pid in greedy["allocations"].items() if allocations.get(gid) != pid]
+    assert moved
+    assert any(component_of.get(pid) != component_of[gid] for gid, pid in greedy["allocations"].items())
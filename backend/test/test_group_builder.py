@@ -0,0 +1,85 @@
+# test_group_builder.py
+# WAM bands, the per-group aggregation over the cohort table, and load_groups' cache.
+# run from backend/: python -m pytest test/test_group_builder.py
+import json
+
+import pytest
+
+from app import cohort_table, group_builder
+from app.cohort_table import CohortTable
+from app.group_builder import wam_band
+
+
+@pytest.mark.parametrize("wam, band", [
+    (100, "HD"), (85, "HD"), (84.99, "D"), (75, "D"), (74.9, "CR"), (65, "CR"),
+    (64.99, "P"), (50, "P"), (49.99, "F"), (0, "F"), ("80", "D"), ("85.0", "HD"),
+])
+def test_wam_band_lower_bounds(wam, band):
+    assert wam_band(wam) == band
+
+
+@pytest.mark.parametrize("wam", [None, "", "n/a", [], {}])
+def test_wam_band_unreadable_is_fail(wam):
+    assert wam_band(wam) == "F"
+
+
+def _record(student_id, group_id, wam, prefs, skills=("Database",), dual=False):
+    return {
+        "student_id": str(student_id), "name": f"S{student_id}", "unikey": f"abcd{student_id:04d}",
+        "unit_code": "COMP3888", "wam": wam, "skills": list(skills), "group_id": group_id,
+        "project_preferences": list(prefs), "dual_project_enrollment": dual,
+    }
+
+
+RECORDS = [
+    _record(1, "G1", 90, ["P1", "P2"]),
+    _record(2, "G1", 70, ["P1", "P3"], skills=("Database", "UI/UX"), dual=True),
+    _record(3, "G2", 40, ["P2"]),
+    # no group yet: a group of one, keyed by student ID
+    _record(4, None, 55, []),
+]
+
+
+def test_build_groups_from_table_buckets_members():
+    table = CohortTable.from_records(RECORDS)
+    groups = {g.group_id: g for g in group_builder.build_groups_from_table(table)}
+
+    assert list(groups) == ["G1", "G2", "4"]
+    g1 = groups["G1"]
+    assert [s.student_id for s in g1.students] == ["1", "2"]
+    # first order seen, later records only append what's new
+    assert g1.project_preferences == ["P1", "P2", "P3"]
+    assert g1.wam_breakdown == {"HD": 1, "D": 0, "CR": 1, "P": 0}
+    assert g1.dual_project_enrollment is True
+    # below a pass only shows up in the breakdown once someone is there
+    assert groups["G2"].wam_breakdown == {"HD": 0, "D": 0, "CR": 0, "P": 0, "F": 1}
+    assert groups["G2"].dual_project_enrollment is False
+    assert groups["4"].wam_breakdown["P"] == 1
+    assert groups["G1"].skills == ["Database", "UI/UX"]
+    assert groups["G2"].students[0].tutor_code == "T01"
+
+
+def test_build_groups_is_the_table_build():
+    by_records = group_builder.build_groups(RECORDS)
+    by_table = group_builder.build_groups_from_table(CohortTable.from_records(RECORDS))
+    assert [g.model_dump() for g in by_records] == [g.model_dump() for g in by_table]
+
+
+def test_load_groups_cached_per_table_version(tmp_path):
+    path = tmp_path / "students.json"
+    path.write_text(json.dumps(RECORDS[:3]), encoding="utf-8")
+
+    first = group_builder.load_groups(path)
+    assert [g.group_id for g in first] == ["G1", "G2"]
+    # same table version: the very same Group objects again
+    again = group_builder.load_groups(path)
+    assert all(a is b for a, b in zip(first, again))
+
+    # a submission extends the table, which bumps its version
+    records = RECORDS[:3] + [RECORDS[3]]
+    path.write_text(json.dumps(records), encoding="utf-8")
+    with cohort_table.shared.lock:
+        cohort_table.shared.append([RECORDS[3]], path)
+    after = group_builder.load_groups(path)
+    assert [g.group_id for g in after] == ["G1", "G2", "4"]
+    assert group_builder.cache_state()[0] == (path, cohort_table.get_table(path).version)
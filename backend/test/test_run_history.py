@@ -0,0 +1,64 @@
+# test_run_history.py
+# run history and diffs against a throwaway SQLite database.
+# run from backend/: python -m pytest test/test_run_history.py
+import threading
+
+import pytest
+
+from app import run_history
+from data import cohorts, db_connection
+
+COHORT = "2026S2"
+
+
+@pytest.fixture(autouse=True)
+def sqlite_db(monkeypatch, tmp_path):
+    monkeypatch.setattr(db_connection, "DB_BACKEND", "sqlite")
+    monkeypatch.setattr(cohorts, "DB_BACKEND", "sqlite")
+    monkeypatch.setattr(db_connection, "SQLITE_PATH", str(tmp_path / "runs.sqlite3"))
+    # pooled connections still point at whatever database came before
+    monkeypatch.setattr(db_connection, "_local", threading.local())
+    monkeypatch.setattr(cohorts, "_layout_checked", set())
+
+
+def _record(allocations, demand):
+    return run_history.record_run(allocations, {"project_demand": demand}, len(allocations), COHORT)
+
+
+def test_diff_latest_against_previous():
+    first = _record({"G1": "P1", "G2": "P2", "G3": "P3"}, {"P1": 2, "P2": 1, "P3": 1})
+    second = _record({"G1": "P1", "G2": "P3", "G4": "P2"}, {"P1": 2, "P2": 2, "P3": 1})
+
+    diff = run_history.diff_runs(COHORT)
+    assert diff["base"]["id"] == first and diff["head"]["id"] == second
+    assert diff["counts"] == {"moved": 1, "allocated": 1, "unallocated": 1}
+    assert diff["groups"] == [
+        {"group_id": "G2", "project_before": "P2", "project_after": "P3", "change": "moved"},
+        {"group_id": "G3", "project_before": "P3", "project_after": None, "change": "unallocated"},
+        {"group_id": "G4", "project_before": None, "project_after": "P2", "change": "allocated"},
+    ]
+    # P2 gained demand; P1 and P3 are unchanged in both demand and fill, so only P2 comes back
+    assert diff["projects"] == [{
+        "project_id": "P2", "demand_before": 1, "demand_after": 2, "demand_delta": 1,
+        "filled_before": 1, "filled_after": 1, "filled_delta": 0,
+    }]
+
+
+def test_diff_explicit_runs_and_missing_ones():
+    assert run_history.diff_runs(COHORT) is None
+    only = _record({"G1": "P1"}, {"P1": 1})
+    # a single run has nothing to compare against
+    assert run_history.diff_runs(COHORT) is None
+    later = _record({}, {})
+
+    diff = run_history.diff_runs(COHORT, base=later, head=only)
+    assert diff["counts"] == {"moved": 0, "allocated": 1, "unallocated": 0}
+    assert run_history.diff_runs(COHORT, base=only, head=later + 1) is None
+
+
+def test_history_keeps_the_newest_runs(monkeypatch):
+    monkeypatch.setattr(run_history, "RUN_HISTORY_KEEP", 2)
+    ids = [_record({"G1": f"P{i}"}, {f"P{i}": 1}) for i in range(4)]
+
+    assert [r["id"] for r in run_history.list_runs(COHORT)] == ids[:-3:-1]
+    assert run_history.diff_runs(COHORT, base=ids[0], head=ids[3]) is None
@@ -4,6 +4,7 @@ from typing import Any, Dict, List
 from app.algorithm import match_projects
 from app.models import Group
 from app import save_load
+from data.cohorts import current_cohort, partition_name
 from data.db_connection import fetch_all_dicts, get_conn
 
 JSON_PATH = Path(__file__).resolve().parents[1] / "data" / "example_backend_input.json"
@@ -56,20 +57,26 @@ if __name__ == "__main__":
     print("Allocations:", result["allocations"])
     print("Summary keys:", list(result["summary"].keys()))
 
-    alloc_rows = fetch_all_dicts('SELECT group_id, project_id FROM "Allocation_Results" ORDER BY group_id;')
-    assert alloc_rows, "Allocation_Results has no data"
-    print("✅ Allocation_Results rows:", alloc_rows)
+    # the per-run tables are per cohort (data/cohorts.py); the run above saved into the current one
+    cohort = current_cohort()
+    alloc_table = partition_name('"Allocation_Results"', cohort)
+    alloc_rows = fetch_all_dicts(f'SELECT group_id, project_id FROM {alloc_table} ORDER BY group_id;')
+    assert alloc_rows, f"{alloc_table} has no data"
+    print(f"✅ {alloc_table} rows:", alloc_rows)
 
     summary_row = fetch_all_dicts(
-        'SELECT id, average_wam_score FROM "Allocation_Summary" ORDER BY id DESC LIMIT 1;'
+        'SELECT id, average_wam_score FROM "Allocation_Summary" WHERE cohort = %s ORDER BY id DESC LIMIT 1;',
+        (cohort,),
     )
     assert summary_row, "Allocation_Summary has no data"
     print("✅ Allocation_Summary latest:", summary_row[0])
 
-    demand_rows = fetch_all_dicts('SELECT project_id, chosen_count FROM "Project_Demand";')
-    assert demand_rows, "Project_Demand has no data"
-    print("✅ Project_Demand sample:", demand_rows[:5])
+    demand_table = partition_name('"Project_Demand"', cohort)
+    demand_rows = fetch_all_dicts(f'SELECT project_id, chosen_count FROM {demand_table};')
+    assert demand_rows, f"{demand_table} has no data"
+    print(f"✅ {demand_table} sample:", demand_rows[:5])
 
-    skill_rows = fetch_all_dicts('SELECT skill_name, skill_percentage FROM "Skill_Coverage";')
-    assert skill_rows, "Skill_Coverage has no data"
-    print("✅ Skill_Coverage sample:", skill_rows[:5])
+    skill_table = partition_name('"Skill_Coverage"', cohort)
+    skill_rows = fetch_all_dicts(f'SELECT skill_name, skill_percentage FROM {skill_table};')
+    assert skill_rows, f"{skill_table} has no data"
+    print(f"✅ {skill_table} sample:", skill_rows[:5])
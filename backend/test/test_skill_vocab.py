@@ -0,0 +1,19 @@
+# test_skill_vocab.py
+# stored skill names keep the spellings the old export wrote; scoring maps them onto rated skills.
+# run from backend/: python -m pytest test/test_skill_vocab.py
+from app import scoring_helpers, skill_vocab
+
+
+def test_stored_names_keep_their_old_spelling():
+    assert skill_vocab.parse_skills("ml; DL;sql; web dev") == ("ML", "DL", "Database", "Web Development")
+    assert skill_vocab.canonical("Machine Learning") == "Machine Learning"
+    # case and spacing variants of a known name still collapse onto it
+    assert skill_vocab.canonical("data  ANALYSIS") == "Data analysis"
+
+
+def test_scoring_counts_aliases_as_the_rated_skill():
+    rated = "Machine learning /Deep Learning"
+    assert skill_vocab.rated("ML") == skill_vocab.rated("deep learning") == rated
+    assert skill_vocab.rated("Data Analytics") == "Data analysis"
+    assert skill_vocab.rated("Rust") == "Rust"
+    assert scoring_helpers.calculate_skills_score(["ML"], [rated]) == scoring_helpers.calculate_skills_score([rated], [rated])
@@ -0,0 +1,49 @@
+# test_stable_matching.py
+# deferred acceptance on hand-built groups: who wins a contested project, ties, capacities, and
+# groups whose list runs out.
+# run from backend/: python -m pytest test/test_stable_matching.py
+from app.models import Group
+from app.stable_matching import deferred_acceptance
+
+
+def _group(gid, prefs, skills=(), wam=None):
+    return Group(
+        group_id=gid, students=[], project_preferences=list(prefs),
+        wam_breakdown=wam or {"HD": 0, "D": 0, "CR": 5, "P": 0},
+        dual_project_enrollment=False, skills=list(skills), justification="",
+    )
+
+
+def _project(pid, skills=("Database",)):
+    return {"id": pid, "required_skills": list(skills)}
+
+
+def test_equal_scores_go_to_the_group_listed_first():
+    projects = [_project("P1"), _project("P2")]
+    a, b = _group("A", ["P1", "P2"]), _group("B", ["P1", "P2"])
+
+    assert deferred_acceptance([a, b], projects) == {"A": "P1", "B": "P2"}
+    assert deferred_acceptance([b, a], projects) == {"B": "P1", "A": "P2"}
+
+
+def test_project_keeps_the_stronger_group_whatever_the_order():
+    projects = [_project("P1", ["Database"]), _project("P2")]
+    weak = _group("weak", ["P1", "P2"])
+    strong = _group("strong", ["P1", "P2"], skills=["Database"])
+
+    for order in ([weak, strong], [strong, weak]):
+        allocations = deferred_acceptance(order, projects)
+        assert allocations == {"weak": "P2", "strong": "P1"}
+        # result comes back in the caller's group order
+        assert list(allocations) == [g.group_id for g in order]
+
+
+def test_capacity_and_exhausted_lists():
+    projects = [_project("P1"), _project("P2")]
+    groups = [_group("A", ["P1"]), _group("B", ["P1"]), _group("C", ["P2", "P1"]), _group("D", ["nope"])]
+
+    # P1 holds two, so nobody is bumped; unknown projects are ignored
+    assert deferred_acceptance(groups, projects, capacities={"P1": 2}) == {"A": "P1", "B": "P1", "C": "P2"}
+    # a closed project is passed over; B runs out of choices and stays unallocated
+    assert deferred_acceptance(groups, projects, capacities={"P1": 0}) == {"C": "P2"}
+    assert deferred_acceptance(groups, projects) == {"A": "P1", "C": "P2"}
@@ -0,0 +1,39 @@
+# test_submission_models.py
+# what the submission adapter lets through: student ID shape and WAM band counts.
+# run from backend/: python -m pytest test/test_submission_models.py
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from app.models import SUBMISSION_ADAPTER
+
+
+def _body(ids=("510000001", "510000002", "510000003", "510000004", "510000005"), wam=None):
+    return json.dumps({
+        "group_name": "T01_Mon10_1",
+        "students": [f"Student {i}, {sid}, abcd{i:04d}, COMP3888" for i, sid in enumerate(ids)],
+        "wam_distribution": wam or {"hd": 1, "d": 2, "cr": 2, "p": 0},
+        "dual_enrollment": "No",
+        "suitability_description": "We like databases",
+    })
+
+
+def test_valid_submission():
+    records = SUBMISSION_ADAPTER.validate_json(_body()).to_records()
+    assert [r["student_id"] for r in records][:2] == ["510000001", "510000002"]
+
+
+@pytest.mark.parametrize("bad_id", ["", "abc", "12a4", "99999999999999999990", "1234567890123456789"])
+def test_student_id_must_be_a_bounded_number(bad_id):
+    ids = ("510000001", bad_id, "510000003", "510000004", "510000005")
+    with pytest.raises(ValidationError) as e:
+        SUBMISSION_ADAPTER.validate_json(_body(ids))
+    assert e.value.errors()[0]["loc"] == ("students", 1)
+
+
+def test_negative_band_counts_are_rejected():
+    # -1 + 6 still adds up to five students
+    with pytest.raises(ValidationError) as e:
+        SUBMISSION_ADAPTER.validate_json(_body(wam={"hd": -1, "d": 6}))
+    assert e.value.errors()[0]["type"] == "greater_than_equal"
@@ -0,0 +1,162 @@
+# test_submission_writer.py
+# the group commit keeps students.json, the shared cohort table and the submission aggregates in
+# step, a failure at any step of a commit leaves all three as they were, and a bad submission
+# only fails itself. No database: write_through is off, or the connection is a stand-in.
+# run from backend/: python -m pytest test/test_submission_writer.py
+import asyncio
+import json
+
+import pytest
+
+from app import cohort_table, submission_stats
+from app.submission_writer import InvalidSubmission, SubmissionWriter
+
+
+@pytest.fixture(autouse=True)
+def fresh_aggregates(monkeypatch):
+    monkeypatch.setattr(submission_stats, "aggregates", submission_stats.SubmissionAggregates())
+
+
+def _group(gid, first_id, size=5, prefs=("P1", "P2")):
+    return [
+        {
+            "name": f"Student {sid}", "student_id": str(sid), "unikey": f"abcd{sid:04d}",
+            "unit_code": "COMP3888", "wam": 80.0, "group_id": gid, "tutor_code": "T01",
+            "dual_project_enrollment": False, "skills": ["Database"], "project_preferences": list(prefs),
+        }
+        for sid in range(first_id, first_id + size)
+    ]
+
+
+def _submit_all(writer, groups):
+    async def scenario():
+        return await asyncio.gather(*(writer.submit(g) for g in groups))
+    return asyncio.run(scenario())
+
+
+def _file_ids(path):
+    return [r["student_id"] for r in json.loads(path.read_text(encoding="utf-8"))]
+
+
+def test_batch_lands_in_file_table_and_aggregates(tmp_path):
+    path = tmp_path / "students.json"
+    writer = SubmissionWriter(path=path, batch_ms=1, write_through=False)
+
+    # the third group reuses a student ID from the first, so it's turned away
+    accepted = _submit_all(writer, [_group("G1", 1), _group("G2", 6, prefs=["P2"]), _group("G3", 5)])
+    assert accepted == [True, True, False]
+
+    ids = _file_ids(path)
+    assert ids == [str(i) for i in range(1, 11)]
+    table = cohort_table.get_table(path)
+    assert [r["student_id"] for r in table.records()] == ids
+
+    stats = submission_stats.get_aggregates(path).snapshot()
+    assert stats["student_count"] == 10 and stats["group_count"] == 2
+    assert stats["project_demand"] == {"P1": 1, "P2": 2}
+    assert stats["wam_histogram"] == {"D": 10}
+
+    # a later submission extends what's already there
+    assert _submit_all(writer, [_group("G4", 11)]) == [True]
+    assert _file_ids(path) == [str(i) for i in range(1, 16)]
+    assert len(cohort_table.get_table(path)) == 15
+    assert submission_stats.get_aggregates(path).snapshot()["group_count"] == 3
+
+
+def test_aggregates_recount_when_someone_else_writes_the_file(tmp_path):
+    path = tmp_path / "students.json"
+    writer = SubmissionWriter(path=path, batch_ms=1, write_through=False)
+    _submit_all(writer, [_group("G1", 1)])
+
+    # another worker appends a group behind our back
+    records = json.loads(path.read_text(encoding="utf-8")) + _group("G2", 6)
+    path.write_text(json.dumps(records), encoding="utf-8")
+    assert _submit_all(writer, [_group("G3", 6), _group("G4", 11)]) == [False, True]
+
+    assert _file_ids(path) == [str(i) for i in range(1, 16)]
+    assert submission_stats.get_aggregates(path).snapshot()["student_count"] == 15
+
+
+class _Conn:
+    def __init__(self, fail=False):
+        self.fail = fail
+        self.committed = self.closed = False
+
+    def commit(self):
+        if self.fail:
+            raise RuntimeError("commit failed")
+        self.committed = True
+
+    def close(self):
+        self.closed = True
+
+
+def _fail_after(original):
+    def failing(*args, **kwargs):
+        original(*args, **kwargs)
+        raise RuntimeError("injected failure")
+    return failing
+
+
+@pytest.mark.parametrize("step", ["db", "file", "table", "aggregates", "synced", "commit"])
+def test_failure_at_any_step_leaves_everything_as_it_was(tmp_path, monkeypatch, step):
+    path = tmp_path / "students.json"
+    _submit_all(SubmissionWriter(path=path, batch_ms=1, write_through=False), [_group("G1", 1)])
+    before = path.read_bytes()
+
+    writer = SubmissionWriter(path=path, batch_ms=1, write_through=True)
+    conn = _Conn(fail=step == "commit")
+    monkeypatch.setattr(writer, "_write_db", lambda records: conn)
+    stats = submission_stats.get_aggregates(path)
+    if step == "db":
+        monkeypatch.setattr(writer, "_write_db", lambda records: (_ for _ in ()).throw(RuntimeError("db down")))
+    elif step == "file":
+        monkeypatch.setattr(writer, "_replace_file", lambda content: (_ for _ in ()).throw(OSError("disk full")))
+    elif step == "table":
+        monkeypatch.setattr(cohort_table.shared, "append", _fail_after(cohort_table.shared.append))
+    elif step == "aggregates":
+        # half the batch counted before it gives up
+        monkeypatch.setattr(stats, "add_records", lambda records: _fail_after(stats.add_records)(records[:2]))
+    elif step == "synced":
+        monkeypatch.setattr(stats, "mark_synced", _fail_after(stats.mark_synced))
+
+    with pytest.raises((RuntimeError, OSError)):
+        _submit_all(writer, [_group("G2", 6)])
+
+    assert path.read_bytes() == before
+    assert not conn.committed and (step == "db" or conn.closed)
+    assert [r["student_id"] for r in cohort_table.get_table(path).records()] == _file_ids(path)
+    snapshot = submission_stats.get_aggregates(path).snapshot()
+    assert snapshot["student_count"] == 5 and snapshot["group_count"] == 1
+    assert snapshot["project_demand"] == {"P1": 1, "P2": 1}
+
+    # the IDs that never made it can be submitted again
+    monkeypatch.undo()
+    monkeypatch.setattr(submission_stats, "aggregates", stats)
+    monkeypatch.setattr(writer, "write_through", False)
+    assert _submit_all(writer, [_group("G2", 6)]) == [True]
+    assert _file_ids(path) == [str(i) for i in range(1, 11)]
+    assert len(cohort_table.get_table(path)) == 10
+    assert submission_stats.get_aggregates(path).snapshot()["student_count"] == 10
+
+
+def test_bad_submission_is_turned_away_alone(tmp_path):
+    path = tmp_path / "students.json"
+    writer = SubmissionWriter(path=path, batch_ms=1, write_through=False)
+
+    twice = _group("G2", 6)
+    twice[1]["student_id"] = twice[0]["student_id"]
+    broken = _group("G3", 11)
+    broken[0]["wam"] = "not a number"
+
+    async def scenario():
+        return await asyncio.gather(
+            *(writer.submit(g) for g in [_group("G1", 1), twice, broken, _group("G4", 16)]),
+            return_exceptions=True,
+        )
+    results = asyncio.run(scenario())
+
+    assert results[0] is True and results[3] is True
+    assert all(isinstance(r, InvalidSubmission) for r in results[1:3])
+    assert _file_ids(path) == [str(i) for i in range(1, 6)] + [str(i) for i in range(16, 21)]
+    assert submission_stats.get_aggregates(path).snapshot()["group_count"] == 2